@@ -27,6 +27,18 @@ class VentaAdmin(admin.ModelAdmin):
     list_filter = ('fecha_venta',)
     date_hierarchy = 'fecha_venta'
 
+    # Solo lectura: una venta solo se escribe por registrar_venta, que en la misma
+    # transacción mueve stock, kardex, ResumenDiario y estadísticas del cliente.
+    # Editarla o borrarla aquí dejaría todo eso descuadrado.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 # 4. Configuración para Clientes
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Producto, StockBajo, EventoStock
+from . import cache_dashboard
+
+# ==========================================
+# ALERTAS DE STOCK BAJO (CONJUNTO MANTENIDO)
+# ==========================================
+# StockBajo tiene SOLO los productos activos con stock <= stock_minimo.
+# Cada operación que mueve stock llama a revisar() con el stock que dejó,
+# dentro de su misma transacción:
+#   - 1 consulta (cuáles de estos productos ya estaban en alerta)
+#   - escrituras solo si alguno cruzó el mínimo, y cada cruce queda en EventoStock.
+# El dashboard y la lista de alertas leen esta tabla: cuestan O(alertas).
+#
+# Las cargas masivas (bulk_create/update, sin señales) llaman a reconstruir(),
+# que sí recorre el catálogo una vez.
+
+
+def en_alerta(stock, stock_minimo, activo=True):
+    return activo and stock <= stock_minimo
+
+
+def revisar(estados, origen=''):
+    """
+    estados: {id_producto: (stock, stock_minimo, activo)} con los valores YA actualizados.
+    Devuelve (entraron, salieron) del conjunto.
+    """
+    if not estados:
+        return set(), set()
+    bajos = {i for i, (stock, minimo, activo) in estados.items() if en_alerta(stock, minimo, activo)}
+    actuales = set(StockBajo.objects.filter(producto_id__in=list(estados)).values_list('producto_id', flat=True))
+    entraron = bajos - actuales
+    salieron = actuales - bajos
+    _aplicar(entraron, salieron, estados, origen)
+    return entraron, salieron
+
+
+def revisar_ids(ids, origen=''):
+    """Igual que revisar() pero leyendo el stock actual de la BD (ediciones, activar/desactivar)"""
+    estados = {
+        i: (stock, minimo, activo)
+        for i, stock, minimo, activo in Producto.objects.filter(id_producto__in=list(ids))
+        .values_list('id_producto', 'stock', 'stock_minimo', 'activo')
+    }
+    return revisar(estados, origen)
+
+
+def reconstruir(origen="Reconstrucción", lote=1000):
+    """Recalcula el conjunto completo (después de importaciones o cargas masivas). Devuelve (entraron, salieron)."""
+    bajos = {
+        i: (stock, minimo, True)
+        for i, stock, minimo in Producto.objects.filter(activo=True, stock__lte=F('stock_minimo'))
+        .values_list('id_producto', 'stock', 'stock_minimo').iterator(chunk_size=lote)
+    }
+    actuales = set(StockBajo.objects.values_list('producto_id', flat=True))
+    entraron = set(bajos) - actuales
+    salieron = actuales - set(bajos)
+    estados = dict(bajos)
+    estados.update(
+        (i, (stock, minimo, activo))
+        for i, stock, minimo, activo in Producto.objects.filter(id_producto__in=list(salieron))
+        .values_list('id_producto', 'stock', 'stock_minimo', 'activo')
+    )
+    _aplicar(entraron, salieron, estados, origen, lote)
+    return entraron, salieron
+
+
+def _aplicar(entraron, salieron, estados, origen, lote=1000):
+    if not entraron and not salieron:
+        return
+    ahora = timezone.now()
+    StockBajo.objects.bulk_create(
+        [StockBajo(producto_id=i, desde=ahora) for i in entraron],
+        batch_size=lote, ignore_conflicts=True     # Por si otra transacción lo agregó al mismo tiempo
+    )
+    salieron = list(salieron)
+    for i in range(0, len(salieron), lote):
+        StockBajo.objects.filter(producto_id__in=salieron[i:i + lote]).delete()
+    EventoStock.objects.bulk_create([
+        EventoStock(
+            producto_id=i,
+            tipo='bajo' if i in entraron else 'repuesto',
+            stock=estados[i][0],
+            stock_minimo=estados[i][1],
+            fecha=ahora,
+            origen=origen[:255],
+        )
+        for i in sorted(entraron | set(salieron)) if i in estados
+    ], batch_size=lote)
+    transaction.on_commit(cache_dashboard.invalidar)    # El contador del panel cambió
@@ -0,0 +1,198 @@
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+import uuid
+from array import array
+from django.core.cache import cache
+from .models import Producto
+
+# ==========================================
+# BUSCADOR DE PRODUCTOS EN MEMORIA
+# ==========================================
+# Índice invertido sobre nombre y descripción, sin acentos ni mayúsculas.
+# Evita el LIKE '%x%' (escaneo completo de la tabla).
+#
+# - Cada palabra del catálogo tiene su lista ORDENADA de IDs (array de enteros).
+# - Las palabras se guardan ordenadas: un prefijo ("torn") es un rango contiguo
+#   que se encuentra con bisect.
+# - Se recorren las listas en orden de ID y se corta al llegar al límite, así
+#   una búsqueda cuesta lo mismo con 2 mil que con 200 mil productos.
+#
+# Se construye la primera vez que se usa y se mantiene con las señales de
+# Producto (ver core/signals.py). Cada proceso tiene su copia: si otro proceso
+# guarda un producto sube la versión en el cache y los demás reconstruyen en
+# la siguiente búsqueda (requiere un cache compartido, p. ej. FileBasedCache).
+
+CLAVE_VERSION = 'buscador:version'
+
+
+def normalizar(texto):
+    """'Martillo GALVANIZADO 16oz' -> 'martillo galvanizado 16oz' (sin acentos)"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return texto.lower()
+
+
+def tokens(texto):
+    return [t for t in re.split(r'\W+', normalizar(texto)) if t]
+
+
+class IndiceProductos:
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.listo = False
+        self.version = None
+        self.vaciar()
+
+    def vaciar(self):
+        self.palabras = []        # Vocabulario ordenado (para buscar prefijos con bisect)
+        self.en_nombre = {}       # palabra -> array de IDs (palabra está en el nombre)
+        self.en_todo = {}         # palabra -> array de IDs (nombre o descripción)
+        self.productos = {}       # id -> (activo, categoria_id, palabras_nombre, palabras_todas)
+
+    # --- Construcción / mantenimiento ---
+
+    def construir(self):
+        with self.lock:
+            self.listo = False
+            self.vaciar()
+            # La versión ANTES de leer: un cambio que llegue durante la lectura obliga a reconstruir
+            version = cache.get(CLAVE_VERSION)
+            filas = Producto.objects.order_by('id_producto') \
+                .values_list('id_producto', 'nombre', 'descripcion', 'activo', 'categoria_id')
+            for fila in filas.iterator(chunk_size=5000):
+                self._agregar(*fila)
+            self.palabras = sorted(self.en_todo)
+            self.version = version
+            self.listo = True
+
+    def _insertar(self, tabla, palabra, id_producto):
+        ids = tabla.get(palabra)
+        if ids is None:
+            tabla[palabra] = array('l', [id_producto])
+        elif ids[-1] < id_producto:
+            ids.append(id_producto)      # Caso normal al construir: IDs crecientes
+        else:
+            bisect.insort(ids, id_producto)
+
+    def _agregar(self, id_producto, nombre, descripcion, activo, categoria_id):
+        del_nombre = tuple(sorted(set(tokens(nombre))))
+        todas = tuple(sorted(set(del_nombre) | set(tokens(descripcion))))
+        self.productos[id_producto] = (activo, categoria_id, del_nombre, todas)
+        for palabra in del_nombre:
+            self._insertar(self.en_nombre, palabra, id_producto)
+        for palabra in todas:
+            if self.listo and palabra not in self.en_todo:
+                bisect.insort(self.palabras, palabra)
+            self._insertar(self.en_todo, palabra, id_producto)
+
+    def _quitar(self, id_producto):
+        datos = self.productos.pop(id_producto, None)
+        if datos is None:
+            return
+        for tabla, palabras in ((self.en_nombre, datos[2]), (self.en_todo, datos[3])):
+            for palabra in palabras:
+                ids = tabla[palabra]
+                ids.pop(bisect.bisect_left(ids, id_producto))
+                if not ids:
+                    del tabla[palabra]
+                    if tabla is self.en_todo:
+                        self.palabras.pop(bisect.bisect_left(self.palabras, palabra))
+
+    def actualizar(self, producto):
+        """Llamado al guardar un producto"""
+        with self.lock:
+            if self.listo:
+                self._quitar(producto.id_producto)
+                self._agregar(producto.id_producto, producto.nombre, producto.descripcion,
+                              producto.activo, producto.categoria_id)
+            self._subir_version()
+
+    def quitar(self, id_producto):
+        """Llamado al borrar un producto"""
+        with self.lock:
+            if self.listo:
+                self._quitar(id_producto)
+            self._subir_version()
+
+    def invalidar(self):
+        """Llamado tras cambios masivos (bulk_create/bulk_update no disparan señales)"""
+        with self.lock:
+            self.listo = False
+            self._subir_version()
+
+    def _subir_version(self):
+        # Un valor nuevo, no incr(): en FileBasedCache incr no es atómico y dos procesos
+        # podrían dejar el mismo número sin enterarse uno del cambio del otro
+        al_dia = cache.get(CLAVE_VERSION) == self.version
+        self.version = uuid.uuid4().hex
+        cache.set(CLAVE_VERSION, self.version, None)
+        if not al_dia:
+            self.listo = False    # Otro proceso cambió productos que esta copia todavía no tiene
+
+    def _asegurar(self):
+        if not self.listo or cache.get(CLAVE_VERSION) != self.version:
+            self.construir()
+
+    # --- Consultas ---
+
+    def _rango(self, prefijo):
+        """Palabras del vocabulario que empiezan con `prefijo`"""
+        inicio = bisect.bisect_left(self.palabras, prefijo)
+        fin = bisect.bisect_left(self.palabras, prefijo + '\uffff')
+        return self.palabras[inicio:fin]
+
+    def _recorrer(self, tabla, palabras):
+        """IDs (ordenados, sin repetir) de todas las listas de `palabras`"""
+        anterior = None
+        for id_producto in heapq.merge(*[tabla[p] for p in palabras if p in tabla]):
+            if id_producto != anterior:
+                anterior = id_producto
+                yield id_producto
+
+    def buscar(self, texto, limite=20, activo=True, categoria_id=None):
+        """IDs que contienen TODAS las palabras (como prefijo), primero los que coinciden en el nombre"""
+        buscadas = tokens(texto)
+        if not buscadas:
+            return []
+
+        with self.lock:
+            self._asegurar()
+
+            # La palabra más selectiva (menos IDs) es la que recorremos
+            rangos = [(p, self._rango(p)) for p in buscadas]
+            guia, vocab_guia = min(rangos, key=lambda r: sum(len(self.en_todo[p]) for p in r[1]))
+            resto = [p for p in buscadas if p != guia]
+
+            def coincide(id_producto):
+                activo_p, categoria_p, _, todas = self.productos[id_producto]
+                if activo is not None and activo_p != activo:
+                    return False
+                if categoria_id is not None and categoria_p != categoria_id:
+                    return False
+                return all(any(t.startswith(p) for t in todas) for p in resto)
+
+            resultado = []
+            # Búsqueda por código: "125" también encuentra el producto #125
+            # isdecimal y no isdigit: '²' o '①' son "dígitos" pero int() no los acepta
+            codigo = texto.strip()
+            if codigo.isdecimal() and int(codigo) in self.productos:
+                id_exacto = int(codigo)
+                datos = self.productos[id_exacto]
+                if (activo is None or datos[0] == activo) and (categoria_id is None or datos[1] == categoria_id):
+                    resultado.append(id_exacto)
+
+            # 1ra pasada: la palabra está en el NOMBRE; 2da: en la descripción
+            for tabla in (self.en_nombre, self.en_todo):
+                for id_producto in self._recorrer(tabla, vocab_guia):
+                    if len(resultado) >= limite:
+                        return resultado
+                    if id_producto not in resultado and coincide(id_producto):
+                        resultado.append(id_producto)
+            return resultado
+
+
+indice = IndiceProductos()
@@ -0,0 +1,87 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .models import Venta, StockBajo
+from .reportes import resumen_dashboard
+
+# ==========================================
+# CACHE DEL DASHBOARD
+# ==========================================
+# El contexto del panel se guarda en el cache de Django (locmem/archivo, sin
+# servicios externos). Cada venta, compra o movimiento sube la "versión" y
+# las entradas viejas dejan de usarse. El TTL es solo un respaldo.
+
+PREFIJO = 'dashboard'
+CLAVE_VERSION = f'{PREFIJO}:version'
+CLAVE_HITS = f'{PREFIJO}:hits'
+CLAVE_MISSES = f'{PREFIJO}:misses'
+
+
+def ttl():
+    return getattr(settings, 'DASHBOARD_CACHE_TTL', 60)
+
+
+def version_actual():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        # Si el cache se vació arrancamos en un número nuevo para no revivir entradas viejas
+        cache.add(CLAVE_VERSION, time.time_ns(), None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def invalidar():
+    """Marca como viejo todo lo cacheado del dashboard"""
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.set(CLAVE_VERSION, time.time_ns(), None)
+
+
+def contar(clave):
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.add(clave, 0, None)
+        cache.incr(clave)
+
+
+def estadisticas():
+    """Contadores de aciertos/fallos del cache del dashboard"""
+    hits = cache.get(CLAVE_HITS, 0)
+    misses = cache.get(CLAVE_MISSES, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'porcentaje': round(hits * 100 / total, 1) if total else 0,
+    }
+
+
+def calcular_dashboard(hoy):
+    """Contexto completo del panel (sin cache)"""
+    # 1. Indicadores y rankings (tabla acumulada ResumenDiario, ver core/reportes.py)
+    contexto = resumen_dashboard(hoy)
+
+    # 2. Alertas de inventario (conjunto mantenido, ver core/alertas.py: cuesta O(alertas))
+    contexto['productos_bajo_stock'] = StockBajo.objects.count()
+
+    # 3. Últimas ventas (en lista para poder guardarlas en el cache)
+    contexto['ultimas_ventas'] = list(Venta.objects.select_related('cliente').order_by('-fecha_venta')[:5])
+    return contexto
+
+
+def contexto_dashboard():
+    """Contexto del panel desde el cache; si no está (o ya es viejo) se recalcula"""
+    hoy = timezone.localdate()
+    clave = f'{PREFIJO}:contexto:{hoy.isoformat()}:{version_actual()}'
+
+    contexto = cache.get(clave)
+    if contexto is None:
+        contar(CLAVE_MISSES)
+        contexto = calcular_dashboard(hoy)
+        cache.set(clave, contexto, ttl())
+    else:
+        contar(CLAVE_HITS)
+    return contexto
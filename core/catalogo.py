@@ -0,0 +1,77 @@
+import datetime
+from django.db.models import Max, Count
+from django.utils import timezone
+from .models import Producto
+
+# ==========================================
+# CATÁLOGO VERSIONADO PARA EL POS
+# ==========================================
+# La "versión" del catálogo es la fecha de la última modificación de un
+# producto, en microsegundos. El POS descarga todo una vez y luego pide
+# solo los cambios desde su versión.
+
+CAMPOS = ['id', 'nombre', 'precio', 'stock', 'unidad']
+
+# Una transacción que terminó tarde puede tener una fecha un poco anterior
+# a la versión que ya vio el POS: repetimos unos segundos hacia atrás.
+# Reenviar un producto no hace daño (el POS lo reemplaza por ID).
+MARGEN = datetime.timedelta(seconds=10)
+
+UNIDADES = dict(Producto.UNIDADES)
+
+
+def a_version(fecha):
+    if fecha is None:
+        return 0
+    return int(fecha.timestamp() * 1_000_000)
+
+
+def desde_version(version):
+    """Fecha de una versión; ValueError si no corresponde a una fecha posible (p. ej. ?desde=10**30)"""
+    try:
+        return datetime.datetime.fromtimestamp(version / 1_000_000, tz=datetime.timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        raise ValueError(f"Versión fuera de rango: {version}")
+
+
+def estado_catalogo():
+    """(versión, cantidad de productos): sirve para armar el ETag en una consulta"""
+    datos = Producto.objects.aggregate(ultimo=Max('modificado'), total=Count('id_producto'))
+    return a_version(datos['ultimo']), datos['total']
+
+
+def etag_catalogo(request, *args, **kwargs):
+    version, total = estado_catalogo()
+    return f'{version}-{total}'
+
+
+def filas(productos):
+    """Lista compacta: [[id, nombre, precio, stock, unidad], ...]"""
+    return [
+        [p[0], p[1], float(p[2]), float(p[3]), UNIDADES.get(p[4], p[4])]
+        for p in productos.values_list('id_producto', 'nombre', 'precio_venta', 'stock', 'unidad')
+                          .order_by('id_producto').iterator(chunk_size=5000)
+    ]
+
+
+def snapshot():
+    """Todos los productos activos"""
+    version, _ = estado_catalogo()
+    return {
+        'version': version,
+        'campos': CAMPOS,
+        'productos': filas(Producto.objects.filter(activo=True)),
+    }
+
+
+def cambios(version):
+    """Productos modificados desde `version` (los desactivados van aparte para que el POS los borre)"""
+    desde = desde_version(version) - MARGEN
+    modificados = Producto.objects.filter(modificado__gt=desde)
+    nueva_version, _ = estado_catalogo()
+    return {
+        'version': max(nueva_version, version),
+        'campos': CAMPOS,
+        'productos': filas(modificados.filter(activo=True)),
+        'inactivos': list(modificados.filter(activo=False).values_list('id_producto', flat=True)),
+    }
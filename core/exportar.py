@@ -0,0 +1,85 @@
+import csv
+from django.utils import timezone
+from .models import DetalleVenta, DetalleCompra, Movimiento
+
+# ==========================================
+# EXPORTACIÓN CSV EN STREAMING
+# ==========================================
+# Para el contador: ventas, compras y kardex completos de un rango de fechas.
+# Las filas se escriben a la respuesta a medida que salen de la BD, en lotes
+# por ID (keyset), así la memoria es la misma con mil que con millones de filas
+# y el navegador empieza a descargar de inmediato.
+#
+# No usamos un solo .iterator(): con MySQL el driver (mysqlclient) trae el
+# resultado completo a memoria antes de entregar la primera fila.
+
+LOTE = 2000
+
+
+class Eco:
+    """Archivo falso para csv.writer: devuelve la línea en vez de guardarla"""
+    def write(self, valor):
+        return valor
+
+
+def _fecha(valor):
+    return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M:%S') if valor else ''
+
+
+def _por_lotes(queryset, campos, lote=LOTE):
+    """values_list del queryset en lotes por PK (cada lote es una consulta corta)"""
+    pk = queryset.model._meta.pk.name
+    ultimo = None
+    while True:
+        filas = queryset if ultimo is None else queryset.filter(**{f'{pk}__gt': ultimo})
+        filas = list(filas.order_by(pk).values_list(pk, *campos)[:lote])
+        if not filas:
+            return
+        yield from filas
+        ultimo = filas[-1][0]
+
+
+def _ventas(f_ini, f_fin):
+    yield ['Venta', 'Fecha', 'Cajero', 'Cliente', 'Descuento', 'Total Venta',
+           'ID Producto', 'Producto', 'Cantidad', 'Precio', 'Subtotal', 'Costo Unitario']
+    detalles = DetalleVenta.objects.filter(venta__fecha_venta__range=(f_ini, f_fin))
+    campos = ['venta_id', 'venta__fecha_venta', 'venta__usuario__username', 'venta__cliente__nombres',
+              'venta__descuento', 'venta__total', 'producto_id', 'producto__nombre',
+              'cantidad', 'precio_unitario', 'subtotal', 'costo_unitario']
+    for _, venta, fecha, cajero, cliente, *resto in _por_lotes(detalles, campos):
+        yield [venta, _fecha(fecha), cajero, cliente or 'Consumidor Final', *resto]
+
+
+def _compras(f_ini, f_fin):
+    yield ['Compra', 'Fecha', 'Usuario', 'Proveedor', 'RUC', 'Total Compra',
+           'ID Producto', 'Producto', 'Cantidad', 'Costo Unitario', 'Subtotal']
+    detalles = DetalleCompra.objects.filter(compra__fecha_compra__range=(f_ini, f_fin))
+    campos = ['compra_id', 'compra__fecha_compra', 'compra__usuario__username', 'compra__proveedor__empresa',
+              'compra__proveedor__ruc', 'compra__total', 'producto_id', 'producto__nombre',
+              'cantidad', 'costo_unitario', 'subtotal']
+    for _, compra, fecha, *resto in _por_lotes(detalles, campos):
+        yield [compra, _fecha(fecha), *resto]
+
+
+def _movimientos(f_ini, f_fin):
+    yield ['ID', 'Fecha', 'ID Producto', 'Producto', 'Tipo', 'Cantidad', 'Saldo', 'Usuario', 'Descripción']
+    tipos = dict(Movimiento.TIPOS)
+    movimientos = Movimiento.objects.filter(fecha__range=(f_ini, f_fin))
+    campos = ['fecha', 'producto_id', 'producto__nombre', 'tipo', 'cantidad', 'saldo', 'usuario__username', 'descripcion']
+    for id_mov, fecha, id_producto, producto, tipo, *resto in _por_lotes(movimientos, campos):
+        yield [id_mov, _fecha(fecha), id_producto, producto, tipos.get(tipo, tipo), *resto]
+
+
+EXPORTES = {
+    'ventas': _ventas,
+    'compras': _compras,
+    'movimientos': _movimientos,
+}
+
+
+def lineas_csv(tipo, f_ini, f_fin):
+    """Generador de líneas CSV (con BOM para que Excel respete los acentos)"""
+    escritor = csv.writer(Eco())
+    yield '\ufeff'
+    for fila in EXPORTES[tipo](f_ini, f_fin):
+        yield escritor.writerow(fila)
@@ -0,0 +1,270 @@
+import csv
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from .forms import ProductoForm
+from .models import Producto, Categoria, Movimiento
+from .buscador import indice
+from . import cache_dashboard, alertas
+
+# ==========================================
+# IMPORTACIÓN MASIVA DE PRODUCTOS (CSV)
+# ==========================================
+# Columnas: id, nombre, descripcion, categoria, unidad, precio_compra,
+#           precio_venta, stock, stock_minimo   (solo 'nombre' es obligatoria)
+#
+# - El archivo se lee fila por fila y se guarda en lotes (bulk_create / bulk_update).
+# - Cada valor pasa por los mismos campos de ProductoForm (mismas reglas que la pantalla).
+# - Un producto existente se reconoce por 'id' o, si viene vacío, por el nombre.
+# - Al actualizar solo se tocan las columnas que trae el archivo. El stock
+#   solo se usa para productos NUEVOS (con su movimiento de "Stock inicial",
+#   igual que al crearlo a mano): el de los existentes se mueve con compras
+#   y ajustes para que quede en el kardex.
+# - Modo simulación: hace todas las validaciones y reporta qué cambiaría, sin guardar.
+
+COLUMNAS = ['id', 'nombre', 'descripcion', 'categoria', 'unidad',
+            'precio_compra', 'precio_venta', 'stock', 'stock_minimo']
+OBLIGATORIAS_NUEVO = ['precio_compra', 'precio_venta']
+LOTE = 1000
+MAX_DETALLE = 200     # Cambios detallados que se guardan para el reporte
+
+
+def _clave(nombre):
+    return ' '.join(nombre.split()).lower()
+
+
+class Resultado:
+    def __init__(self, simulacion):
+        self.simulacion = simulacion
+        self.nuevos = 0
+        self.actualizados = 0
+        self.sin_cambios = 0
+        self.errores = []              # (línea, mensaje)
+        self.cambios = []              # (línea, id o None, nombre, {campo: (antes, después)})
+        self.categorias_nuevas = set()
+
+    @property
+    def procesados(self):
+        return self.nuevos + self.actualizados + self.sin_cambios + len(self.errores)
+
+    def anotar(self, linea, id_producto, nombre, cambios):
+        if len(self.cambios) < MAX_DETALLE:
+            self.cambios.append((linea, id_producto, nombre, cambios))
+
+
+class Importador:
+
+    def __init__(self, usuario=None, simulacion=False, crear_categorias=False, lote=LOTE):
+        self.usuario = usuario          # Responsable de los movimientos de stock inicial
+        self.simulacion = simulacion
+        self.crear_categorias = crear_categorias
+        self.lote = lote
+        self.campos = ProductoForm.base_fields
+        self.resultado = Resultado(simulacion)
+
+    def importar(self, archivo):
+        """`archivo`: cualquier iterable de líneas de texto (archivo abierto, upload envuelto, etc.)"""
+        # strict: una comilla sin cerrar es un error, no un campo que se traga el resto del archivo
+        lector = csv.DictReader(archivo, strict=True)
+        try:
+            encabezado = [c.strip().lower() for c in (lector.fieldnames or [])]
+        except csv.Error as e:
+            raise ValueError(f"El archivo no es un CSV válido: {e}")
+        if 'nombre' not in encabezado:
+            raise ValueError("El archivo no tiene la columna 'nombre'")
+        lector.fieldnames = encabezado
+        self.columnas = [c for c in COLUMNAS if c in encabezado]
+        if 'stock' in self.columnas and self.usuario is None and not self.simulacion:
+            raise ValueError("Falta el usuario responsable del stock inicial")
+
+        # Dos consultas para todo el archivo: nombres existentes y categorías
+        self.por_nombre = {}
+        for id_producto, nombre in Producto.objects.order_by('-id_producto').values_list('id_producto', 'nombre'):
+            self.por_nombre[_clave(nombre)] = id_producto    # Con nombres repetidos gana el ID más bajo
+        self.categorias = {_clave(c.nombre): c for c in Categoria.objects.all()}
+        self.nombres_categoria = {c.pk: c.nombre for c in self.categorias.values()}
+        self.vistos = {}
+
+        filas, danado = [], None
+        try:
+            for fila in lector:
+                filas.append((lector.line_num, fila))
+                if len(filas) >= self.lote:
+                    self._procesar(filas)
+                    filas = []
+        except csv.Error as e:
+            # Comilla sin cerrar, byte NUL, campo gigante...: no se puede seguir leyendo. El lote
+            # a medias se descarta; los lotes anteriores ya están guardados y se reportan en el error.
+            danado = f"El archivo no es un CSV válido (después de la línea {lector.line_num}): {e}"
+        if filas and not danado:
+            self._procesar(filas)
+
+        if not self.simulacion and (self.resultado.nuevos or self.resultado.actualizados):
+            # bulk_create/bulk_update no disparan las señales de Producto
+            indice.invalidar()
+            cache_dashboard.invalidar()
+            alertas.reconstruir(origen="Importación CSV")
+        if danado:
+            if not self.simulacion and (self.resultado.nuevos or self.resultado.actualizados):
+                danado += f" (ya se guardaron {self.resultado.nuevos} nuevos y {self.resultado.actualizados} actualizados)"
+            raise ValueError(danado)
+        return self.resultado
+
+    # --- Validación ---
+
+    def _limpiar(self, fila):
+        datos, errores = {}, []
+        for campo in self.columnas:
+            if campo in ('id', 'categoria'):
+                continue
+            try:
+                datos[campo] = self.campos[campo].clean((fila.get(campo) or '').strip())
+            except ValidationError as e:
+                errores.append(f"{campo}: {' '.join(e.messages)}")
+
+        id_producto = None
+        if (fila.get('id') or '').strip():
+            try:
+                id_producto = int(fila['id'])
+            except ValueError:
+                errores.append(f"id: '{fila['id']}' no es un número")
+
+        if 'categoria' in self.columnas:
+            nombre_cat = ' '.join((fila.get('categoria') or '').split())
+            if not nombre_cat:
+                errores.append('categoria: Este campo es obligatorio.')
+            elif _clave(nombre_cat) in self.categorias:
+                datos['categoria'] = self.categorias[_clave(nombre_cat)]
+            elif self.crear_categorias and len(nombre_cat) > Categoria._meta.get_field('nombre').max_length:
+                errores.append(f"categoria: '{nombre_cat}' es demasiado largo")
+            elif self.crear_categorias:
+                datos['categoria'] = nombre_cat     # Se resuelve por lote en _resolver_categorias
+            else:
+                errores.append(f"categoria: '{nombre_cat}' no existe")
+
+        if errores:
+            raise ValidationError(errores)
+        return id_producto, datos
+
+    def _resolver_categorias(self, limpias):
+        nuevas = {datos['categoria'] for _, _, datos in limpias if isinstance(datos.get('categoria'), str)}
+        if not nuevas:
+            return
+        if self.simulacion:
+            for nombre in nuevas:
+                self.categorias[_clave(nombre)] = Categoria(nombre=nombre)
+        else:
+            Categoria.objects.bulk_create([Categoria(nombre=n) for n in nuevas], ignore_conflicts=True)
+            # En MySQL bulk_create no devuelve los IDs: los leemos de nuevo
+            for categoria in Categoria.objects.filter(nombre__in=nuevas):
+                self.categorias[_clave(categoria.nombre)] = categoria
+        self.resultado.categorias_nuevas.update(nuevas)
+        for _, _, datos in limpias:
+            if isinstance(datos.get('categoria'), str):
+                datos['categoria'] = self.categorias[_clave(datos['categoria'])]
+
+    def _comparable(self, producto, campo, valor):
+        """(valor actual, valor nuevo) listos para comparar y mostrar en el reporte"""
+        if campo == 'categoria':
+            # Por ID, sin cargar la categoría actual de cada producto
+            antes = self.nombres_categoria.get(producto.categoria_id)
+            if valor.pk is not None and valor.pk == producto.categoria_id:
+                return antes, antes
+            return antes, valor.nombre
+        if campo == 'descripcion':
+            return getattr(producto, campo) or '', valor or ''
+        return getattr(producto, campo), valor
+
+    # --- Lote ---
+
+    def _procesar(self, filas):
+        resultado = self.resultado
+        limpias = []
+        for linea, fila in filas:
+            try:
+                id_producto, datos = self._limpiar(fila)
+            except ValidationError as e:
+                resultado.errores.append((linea, '; '.join(e.messages)))
+                continue
+            limpias.append((linea, id_producto, datos))
+        self._resolver_categorias(limpias)
+
+        ids = {i or self.por_nombre.get(_clave(d['nombre'])) for _, i, d in limpias} - {None}
+        existentes = Producto.objects.in_bulk(ids)
+
+        ahora = timezone.now()
+        crear, actualizar = [], {}
+        for linea, id_producto, datos in limpias:
+            clave = id_producto or _clave(datos['nombre'])
+            if clave in self.vistos:
+                resultado.errores.append((linea, f"Producto repetido en el archivo (línea {self.vistos[clave]})"))
+                continue
+            self.vistos[clave] = linea
+
+            id_producto = id_producto or self.por_nombre.get(_clave(datos['nombre']))
+            producto = existentes.get(id_producto)
+
+            if producto is None and clave == id_producto:
+                resultado.errores.append((linea, f"El producto #{id_producto} no existe"))
+            elif producto is None:
+                faltan = [c for c in OBLIGATORIAS_NUEVO if c not in datos]
+                if faltan:
+                    resultado.errores.append((linea, f"Producto nuevo sin {', '.join(faltan)}"))
+                    continue
+                crear.append(Producto(**datos))
+                resultado.nuevos += 1
+                resultado.anotar(linea, None, datos['nombre'], {})
+            else:
+                datos.pop('stock', None)
+                cambios = {}
+                for campo, valor in datos.items():
+                    antes, despues = self._comparable(producto, campo, valor)
+                    if antes != despues:
+                        cambios[campo] = (antes, despues)
+                if not cambios:
+                    resultado.sin_cambios += 1
+                    continue
+                for campo in cambios:
+                    setattr(producto, campo, datos[campo])
+                producto.modificado = ahora     # auto_now no corre en bulk_update
+                actualizar[producto.pk] = producto
+                resultado.actualizados += 1
+                resultado.anotar(linea, producto.pk, producto.nombre, cambios)
+
+        if self.simulacion:
+            return
+        campos = [c for c in self.columnas if c not in ('id', 'stock')] + ['modificado']
+        with transaction.atomic():
+            Producto.objects.bulk_create(crear, batch_size=self.lote)
+            Producto.objects.bulk_update(actualizar.values(), campos, batch_size=self.lote)
+            self._stock_inicial(crear)
+
+    def _stock_inicial(self, creados):
+        """Un movimiento por producto nuevo con stock: el kardex arranca cuadrado con Producto.stock"""
+        con_stock = [p for p in creados if p.stock]
+        if not con_stock:
+            return
+        if any(p.pk is None for p in con_stock):
+            # En MySQL bulk_create no devuelve los IDs: los leemos por nombre (en el lote no se
+            # repiten y ningún producto anterior lo tiene, si no se habría actualizado ese)
+            ids = dict(
+                Producto.objects.filter(nombre__in=[p.nombre for p in con_stock])
+                .order_by('id_producto').values_list('nombre', 'id_producto')
+            )
+            for producto in con_stock:
+                producto.pk = ids[producto.nombre]
+        Movimiento.objects.bulk_create([
+            Movimiento(
+                producto=producto,
+                usuario=self.usuario,
+                tipo='ajuste_pos' if producto.stock > 0 else 'ajuste_neg',
+                cantidad=abs(producto.stock),
+                saldo=producto.stock,
+                descripcion="Stock inicial (importación CSV)"
+            )
+            for producto in con_stock
+        ], batch_size=self.lote)
+
+
+def importar_productos(archivo, usuario=None, simulacion=False, crear_categorias=False, lote=LOTE):
+    return Importador(usuario, simulacion, crear_categorias, lote).importar(archivo)
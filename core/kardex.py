@@ -0,0 +1,167 @@
+import datetime
+from django.db import transaction
+from django.db.models import F, Sum, Min, Max, Case, When, DecimalField
+from django.utils import timezone
+from .models import Producto, Movimiento, CorteStock
+
+# ==========================================
+# KARDEX CON SALDO Y CORTES DE STOCK
+# ==========================================
+# - Cada Movimiento guarda el stock que quedó después de él (saldo).
+# - Cada fin de mes se guarda un CorteStock por producto (`manage.py generar_cortes`).
+# - Stock a una fecha = último corte anterior (una búsqueda por índice)
+#   + los movimientos desde ese corte hasta la fecha (como mucho un mes).
+
+CANTIDAD = DecimalField(max_digits=12, decimal_places=2)
+
+
+def con_signo():
+    """cantidad positiva para entradas/ajustes (+) y negativa para salidas/ajustes (-)"""
+    return Case(
+        When(tipo__in=Movimiento.POSITIVOS, then=F('cantidad')),
+        default=-F('cantidad'),
+        output_field=CANTIDAD,
+    )
+
+
+def fin_del_dia(dia):
+    return timezone.make_aware(datetime.datetime.combine(dia, datetime.time.max))
+
+
+def fin_de_mes(dia):
+    siguiente = (dia.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+    return fin_del_dia(siguiente - datetime.timedelta(days=1))
+
+
+def stock_en_fecha(producto, momento):
+    """Stock que tenía el producto en `momento` (datetime con zona horaria)"""
+    movimientos = Movimiento.objects.filter(producto=producto)
+    corte = CorteStock.objects.filter(producto=producto, hasta__lte=momento) \
+        .order_by('-hasta').values_list('hasta', 'stock').first()
+
+    if corte:
+        hasta, stock = corte
+        tramo = movimientos.filter(fecha__gt=hasta, fecha__lte=momento)
+        return stock + (tramo.aggregate(total=Sum(con_signo()))['total'] or 0)
+
+    # Sin corte previo: desde el stock actual, deshaciendo lo que pasó después
+    posteriores = movimientos.filter(fecha__gt=momento).aggregate(total=Sum(con_signo()))['total'] or 0
+    return producto.stock - posteriores
+
+
+@transaction.atomic
+def generar_corte(hasta):
+    """
+    Guarda el stock de todos los productos en `hasta` (normalmente fin de mes).
+    Dos consultas agrupadas sin importar cuántos productos haya.
+    """
+    if CorteStock.objects.filter(hasta=hasta).exists():
+        return 0
+
+    anterior = CorteStock.objects.filter(hasta__lt=hasta).aggregate(ultimo=Max('hasta'))['ultimo']
+    if anterior:
+        # Corte anterior + movimientos del período
+        base = dict(CorteStock.objects.filter(hasta=anterior).values_list('producto_id', 'stock'))
+        tramo = Movimiento.objects.filter(fecha__gt=anterior, fecha__lte=hasta)
+        signo = 1
+    else:
+        # Primer corte: stock actual - movimientos posteriores
+        base = dict(Producto.objects.values_list('id_producto', 'stock'))
+        tramo = Movimiento.objects.filter(fecha__gt=hasta)
+        signo = -1
+
+    cambios = dict(tramo.values('producto').annotate(total=Sum(con_signo())).values_list('producto', 'total').order_by())
+    nuevos = set(Producto.objects.values_list('id_producto', flat=True)) - set(base)
+    if nuevos and anterior:
+        # Productos creados después del corte anterior: desde su stock actual hacia atrás
+        posteriores = Movimiento.objects.filter(producto_id__in=nuevos, fecha__gt=hasta) \
+            .values('producto').annotate(total=Sum(con_signo())).values_list('producto', 'total').order_by()
+        posteriores = dict(posteriores)
+        for id_producto, stock in Producto.objects.filter(id_producto__in=nuevos).values_list('id_producto', 'stock'):
+            base[id_producto] = stock - posteriores.get(id_producto, 0) - cambios.get(id_producto, 0)
+
+    CorteStock.objects.bulk_create(
+        [CorteStock(producto_id=id_producto, hasta=hasta, stock=stock + signo * cambios.get(id_producto, 0))
+         for id_producto, stock in base.items()],
+        batch_size=1000,
+    )
+    return len(base)
+
+
+def reconstruir_saldos(lote=500):
+    """
+    Calcula Movimiento.saldo hacia atrás desde el stock actual, por lotes de productos.
+    Devuelve la cantidad de movimientos actualizados.
+    """
+    total = 0
+    ultimo_id = 0
+    while True:
+        ids = list(
+            Producto.objects.filter(id_producto__gt=ultimo_id).order_by('id_producto')
+            .values_list('id_producto', flat=True)[:lote]
+        )
+        if not ids:
+            return total
+        ultimo_id = ids[-1]
+
+        with transaction.atomic():
+            # Bloqueamos los productos para que nadie mueva stock mientras recalculamos
+            saldos = dict(
+                Producto.objects.select_for_update().filter(id_producto__in=ids).values_list('id_producto', 'stock')
+            )
+            movimientos = Movimiento.objects.filter(producto_id__in=ids) \
+                .order_by('producto_id', '-fecha', '-id').only('id', 'producto_id', 'tipo', 'cantidad', 'saldo')
+            cambiar = []
+            for movimiento in movimientos:
+                saldo = saldos[movimiento.producto_id]
+                if movimiento.saldo != saldo:
+                    movimiento.saldo = saldo
+                    cambiar.append(movimiento)
+                # Antes de este movimiento el stock era...
+                if movimiento.tipo in Movimiento.POSITIVOS:
+                    saldos[movimiento.producto_id] = saldo - movimiento.cantidad
+                else:
+                    saldos[movimiento.producto_id] = saldo + movimiento.cantidad
+            Movimiento.objects.bulk_update(cambiar, ['saldo'], batch_size=1000)
+        total += len(cambiar)
+
+
+def cortes_pendientes(hasta):
+    """Fines de mes que todavía no tienen corte, hasta `hasta` (inclusive)"""
+    datos = CorteStock.objects.aggregate(ultimo=Max('hasta'))
+    if datos['ultimo']:
+        dia = timezone.localdate(datos['ultimo']) + datetime.timedelta(days=1)
+    else:
+        primero = Movimiento.objects.aggregate(primero=Min('fecha'))['primero']
+        if primero is None:
+            return []
+        dia = timezone.localdate(primero)
+
+    pendientes = []
+    while fin_de_mes(dia) <= hasta:
+        pendientes.append(fin_de_mes(dia))
+        dia = fin_de_mes(dia).date() + datetime.timedelta(days=1)
+    return pendientes
+
+
+def auditar_rango(desde, hasta):
+    """
+    Compara Producto.stock con la suma del kardex para los IDs [desde, hasta).
+    Devuelve (productos revisados, [(id, stock, según kardex), ...] de los que no cuadran).
+    """
+    with transaction.atomic():
+        # Misma transacción = misma foto de la BD para las dos consultas
+        productos = Producto.objects.filter(id_producto__gte=desde, id_producto__lt=hasta)
+        stocks = productos.values_list('id_producto', 'stock')
+        kardex = dict(
+            Movimiento.objects.filter(producto_id__gte=desde, producto_id__lt=hasta)
+            .values('producto').annotate(total=Sum(con_signo())).values_list('producto', 'total').order_by()
+        )
+        revisados = 0
+        diferencias = []
+        for id_producto, stock in stocks:
+            revisados += 1
+            esperado = kardex.get(id_producto, 0)
+            if stock != esperado:
+                diferencias.append((id_producto, stock, esperado))
+    return revisados, diferencias
@@ -0,0 +1,289 @@
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import setup_databases, teardown_databases, setup_test_environment, teardown_test_environment
+
+# ==========================================
+# BENCHMARK DEL PUNTO DE VENTA
+# ==========================================
+# Levanta una BD de prueba aparte (test_<nombre>, nunca la real), la llena con
+# un catálogo y simula N cajeros en paralelo contra las APIs del POS:
+#   - api/producto/<id>/   (consulta de código de barras)
+#   - api/guardar-venta/   (carrito de 1 a 8 líneas)
+#   - api/guardar-compra/  (factura de proveedor)
+# Al final: operaciones/seg, latencias p50/p95/p99, errores de bloqueo y
+# verificación de que el stock cuadra con lo vendido y comprado.
+#
+#   python manage.py benchmark_pos --cajeros 8 --duracion 30 --salida base.json
+#   python manage.py benchmark_pos --cajeros 8 --duracion 30 --comparar base.json
+
+MEZCLA = (('producto', 70), ('venta', 25), ('compra', 5))
+BLOQUEOS = ('lock', 'deadlock', 'locked', 'timeout')
+
+
+def _percentiles(tiempos):
+    if len(tiempos) < 2:
+        valor = tiempos[0] if tiempos else 0
+        return valor, valor, valor
+    cortes = statistics.quantiles(tiempos, n=100, method='inclusive')
+    return cortes[49], cortes[94], cortes[98]
+
+
+class Cajero(threading.Thread):
+
+    def __init__(self, usuario, productos, proveedores, hasta, semilla, resultados):
+        super().__init__(daemon=True)
+        self.usuario = usuario
+        self.productos = productos
+        self.proveedores = proveedores
+        self.hasta = hasta
+        self.azar = random.Random(semilla)
+        self.resultados = resultados
+        self.vendido = {}        # id_producto -> cantidad (solo ventas confirmadas)
+        self.comprado = {}
+
+    def _registrar(self, tipo, segundos, estado):
+        self.resultados.append((tipo, segundos, estado))
+
+    def _post(self, cliente, url, datos):
+        return cliente.post(url, json.dumps(datos), content_type='application/json')
+
+    def run(self):
+        cliente = Client()
+        cliente.force_login(self.usuario)
+        tipos = [t for t, _ in MEZCLA]
+        pesos = [p for _, p in MEZCLA]
+        try:
+            while time.monotonic() < self.hasta:
+                tipo = self.azar.choices(tipos, pesos)[0]
+                inicio = time.perf_counter()
+                try:
+                    estado = getattr(self, f'_{tipo}')(cliente)
+                except Exception as e:   # Un error del servidor no debe tumbar al cajero
+                    estado = 'bloqueo' if any(b in str(e).lower() for b in BLOQUEOS) else 'error'
+                self._registrar(tipo, time.perf_counter() - inicio, estado)
+        finally:
+            connections.close_all()
+
+    def _producto(self, cliente):
+        id_producto = self.azar.choice(self.productos)
+        r = cliente.get(f'/api/producto/{id_producto}/')
+        return 'ok' if r.status_code == 200 and r.json().get('encontrado') else 'error'
+
+    def _clasificar(self, respuesta):
+        datos = respuesta.json()
+        if datos.get('status') == 'ok':
+            return 'ok'
+        mensaje = str(datos.get('mensaje', '')).lower()
+        if any(b in mensaje for b in BLOQUEOS):
+            return 'bloqueo'
+        if 'stock' in mensaje:
+            return 'sin_stock'      # Regla de negocio, no es falla del sistema
+        return 'error'
+
+    def _venta(self, cliente):
+        items = [
+            {'id': id_producto, 'cantidad': self.azar.randint(1, 3), 'precio': 10}
+            for id_producto in self.azar.sample(self.productos, self.azar.randint(1, 8))
+        ]
+        estado = self._clasificar(self._post(cliente, '/api/guardar-venta/', {
+            'items': items, 'total': sum(i['cantidad'] * 10 for i in items), 'descuento': 0,
+        }))
+        if estado == 'ok':
+            for item in items:
+                self.vendido[item['id']] = self.vendido.get(item['id'], 0) + item['cantidad']
+        return estado
+
+    def _compra(self, cliente):
+        items = [
+            {'id': id_producto, 'cantidad': self.azar.randint(5, 20), 'precio': 6}
+            for id_producto in self.azar.sample(self.productos, self.azar.randint(1, 5))
+        ]
+        estado = self._clasificar(self._post(cliente, '/api/guardar-compra/', {
+            'items': items, 'total': sum(i['cantidad'] * 6 for i in items),
+            'id_proveedor': self.azar.choice(self.proveedores),
+        }))
+        if estado == 'ok':
+            for item in items:
+                self.comprado[item['id']] = self.comprado.get(item['id'], 0) + item['cantidad']
+        return estado
+
+
+class Command(BaseCommand):
+    help = 'Simula cajeros concurrentes contra las APIs del POS en una BD de prueba y mide el rendimiento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cajeros', type=int, default=8, help='Cajeros simultáneos (default: 8)')
+        parser.add_argument('--duracion', type=float, default=20, help='Segundos de carga (default: 20)')
+        parser.add_argument('--productos', type=int, default=2000, help='Productos del catálogo de prueba (default: 2000)')
+        parser.add_argument('--stock', type=int, default=500, help='Stock inicial de cada producto (default: 500)')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del azar (mismo escenario en cada corrida)')
+        parser.add_argument('--salida', help='Guardar el resultado en este JSON (para usarlo de base)')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior para mostrar la diferencia')
+        parser.add_argument('--conservar-bd', action='store_true', help='No borrar la BD de prueba al terminar')
+
+    def handle(self, *args, **options):
+        base = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as archivo:
+                    base = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudo leer {options['comparar']}: {e}")
+
+        bd = settings.DATABASES['default']
+        if bd['ENGINE'].endswith('sqlite3') and not bd.get('TEST', {}).get('NAME'):
+            # SQLite en memoria no soporta varios hilos escribiendo: usamos un archivo temporal
+            bd.setdefault('TEST', {})['NAME'] = os.path.join(tempfile.gettempdir(), 'benchmark_pos.sqlite3')
+
+        setup_test_environment()
+        config = setup_databases(verbosity=0, interactive=False, keepdb=options['conservar_bd'])
+        try:
+            self.stdout.write(f"BD de prueba: {connection.settings_dict['NAME']} ({connection.vendor})")
+            resultado = self._correr(options)
+        finally:
+            connections.close_all()
+            teardown_databases(config, verbosity=0, keepdb=options['conservar_bd'])
+            teardown_test_environment()
+
+        self._reportar(resultado, base)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultado, archivo, indent=2)
+            self.stdout.write(f"Resultado guardado en {options['salida']}")
+
+    # --- Escenario ---
+
+    def _sembrar(self, options):
+        from core.models import User, Categoria, Producto, Proveedor
+        azar = random.Random(options['semilla'])
+        categorias = [Categoria.objects.create(nombre=f"Categoría {i}") for i in range(10)]
+        Producto.objects.bulk_create([
+            Producto(
+                nombre=f"Producto de prueba {i}",
+                categoria=azar.choice(categorias),
+                precio_compra=Decimal('6.00'),
+                precio_venta=Decimal('10.00'),
+                stock=options['stock'],
+            )
+            for i in range(options['productos'])
+        ], batch_size=1000)
+        proveedores = [
+            Proveedor.objects.create(empresa=f"Proveedor {i}", ruc=f"RUC-{i}", telefono='0', direccion='-').id_proveedor
+            for i in range(5)
+        ]
+        cajeros = [
+            User.objects.create_user(username=f"cajero{i}", password='x', role='empleado')
+            for i in range(options['cajeros'])
+        ]
+        productos = list(Producto.objects.values_list('id_producto', flat=True))
+        return cajeros, productos, proveedores
+
+    def _correr(self, options):
+        from core.models import Producto
+        cajeros, productos, proveedores = self._sembrar(options)
+        connections.close_all()
+
+        resultados = []
+        hasta = time.monotonic() + options['duracion']
+        hilos = [
+            Cajero(usuario, productos, proveedores, hasta, options['semilla'] + i, resultados)
+            for i, usuario in enumerate(cajeros)
+        ]
+        inicio = time.monotonic()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.monotonic() - inicio
+
+        # Verificación: stock final = inicial - vendido + comprado, y el kardex suma lo mismo
+        from core.kardex import auditar_rango
+        vendido, comprado = {}, {}
+        for hilo in hilos:
+            for id_producto, cantidad in hilo.vendido.items():
+                vendido[id_producto] = vendido.get(id_producto, 0) + cantidad
+            for id_producto, cantidad in hilo.comprado.items():
+                comprado[id_producto] = comprado.get(id_producto, 0) + cantidad
+        descuadres = 0
+        for id_producto, stock in Producto.objects.values_list('id_producto', 'stock'):
+            esperado = options['stock'] - vendido.get(id_producto, 0) + comprado.get(id_producto, 0)
+            if stock != esperado or stock < 0:
+                descuadres += 1
+        _, kardex = auditar_rango(min(productos), max(productos) + 1)
+        kardex_desfasado = sum(
+            1 for id_producto, stock, suma in kardex
+            if stock - options['stock'] != suma        # La siembra no deja movimiento de stock inicial
+        )
+
+        por_tipo = {}
+        for tipo, _ in MEZCLA:
+            filas = [(s, e) for t, s, e in resultados if t == tipo]
+            tiempos = sorted(s * 1000 for s, _ in filas)
+            p50, p95, p99 = _percentiles(tiempos)
+            estados = {}
+            for _, estado in filas:
+                estados[estado] = estados.get(estado, 0) + 1
+            por_tipo[tipo] = {
+                'operaciones': len(filas),
+                'por_segundo': len(filas) / duracion if duracion else 0,
+                'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+                'estados': estados,
+            }
+
+        return {
+            'motor': connection.vendor,
+            'cajeros': options['cajeros'],
+            'productos': options['productos'],
+            'duracion_s': duracion,
+            'total_por_segundo': len(resultados) / duracion if duracion else 0,
+            'por_tipo': por_tipo,
+            'stock_descuadrado': descuadres,
+            'kardex_descuadrado': kardex_desfasado,
+            'vendido_total': float(sum(vendido.values())),
+        }
+
+    # --- Reporte ---
+
+    def _reportar(self, r, base=None):
+        def diferencia(valor, anterior, menor_es_mejor=True):
+            if anterior in (None, 0):
+                return ''
+            cambio = (valor - anterior) / anterior * 100
+            mejor = cambio < 0 if menor_es_mejor else cambio > 0
+            texto = f" ({cambio:+.0f}%)"
+            return self.style.SUCCESS(texto) if mejor else self.style.WARNING(texto)
+
+        self.stdout.write(
+            f"\n{r['cajeros']} cajeros, {r['productos']} productos, {r['duracion_s']:.1f}s en {r['motor']}"
+        )
+        self.stdout.write(f"{'API':<10}{'ops':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  estados")
+        for tipo, d in r['por_tipo'].items():
+            anterior = (base or {}).get('por_tipo', {}).get(tipo, {})
+            self.stdout.write(
+                f"{tipo:<10}{d['operaciones']:>8}{d['por_segundo']:>10.1f}"
+                f"{d['p50_ms']:>10.1f}{d['p95_ms']:>10.1f}{d['p99_ms']:>10.1f}  {d['estados']}"
+                + diferencia(d['p95_ms'], anterior.get('p95_ms'))
+            )
+        total = diferencia(r['total_por_segundo'], (base or {}).get('total_por_segundo'), menor_es_mejor=False)
+        self.stdout.write(f"Total: {r['total_por_segundo']:.1f} ops/s{total}")
+
+        bloqueos = sum(d['estados'].get('bloqueo', 0) for d in r['por_tipo'].values())
+        errores = sum(d['estados'].get('error', 0) for d in r['por_tipo'].values())
+        self.stdout.write(f"Errores de bloqueo: {bloqueos} · otros errores: {errores}")
+        if r['stock_descuadrado'] or r['kardex_descuadrado']:
+            self.stdout.write(self.style.ERROR(
+                f"STOCK INCORRECTO: {r['stock_descuadrado']} productos no cuadran con lo vendido/comprado, "
+                f"{r['kardex_descuadrado']} no cuadran con el kardex"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("Stock correcto: cuadra con las ventas, compras y el kardex."))
@@ -0,0 +1,122 @@
+import datetime
+import statistics
+import time
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from core.models import User, Producto, Movimiento
+
+# ==========================================
+# BENCHMARK DE VISTAS: ANTES / DESPUÉS DE LOS ÍNDICES
+# ==========================================
+# Mide las pantallas pesadas con los índices actuales, vuelve la BD a la
+# migración --antes (sin los índices nuevos), mide otra vez y deja la BD
+# como estaba. Usar sobre una COPIA con volumen (ver `manage.py generar_datos`):
+# crear índices sobre millones de filas tarda y bloquea las tablas.
+#
+#   python manage.py benchmark_vistas --antes 0015_kardex_saldos --repeticiones 5
+
+APP = 'core'
+
+
+class Command(BaseCommand):
+    help = 'Tiempos de home, reportes, kardex e inventario con y sin los índices de una migración'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--antes', default='0015_kardex_saldos', help='Migración "sin índices" (default: 0015_kardex_saldos)')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Requests por vista, se informa la mediana (default: 5)')
+        parser.add_argument('--usuario', help='Usuario admin con el que se piden las vistas (default: el primero)')
+        parser.add_argument('--solo-actual', action='store_true', help='Medir solo el estado actual, sin migrar')
+
+    def handle(self, *args, **options):
+        admin = User.objects.filter(role='admin', is_active=True)
+        if options['usuario']:
+            admin = admin.filter(username=options['usuario'])
+        admin = admin.order_by('pk').first()
+        if admin is None:
+            raise CommandError('Se necesita un usuario con rol admin (o indique --usuario)')
+
+        executor = MigrationExecutor(connection)
+        actual = executor.loader.applied_migrations
+        ultima = max(nombre for app, nombre in actual if app == APP)
+        if not options['solo_actual'] and (APP, options['antes']) not in executor.loader.graph.nodes:
+            raise CommandError(f"No existe la migración {APP}.{options['antes']}")
+
+        vistas = self._vistas()
+        setup_test_environment(debug=False)
+        try:
+            despues = self._medir(admin, vistas, options['repeticiones'])
+            antes = None
+            if not options['solo_actual']:
+                inicio = time.monotonic()
+                call_command('migrate', APP, options['antes'], verbosity=0)
+                self.stdout.write(f"Índices quitados ({APP}.{options['antes']}) en {time.monotonic() - inicio:.1f}s")
+                try:
+                    antes = self._medir(admin, vistas, options['repeticiones'])
+                finally:
+                    inicio = time.monotonic()
+                    call_command('migrate', APP, ultima, verbosity=0)
+                    self.stdout.write(f"Índices restaurados ({APP}.{ultima}) en {time.monotonic() - inicio:.1f}s")
+        finally:
+            teardown_test_environment()
+
+        self._reportar(vistas, antes, despues, ultima)
+
+    def _vistas(self):
+        """(título, nombre de URL, args, querystring) de las pantallas a medir"""
+        hoy = timezone.localdate()
+        ultimo = Movimiento.objects.order_by('-id').values_list('producto_id', flat=True).first()
+        if ultimo is None:
+            raise CommandError('La BD no tiene movimientos: cargue datos con `manage.py generar_datos`')
+        categoria = Producto.objects.exclude(categoria=None).values_list('categoria_id', flat=True).first()
+        return [
+            ('home (dashboard)', 'home', [], {}),
+            ('reporte financiero (mes)', 'reporte_financiero', [], {}),
+            ('reporte financiero (1 año)', 'reporte_financiero', [], {
+                'fecha_inicio': (hoy - datetime.timedelta(days=365)).isoformat(), 'fecha_fin': hoy.isoformat(),
+            }),
+            ('kardex del producto', 'historial_producto', [ultimo], {}),
+            ('kardex con stock a fecha', 'historial_producto', [ultimo], {
+                'fecha': (hoy - datetime.timedelta(days=180)).isoformat(),
+            }),
+            ('inventario', 'lista_productos', [], {}),
+            ('inventario por categoría', 'lista_productos', [], {'categoria': categoria}),
+            ('papelera', 'lista_productos', [], {'estado': 'inactivos'}),
+        ]
+
+    def _medir(self, admin, vistas, repeticiones):
+        cliente = Client()
+        cliente.force_login(admin)
+        resultados = {}
+        for titulo, nombre, args, parametros in vistas:
+            cliente.get(reverse(nombre, args=args), parametros)     # Calienta las páginas de la BD (no cuenta)
+            tiempos = []
+            for _ in range(repeticiones):
+                cache.clear()       # Siempre en frío: el dashboard y el catálogo se arman de nuevo
+                with CaptureQueriesContext(connection) as consultas:
+                    inicio = time.perf_counter()
+                    respuesta = cliente.get(reverse(nombre, args=args), parametros)
+                    tiempos.append(time.perf_counter() - inicio)
+                if respuesta.status_code != 200:
+                    raise CommandError(f"{titulo} respondió {respuesta.status_code}")
+            resultados[titulo] = (statistics.median(tiempos) * 1000, len(consultas))
+            self.stdout.write(f"  {titulo}: {resultados[titulo][0]:.1f} ms")
+        return resultados
+
+    def _reportar(self, vistas, antes, despues, ultima):
+        self.stdout.write(f"\n{'Vista':<30}{'antes ms':>12}{'después ms':>12}{'mejora':>9}{'consultas':>11}")
+        for titulo, *_ in vistas:
+            ms, consultas = despues[titulo]
+            if antes:
+                ms_antes = antes[titulo][0]
+                mejora = f"{ms_antes / ms:.1f}x" if ms else '-'
+                self.stdout.write(f"{titulo:<30}{ms_antes:>12.1f}{ms:>12.1f}{mejora:>9}{consultas:>11}")
+            else:
+                self.stdout.write(f"{titulo:<30}{'-':>12}{ms:>12.1f}{'-':>9}{consultas:>11}")
+        self.stdout.write(self.style.SUCCESS(f"Medido con {APP}.{ultima} aplicada."))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, F
+from django.db.models.functions import Coalesce
+from core.models import DetalleVenta, DetalleCompra
+
+
+class Command(BaseCommand):
+    help = 'Completa DetalleVenta.costo_unitario de ventas viejas usando el historial de compras'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=2000, help='Filas por lote (default: 2000)')
+        parser.add_argument('--todos', action='store_true', help='Recalcular también las filas que ya tienen costo')
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+
+        # Último costo pagado por el producto ANTES (o el mismo momento) de la venta.
+        # Si nunca se compró por el sistema, usamos el costo actual del producto.
+        ultimo_costo = DetalleCompra.objects.filter(
+            producto=OuterRef('producto'),
+            compra__fecha_compra__lte=OuterRef('venta__fecha_venta')
+        ).order_by('-compra__fecha_compra', '-id_detalle_compra').values('costo_unitario')[:1]
+
+        pendientes = DetalleVenta.objects.all()
+        if not options['todos']:
+            pendientes = pendientes.filter(costo_unitario__isnull=True)
+
+        ultimo_id = 0
+        total = 0
+        while True:
+            # Paginamos por ID (keyset) para que cada lote cueste lo mismo
+            filas = list(
+                pendientes.filter(id_detalle_venta__gt=ultimo_id)
+                .order_by('id_detalle_venta')
+                .annotate(costo=Coalesce(Subquery(ultimo_costo), F('producto__precio_compra')))
+                .only('id_detalle_venta')[:lote]
+            )
+            if not filas:
+                break
+
+            for fila in filas:
+                fila.costo_unitario = fila.costo
+            with transaction.atomic():
+                DetalleVenta.objects.bulk_update(filas, ['costo_unitario'])
+
+            ultimo_id = filas[-1].id_detalle_venta
+            total += len(filas)
+            self.stdout.write(f"  ... {total} líneas actualizadas (hasta ID {ultimo_id})")
+
+        self.stdout.write(self.style.SUCCESS(f"Listo: {total} líneas de venta con costo."))
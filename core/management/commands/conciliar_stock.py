@@ -0,0 +1,109 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Min, Max
+from core.models import Producto, Movimiento, User
+from core.kardex import auditar_rango
+from core import cache_dashboard
+
+
+def _iniciar_proceso():
+    # Con 'spawn' (Windows) el proceso nace sin Django configurado.
+    # Con 'fork' hereda las conexiones del padre: las descartamos sin cerrarlas.
+    if not django.apps.apps.ready:
+        django.setup()
+    for conexion in connections.all(initialized_only=True):
+        conexion.connection = None
+
+
+class Command(BaseCommand):
+    help = 'Compara el stock de cada producto con la suma de su kardex y opcionalmente registra ajustes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1, help='Procesos en paralelo (default: núcleos)')
+        parser.add_argument('--rango', type=int, default=5000, help='IDs de producto por tarea (default: 5000)')
+        parser.add_argument('--corregir', action='store_true', help='Registrar ajustes en el kardex para que cuadre con el stock')
+        parser.add_argument('--usuario', help='Usuario responsable de los ajustes (default: primer admin)')
+        parser.add_argument('--mostrar', type=int, default=50, help='Diferencias a listar (default: 50)')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        limites = Producto.objects.aggregate(desde=Min('id_producto'), hasta=Max('id_producto'))
+        if limites['desde'] is None:
+            self.stdout.write("No hay productos.")
+            return
+
+        paso = options['rango']
+        rangos = [(i, i + paso) for i in range(limites['desde'], limites['hasta'] + 1, paso)]
+
+        revisados = 0
+        diferencias = []
+        if options['procesos'] > 1 and len(rangos) > 1:
+            # Los hijos abren sus propias conexiones; el padre no comparte la suya
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['procesos'], initializer=_iniciar_proceso) as pool:
+                for n, difs in pool.map(auditar_rango, *zip(*rangos)):
+                    revisados += n
+                    diferencias.extend(difs)
+        else:
+            for desde, hasta in rangos:
+                n, difs = auditar_rango(desde, hasta)
+                revisados += n
+                diferencias.extend(difs)
+        diferencias.sort()
+
+        for id_producto, stock, esperado in diferencias[:options['mostrar']]:
+            self.stdout.write(f"  #{id_producto}: stock {stock}, kardex {esperado} (diferencia {stock - esperado:+})")
+        if len(diferencias) > options['mostrar']:
+            self.stdout.write(f"  ... y {len(diferencias) - options['mostrar']} más")
+
+        self.stdout.write(
+            f"{revisados} productos revisados en {len(rangos)} rangos, {len(diferencias)} no cuadran "
+            f"({time.monotonic() - inicio:.1f}s)."
+        )
+
+        if options['corregir'] and diferencias:
+            usuario = self._usuario(options['usuario'])
+            total = self._corregir(usuario, diferencias)
+            self.stdout.write(self.style.SUCCESS(f"Listo: {total} ajustes registrados a nombre de {usuario.username}."))
+
+    def _usuario(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"No existe el usuario '{username}'")
+        usuario = User.objects.filter(role='admin').order_by('id').first()
+        if usuario is None:
+            raise CommandError("No hay usuarios admin, indique --usuario")
+        return usuario
+
+    def _corregir(self, usuario, diferencias, lote=1000):
+        """El stock físico manda: el ajuste hace que el kardex llegue a Producto.stock"""
+        total = 0
+        for i in range(0, len(diferencias), lote):
+            grupo = {id_producto: stock - esperado for id_producto, stock, esperado in diferencias[i:i + lote]}
+            with transaction.atomic():
+                # Una venta entre la auditoría y ahora mueve stock y kardex por igual:
+                # la diferencia se mantiene, solo releemos el stock para el saldo.
+                stocks = dict(
+                    Producto.objects.select_for_update().filter(id_producto__in=list(grupo))
+                    .values_list('id_producto', 'stock')
+                )
+                Movimiento.objects.bulk_create([
+                    Movimiento(
+                        producto_id=id_producto,
+                        usuario=usuario,
+                        tipo='ajuste_pos' if diferencia > 0 else 'ajuste_neg',
+                        cantidad=abs(diferencia),
+                        saldo=stocks[id_producto],
+                        descripcion="Conciliación de stock contra kardex"
+                    )
+                    for id_producto, diferencia in grupo.items() if id_producto in stocks
+                ], batch_size=lote)
+            total += len(grupo)
+        cache_dashboard.invalidar()   # bulk_create no dispara las señales
+        return total
@@ -0,0 +1,33 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.kardex import generar_corte, cortes_pendientes, reconstruir_saldos, fin_del_dia
+
+
+class Command(BaseCommand):
+    help = 'Guarda los cortes de stock de fin de mes (puntos de control del kardex). Correr una vez al mes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasta', help='Último día a cubrir, AAAA-MM-DD (default: fin del mes pasado)')
+        parser.add_argument('--saldos', action='store_true', help='Recalcular antes el saldo de cada movimiento')
+        parser.add_argument('--lote', type=int, default=500, help='Productos por lote al recalcular saldos (default: 500)')
+
+    def handle(self, *args, **options):
+        if options['saldos']:
+            total = reconstruir_saldos(options['lote'])
+            self.stdout.write(f"Saldos recalculados: {total} movimientos.")
+
+        if options['hasta']:
+            try:
+                dia = datetime.datetime.strptime(options['hasta'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Fecha inválida (use AAAA-MM-DD)')
+        else:
+            dia = timezone.localdate().replace(day=1) - datetime.timedelta(days=1)
+
+        pendientes = cortes_pendientes(fin_del_dia(dia))
+        for hasta in pendientes:
+            cantidad = generar_corte(hasta)
+            self.stdout.write(f"  Corte {timezone.localdate(hasta)}: {cantidad} productos")
+
+        self.stdout.write(self.style.SUCCESS(f"Listo: {len(pendientes)} cortes nuevos."))
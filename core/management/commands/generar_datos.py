@@ -0,0 +1,396 @@
+import datetime
+import math
+import random
+import time
+from decimal import Decimal
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from core.models import (
+    User, Categoria, Proveedor, Producto, Cliente, Venta, DetalleVenta, Compra, DetalleCompra, Movimiento,
+)
+from core import cache_dashboard, alertas
+from core.buscador import indice
+
+# ==========================================
+# GENERADOR DE DATOS SINTÉTICOS
+# ==========================================
+# Llena la BD con un negocio "de mentira" pero creíble para probar rendimiento
+# con volúmenes de producción: catálogo grande con mezcla de unidades, clientes,
+# y años de ventas y compras con temporada, días de pago y crecimiento anual.
+#
+# - Misma --semilla = mismos datos (se puede repetir una medición).
+# - Catálogo y clientes van con bulk_create por lotes, con IDs puestos a mano
+#   (MariaDB no devuelve los IDs de un INSERT masivo). El historial (millones
+#   de filas) va como tuplas con executemany: armar un objeto del modelo por
+#   fila es lo que más demora en bulk_create.
+# - El stock se simula en memoria: ninguna venta deja stock negativo, se repone
+#   al bajar del mínimo y cada movimiento del kardex lleva su saldo exacto.
+# - Solo AGREGA datos (no borra nada). Los productos viejos no se tocan.
+#
+#   python manage.py generar_datos --productos 200000 --anios 3 --ventas-dia 2500
+
+CENTAVO = Decimal('0.01')
+
+CATEGORIAS = (
+    'Herramientas Manuales', 'Herramientas Eléctricas', 'Tornillería', 'Clavos y Grapas', 'Plomería',
+    'Electricidad', 'Iluminación', 'Pinturas', 'Brochas y Rodillos', 'Cemento y Agregados',
+    'Hierro y Varillas', 'Madera', 'Láminas y Techos', 'Cerrajería', 'Jardinería', 'Adhesivos',
+    'Seguridad Industrial', 'Tuberías PVC', 'Cables', 'Baño y Cocina', 'Mangueras', 'Limpieza',
+    'Abrasivos', 'Soldadura', 'Fijaciones', 'Escaleras', 'Automotriz', 'Vidrios', 'Pisos', 'Impermeabilizantes',
+)
+ARTICULOS = (
+    'Tornillo', 'Clavo', 'Tuerca', 'Arandela', 'Martillo', 'Destornillador', 'Alicate', 'Llave', 'Cinta',
+    'Tubo', 'Codo', 'Válvula', 'Cable', 'Interruptor', 'Bombillo', 'Pintura', 'Brocha', 'Rodillo', 'Lija',
+    'Disco', 'Broca', 'Candado', 'Bisagra', 'Manguera', 'Pegamento', 'Silicón', 'Guante', 'Varilla', 'Lámina',
+)
+MATERIALES = ('galvanizado', 'de acero', 'de bronce', 'de PVC', 'de cobre', 'inoxidable', 'plástico', 'reforzado', 'industrial', 'económico')
+MEDIDAS = ('1/4"', '3/8"', '1/2"', '3/4"', '1"', '2"', '3"', '#8', '#10', '#12', 'pequeño', 'mediano', 'grande')
+NOMBRES = ('José', 'María', 'Juan', 'Ana', 'Carlos', 'Rosa', 'Luis', 'Carmen', 'Pedro', 'Martha', 'Jorge', 'Isabel', 'Miguel', 'Elena')
+APELLIDOS = ('López', 'García', 'Martínez', 'Hernández', 'González', 'Pérez', 'Rodríguez', 'Sánchez', 'Ramírez', 'Flores', 'Cruz', 'Reyes')
+
+# (unidad, peso en el catálogo, cantidades típicas por línea de venta)
+UNIDADES = (
+    ('unidad', 60, ('1', '1', '1', '2', '2', '3', '4', '6', '10', '12')),
+    ('caja', 8, ('1', '1', '1', '2')),
+    ('metro', 12, ('0.5', '1', '1.5', '2', '3', '5', '10', '20')),
+    ('libra', 8, ('0.5', '1', '1', '2', '3', '5')),
+    ('kg', 5, ('0.5', '1', '2', '5')),
+    ('litro', 4, ('1', '1', '2', '4')),
+    ('galon', 3, ('1', '1', '1', '2', '5')),
+)
+
+# Factores de temporada: verano (ene-abr) se construye más, lluvias (sep-oct) baja, diciembre sube
+MESES = (1.05, 1.10, 1.15, 1.15, 1.00, 0.90, 0.90, 0.95, 0.85, 0.85, 1.00, 1.25)
+DIAS_SEMANA = (1.00, 0.95, 0.95, 1.00, 1.10, 1.25, 0.45)     # lunes ... domingo
+HORAS = (7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17)
+PESO_HORAS = (4, 8, 10, 10, 9, 6, 7, 9, 9, 8, 5)
+CRECIMIENTO_ANUAL = 0.08
+
+# Columnas de las tablas del historial, en el orden de las tuplas que arma _simular
+HISTORIAL = {
+    Compra: ('id_compra', 'proveedor', 'usuario', 'total', 'fecha_compra'),
+    DetalleCompra: ('id_detalle_compra', 'compra', 'producto', 'cantidad', 'costo_unitario', 'subtotal'),
+    Venta: ('id_venta', 'usuario', 'cliente', 'descuento', 'total', 'fecha_venta'),
+    DetalleVenta: ('id_detalle_venta', 'venta', 'producto', 'cantidad', 'precio_unitario', 'subtotal', 'costo_unitario'),
+    Movimiento: ('producto', 'usuario', 'tipo', 'cantidad', 'fecha', 'descripcion', 'saldo'),
+}
+
+
+def siguiente_id(modelo):
+    return (modelo.objects.aggregate(m=Max(modelo._meta.pk.name))['m'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = 'Genera un negocio sintético (catálogo, clientes, años de ventas y compras) para pruebas de rendimiento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=20000, help='Productos nuevos (default: 20000)')
+        parser.add_argument('--categorias', type=int, default=30, help='Categorías (default: 30)')
+        parser.add_argument('--proveedores', type=int, default=50, help='Proveedores nuevos (default: 50)')
+        parser.add_argument('--clientes', type=int, default=5000, help='Clientes nuevos (default: 5000)')
+        parser.add_argument('--cajeros', type=int, default=5, help='Usuarios cajeros (default: 5)')
+        parser.add_argument('--anios', type=float, default=2, help='Años de historia (default: 2)')
+        parser.add_argument('--hasta', help='Último día simulado, AAAA-MM-DD (default: ayer)')
+        parser.add_argument('--ventas-dia', type=int, default=300, help='Ventas en un día promedio (default: 300)')
+        parser.add_argument('--lineas', type=float, default=4, help='Líneas promedio por venta (default: 4)')
+        parser.add_argument('--con-cliente', type=float, default=0.4, help='Fracción de ventas con cliente registrado (default: 0.4)')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del azar (default: 42)')
+        parser.add_argument('--lote', type=int, default=20000, help='Líneas de venta por transacción (default: 20000)')
+        parser.add_argument('--sin-resumen', action='store_true', help='No reconstruir ResumenDiario al final')
+
+    def handle(self, *args, **options):
+        if options['productos'] < 1 or options['ventas_dia'] < 1 or options['lineas'] < 1:
+            raise CommandError('--productos, --ventas-dia y --lineas deben ser positivos')
+        if options['hasta']:
+            try:
+                hasta = datetime.datetime.strptime(options['hasta'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Fecha inválida (use AAAA-MM-DD)')
+        else:
+            hasta = timezone.localdate() - datetime.timedelta(days=1)
+        desde = hasta - datetime.timedelta(days=int(options['anios'] * 365))
+
+        self.azar = random.Random(options['semilla'])
+        self.lote = options['lote']
+        self.zona = timezone.get_current_timezone()
+        inicio = time.monotonic()
+        self._acelerar()
+
+        self._maestros(options, desde)
+        totales = self._simular(options, desde, hasta)
+        self._cerrar()
+
+        segundos = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo en {segundos:.0f}s: {totales['ventas']:,} ventas, {totales['lineas']:,} líneas de venta, "
+            f"{totales['compras']:,} compras, {totales['movimientos']:,} movimientos "
+            f"({(totales['lineas'] + totales['movimientos']) / max(segundos, 1):,.0f} filas/s)"
+        ))
+
+        if not options['sin_resumen']:
+            call_command('reconstruir_resumen', stdout=self.stdout)
+        alertas.reconstruir(origen="Datos generados")
+        indice.invalidar()
+        cache_dashboard.invalidar()
+
+    def _acelerar(self):
+        """
+        Carga masiva: sin revisar llaves foráneas fila por fila (los IDs los pone
+        el generador), y en SQLite sin fsync. Solo afecta a esta conexión.
+        """
+        connection.disable_constraint_checking()
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous = OFF')
+                cursor.execute('PRAGMA journal_mode = MEMORY')
+                cursor.execute('PRAGMA cache_size = -200000')   # ~200 MB de páginas en memoria
+
+    def _cerrar(self):
+        connection.enable_constraint_checking()
+
+    # --- Catálogo, clientes y usuarios ---
+
+    def _maestros(self, options, desde):
+        azar = self.azar
+        momento = connection.ops.adapt_datetimefield_value(
+            datetime.datetime.combine(desde, datetime.time(6), tzinfo=self.zona)
+        )
+
+        self.cajeros = []
+        for i in range(1, options['cajeros'] + 1):
+            usuario = User.objects.filter(username=f"cajero{i}").first()
+            if usuario is None:
+                usuario = User.objects.create_user(f"cajero{i}", password=None, first_name=azar.choice(NOMBRES))
+            self.cajeros.append(usuario.pk)
+
+        existentes = Categoria.objects.in_bulk(field_name='nombre')
+        nombres = [
+            CATEGORIAS[i % len(CATEGORIAS)] + (f" {i // len(CATEGORIAS) + 1}" if i >= len(CATEGORIAS) else '')
+            for i in range(options['categorias'])
+        ]
+        Categoria.objects.bulk_create([Categoria(nombre=n) for n in nombres if n not in existentes])
+        categorias = list(Categoria.objects.filter(nombre__in=nombres).values_list('id_categoria', flat=True))
+
+        id_proveedor = siguiente_id(Proveedor)
+        self.proveedores = {}
+        for i in range(id_proveedor, id_proveedor + max(options['proveedores'], 1)):
+            self.proveedores[i] = f"Distribuidora {azar.choice(APELLIDOS)} #{i}"
+        Proveedor.objects.bulk_create([
+            Proveedor(id_proveedor=i, empresa=empresa, ruc=f"J{i:013d}", telefono=f"2{azar.randint(2000000, 9999999)}",
+                      direccion='Managua')
+            for i, empresa in self.proveedores.items()
+        ], batch_size=1000)
+        ids_proveedor = list(self.proveedores)
+
+        # Catálogo: popularidad tipo Zipf (pocos productos venden mucho)
+        n = options['productos']
+        lineas_dia = options['ventas_dia'] * options['lineas']
+        pesos = [1 / (r + 10) ** 0.9 for r in range(n)]
+        azar.shuffle(pesos)
+        suma = sum(pesos)
+        unidades = [u for u, _, _ in UNIDADES]
+        pesos_unidad = [p for _, p, _ in UNIDADES]
+        self.cantidades = {u: [Decimal(c) for c in cs] for u, _, cs in UNIDADES}
+
+        primero = siguiente_id(Producto)
+        self.ids = list(range(primero, primero + n))
+        self.precio, self.costo, self.unidad, self.stock, self.minimo, self.proveedor = [], [], [], [], [], []
+        productos, movimientos = [], []
+        for i, id_producto in enumerate(self.ids):
+            unidad = azar.choices(unidades, pesos_unidad)[0]
+            costo = Decimal(min(max(math.exp(azar.gauss(2.3, 1.1)), 0.5), 5000)).quantize(CENTAVO)
+            precio = (costo * Decimal(azar.uniform(1.2, 1.6))).quantize(CENTAVO)
+            # Mínimo = una semana de demanda esperada; se arranca con 2 a 6 semanas
+            demanda = lineas_dia * pesos[i] / suma * 7
+            minimo = Decimal(max(5, math.ceil(demanda)))
+            stock = minimo * azar.randint(2, 6)
+            self.precio.append(precio)
+            self.costo.append(costo)
+            self.unidad.append(unidad)
+            self.stock.append(stock)
+            self.minimo.append(minimo)
+            self.proveedor.append(azar.choice(ids_proveedor))
+            productos.append(Producto(
+                id_producto=id_producto,
+                nombre=f"{azar.choice(ARTICULOS)} {azar.choice(MATERIALES)} {azar.choice(MEDIDAS)} M{id_producto}",
+                categoria_id=azar.choice(categorias),
+                precio_compra=costo, precio_venta=precio, stock=stock, stock_minimo=minimo, unidad=unidad,
+            ))
+            movimientos.append((id_producto, self.cajeros[0], 'ajuste_pos', stock, momento, "Stock inicial", stock))
+            if len(productos) >= self.lote:
+                self._guardar((Producto, productos), (Movimiento, movimientos))
+                productos, movimientos = [], []
+        self._guardar((Producto, productos), (Movimiento, movimientos))
+        self.acumulado = list(pesos)
+        for i in range(1, n):
+            self.acumulado[i] += self.acumulado[i - 1]
+        self.stdout.write(f"Catálogo: {n:,} productos, {len(categorias)} categorías, {len(ids_proveedor)} proveedores")
+
+        primero = siguiente_id(Cliente)
+        self.clientes = list(range(primero, primero + options['clientes']))
+        clientes = []
+        for id_cliente in self.clientes:
+            clientes.append(Cliente(
+                id_cliente=id_cliente,
+                nombres=f"{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)} {azar.choice(APELLIDOS)}",
+                cedula_ruc=f"001-{azar.randint(10160, 311299):06d}-{id_cliente:07d}" if azar.random() < 0.6 else None,
+                telefono=f"8{azar.randint(1000000, 9999999)}",
+            ))
+            if len(clientes) >= self.lote:
+                self._guardar((Cliente, clientes))
+                clientes = []
+        self._guardar((Cliente, clientes))
+        self.acumulado_clientes = [1 / (r + 20) ** 0.8 for r in range(len(self.clientes))]
+        for i in range(1, len(self.clientes)):
+            self.acumulado_clientes[i] += self.acumulado_clientes[i - 1]
+        self.stdout.write(f"Clientes: {len(self.clientes):,}")
+
+    def _guardar(self, *tablas):
+        """
+        Inserta los lotes pendientes en orden (primero los padres) en una sola transacción.
+        Objetos del modelo -> bulk_create; tuplas (tablas de HISTORIAL) -> executemany.
+        """
+        with transaction.atomic(), connection.cursor() as cursor:
+            for modelo, filas in tablas:
+                if not filas:
+                    continue
+                if isinstance(filas[0], tuple):
+                    campos = [modelo._meta.get_field(c).column for c in HISTORIAL[modelo]]
+                    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+                        connection.ops.quote_name(modelo._meta.db_table),
+                        ', '.join(connection.ops.quote_name(c) for c in campos),
+                        ', '.join(['%s'] * len(campos)),
+                    )
+                    for i in range(0, len(filas), 1000):
+                        cursor.executemany(sql, filas[i:i + 1000])
+                else:
+                    modelo.objects.bulk_create(filas, batch_size=1000)
+
+    def _actualizar(self, modelo, campos, filas):
+        """UPDATE por PK con executemany (bulk_update arma un CASE por fila y no escala a 200k)"""
+        q = connection.ops.quote_name
+        sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+            q(modelo._meta.db_table),
+            ', '.join(f"{q(modelo._meta.get_field(c).column)} = %s" for c in campos),
+            q(modelo._meta.pk.column),
+        )
+        with transaction.atomic(), connection.cursor() as cursor:
+            for i in range(0, len(filas), 1000):
+                cursor.executemany(sql, filas[i:i + 1000])
+
+    # --- Historia de ventas y compras ---
+
+    def _simular(self, options, desde, hasta):
+        azar = self.azar
+        ids, precio, costo, unidad, stock, minimo = self.ids, self.precio, self.costo, self.unidad, self.stock, self.minimo
+        posiciones = range(len(ids))
+        clientes = self.clientes
+        media_lineas = options['lineas'] - 1
+        totales = {'ventas': 0, 'lineas': 0, 'compras': 0, 'movimientos': 0}
+        estadisticas = {}               # id_cliente -> [compras, gastado, última]
+
+        id_venta, id_detalle = siguiente_id(Venta), siguiente_id(DetalleVenta)
+        id_compra, id_detalle_compra = siguiente_id(Compra), siguiente_id(DetalleCompra)
+        ventas, detalles, compras, detalles_compra, movimientos = [], [], [], [], []
+        reponer = set()
+        adaptar = connection.ops.adapt_datetimefield_value
+
+        dia, mes = desde, None
+        while dia <= hasta:
+            if mes != (dia.year, dia.month) and mes is not None:
+                self.stdout.write(f"  {mes[0]}-{mes[1]:02d}: {totales['ventas']:,} ventas, {totales['lineas']:,} líneas")
+            mes = (dia.year, dia.month)
+
+            factor = MESES[dia.month - 1] * DIAS_SEMANA[dia.weekday()]
+            factor *= 1 + CRECIMIENTO_ANUAL * (dia - desde).days / 365
+            if dia.day in (14, 15, 16, 28, 29, 30, 31):
+                factor *= 1.15       # Quincena
+            cantidad_ventas = max(0, round(azar.gauss(options['ventas_dia'] * factor, options['ventas_dia'] * factor * 0.1)))
+            apertura = datetime.datetime.combine(dia, datetime.time(0), tzinfo=self.zona)
+            segundos = sorted(
+                h * 3600 + azar.randrange(3600) for h in azar.choices(HORAS, PESO_HORAS, k=cantidad_ventas)
+            )
+
+            for segundo in segundos:
+                fecha = apertura + datetime.timedelta(seconds=segundo)
+                fecha_bd = adaptar(fecha)
+                k = min(1 + int(azar.expovariate(1 / media_lineas)) if media_lineas > 0 else 1, 40)
+                elegidos = dict.fromkeys(azar.choices(posiciones, cum_weights=self.acumulado, k=k))
+                usuario = azar.choice(self.cajeros)
+                subtotal = Decimal(0)
+                lineas = []
+                for p in elegidos:
+                    cantidad = azar.choice(self.cantidades[unidad[p]])
+                    if stock[p] < cantidad:
+                        reponer.add(p)
+                        continue     # Sin existencias: el cliente se lleva otra cosa
+                    stock[p] -= cantidad
+                    if stock[p] < minimo[p]:
+                        reponer.add(p)
+                    importe = (cantidad * precio[p]).quantize(CENTAVO)
+                    subtotal += importe
+                    lineas.append((p, cantidad, importe, stock[p]))
+                if not lineas:
+                    continue
+
+                descuento = (subtotal * Decimal('0.05')).quantize(CENTAVO) if azar.random() < 0.05 else Decimal(0)
+                total = subtotal - descuento
+                id_cliente = None
+                if azar.random() < options['con_cliente'] and clientes:
+                    id_cliente = clientes[azar.choices(range(len(clientes)), cum_weights=self.acumulado_clientes)[0]]
+                    datos = estadisticas.setdefault(id_cliente, [0, Decimal(0), None])
+                    datos[0] += 1
+                    datos[1] += total
+                    datos[2] = fecha
+                ventas.append((id_venta, usuario, id_cliente, descuento, total, fecha_bd))
+                descripcion = f"Venta #{id_venta}"
+                for p, cantidad, importe, saldo in lineas:
+                    detalles.append((id_detalle, id_venta, ids[p], cantidad, precio[p], importe, costo[p]))
+                    movimientos.append((ids[p], usuario, 'salida', cantidad, fecha_bd, descripcion, saldo))
+                    id_detalle += 1
+                id_venta += 1
+                totales['ventas'] += 1
+                totales['lineas'] += len(lineas)
+
+            # Cierre del día: un pedido por proveedor con lo que quedó bajo el mínimo
+            if reponer:
+                fecha_bd = adaptar(apertura + datetime.timedelta(hours=17, minutes=30))
+                por_proveedor = {}
+                for p in sorted(reponer):
+                    por_proveedor.setdefault(self.proveedor[p], []).append(p)
+                for id_proveedor, pedido in por_proveedor.items():
+                    total = Decimal(0)
+                    descripcion = f"Compra a {self.proveedores[id_proveedor]}"
+                    for p in pedido:
+                        cantidad = minimo[p] * azar.randint(2, 4)
+                        stock[p] += cantidad
+                        importe = (cantidad * costo[p]).quantize(CENTAVO)
+                        total += importe
+                        detalles_compra.append((id_detalle_compra, id_compra, ids[p], cantidad, costo[p], importe))
+                        movimientos.append((ids[p], self.cajeros[0], 'entrada', cantidad, fecha_bd, descripcion, stock[p]))
+                        id_detalle_compra += 1
+                    compras.append((id_compra, id_proveedor, self.cajeros[0], total, fecha_bd))
+                    id_compra += 1
+                    totales['compras'] += 1
+                reponer = set()
+
+            if len(detalles) >= self.lote:
+                totales['movimientos'] += len(movimientos)
+                self._guardar((Compra, compras), (DetalleCompra, detalles_compra), (Venta, ventas),
+                              (DetalleVenta, detalles), (Movimiento, movimientos))
+                ventas, detalles, compras, detalles_compra, movimientos = [], [], [], [], []
+            dia += datetime.timedelta(days=1)
+
+        totales['movimientos'] += len(movimientos)
+        self._guardar((Compra, compras), (DetalleCompra, detalles_compra), (Venta, ventas),
+                      (DetalleVenta, detalles), (Movimiento, movimientos))
+
+        # Stock final y estadísticas de clientes (mismo resultado que reconciliar_clientes)
+        self._actualizar(Producto, ('stock',), [(stock[p], ids[p]) for p in posiciones])
+        self._actualizar(Cliente, ('num_compras', 'total_gastado', 'ultima_compra'), [
+            (n, gastado, adaptar(ultima), id_cliente) for id_cliente, (n, gastado, ultima) in estadisticas.items()
+        ])
+        return totales
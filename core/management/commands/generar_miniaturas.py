@@ -0,0 +1,60 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.core.management.base import BaseCommand
+from core.models import Producto
+from core import miniaturas
+
+
+def _iniciar_proceso():
+    # Con 'spawn' (Windows) el proceso nace sin Django configurado
+    if not django.apps.apps.ready:
+        django.setup()
+
+
+def _generar(nombre, forzar):
+    try:
+        return nombre, miniaturas.generar(nombre, forzar), None
+    except Exception as e:
+        return nombre, 0, str(e)
+
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas que falten para las fotos de productos ya subidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Regenerar también las que ya existen')
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1, help='Procesos en paralelo (default: núcleos)')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        nombres = list(
+            Producto.objects.exclude(imagen='').exclude(imagen__isnull=True)
+            .values_list('imagen', flat=True).distinct()
+        )
+        creadas = fallidas = 0
+        forzar = [options['todas']] * len(nombres)
+
+        if options['procesos'] > 1:
+            # Redimensionar es trabajo de CPU: procesos, no hilos
+            pool = ProcessPoolExecutor(max_workers=options['procesos'], initializer=_iniciar_proceso)
+            resultados = pool.map(_generar, nombres, forzar, chunksize=8)
+        else:
+            pool = None
+            resultados = map(_generar, nombres, forzar)
+
+        try:
+            for nombre, cantidad, error in resultados:
+                if error:
+                    fallidas += 1
+                    self.stdout.write(self.style.WARNING(f"  ! {nombre}: {error}"))
+                creadas += cantidad
+        finally:
+            if pool:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo: {len(nombres)} fotos revisadas, {creadas} miniaturas creadas ({miniaturas.FORMATO}), "
+            f"{fallidas} con error ({time.monotonic() - inicio:.1f}s)."
+        ))
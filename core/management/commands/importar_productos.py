@@ -0,0 +1,66 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.importar import importar_productos, COLUMNAS, LOTE
+from core.models import User
+
+
+class Command(BaseCommand):
+    help = f"Importa/actualiza productos desde un CSV (columnas: {', '.join(COLUMNAS)})"
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV')
+        parser.add_argument('--simular', action='store_true', help='Validar y mostrar los cambios, sin guardar')
+        parser.add_argument('--crear-categorias', action='store_true', help='Crear las categorías que no existan')
+        parser.add_argument('--lote', type=int, default=LOTE, help=f'Filas por lote (default: {LOTE})')
+        parser.add_argument('--encoding', default='utf-8-sig', help='Codificación del archivo (default: utf-8-sig)')
+        parser.add_argument('--detalle', action='store_true', help='Listar cada producto nuevo/modificado')
+        parser.add_argument('--usuario', help='Usuario responsable del stock inicial en el kardex (default: primer admin)')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        usuario = None if options['simular'] else self._usuario(options['usuario'])
+        try:
+            with open(options['archivo'], encoding=options['encoding'], newline='') as archivo:
+                resultado = importar_productos(
+                    archivo,
+                    usuario=usuario,
+                    simulacion=options['simular'],
+                    crear_categorias=options['crear_categorias'],
+                    lote=options['lote'],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if options['detalle']:
+            for linea, id_producto, nombre, cambios in resultado.cambios:
+                if id_producto is None:
+                    self.stdout.write(f"  + línea {linea}: NUEVO {nombre}")
+                else:
+                    detalle = ', '.join(f"{c}: {a} -> {d}" for c, (a, d) in cambios.items())
+                    self.stdout.write(f"  ~ línea {linea}: #{id_producto} {nombre} ({detalle})")
+
+        for linea, mensaje in resultado.errores[:50]:
+            self.stdout.write(self.style.WARNING(f"  ! línea {linea}: {mensaje}"))
+        if len(resultado.errores) > 50:
+            self.stdout.write(self.style.WARNING(f"  ... y {len(resultado.errores) - 50} errores más"))
+
+        if resultado.categorias_nuevas:
+            self.stdout.write(f"Categorías nuevas: {', '.join(sorted(resultado.categorias_nuevas))}")
+
+        modo = 'SIMULACIÓN (no se guardó nada)' if resultado.simulacion else 'Listo'
+        self.stdout.write(self.style.SUCCESS(
+            f"{modo}: {resultado.procesados} filas en {time.monotonic() - inicio:.1f}s -> "
+            f"{resultado.nuevos} nuevos, {resultado.actualizados} actualizados, "
+            f"{resultado.sin_cambios} sin cambios, {len(resultado.errores)} con error."
+        ))
+
+    def _usuario(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"No existe el usuario '{username}'")
+        usuario = User.objects.filter(role='admin').order_by('id').first()
+        if usuario is None:
+            raise CommandError("No hay usuarios admin, indique --usuario")
+        return usuario
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum, Count, Max
+from core.models import Cliente, Venta
+
+
+class Command(BaseCommand):
+    help = 'Recalcula num_compras, total_gastado y ultima_compra de cada cliente desde las ventas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--solo-reporte', action='store_true', help='Solo mostrar diferencias, sin guardar')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por UPDATE (default: 1000)')
+
+    def handle(self, *args, **options):
+        # 1. Lo que DEBERÍA haber, en una sola consulta agrupada
+        reales = {
+            fila['cliente']: fila
+            for fila in Venta.objects.filter(cliente__isnull=False).values('cliente').annotate(
+                n=Count('id_venta'), total=Sum('total'), ultima=Max('fecha_venta')
+            ).order_by()
+        }
+
+        # 2. Comparamos con lo guardado
+        corregir = []
+        for cliente in Cliente.objects.only('id_cliente', 'nombres', 'num_compras', 'total_gastado', 'ultima_compra').iterator(chunk_size=options['lote']):
+            real = reales.get(cliente.id_cliente, {'n': 0, 'total': 0, 'ultima': None})
+            if (cliente.num_compras, cliente.total_gastado, cliente.ultima_compra) == (real['n'], real['total'], real['ultima']):
+                continue
+            self.stdout.write(
+                f"  #{cliente.id_cliente} {cliente.nombres}: compras {cliente.num_compras} -> {real['n']}, "
+                f"gastado {cliente.total_gastado} -> {real['total']}"
+            )
+            cliente.num_compras = real['n']
+            cliente.total_gastado = real['total']
+            cliente.ultima_compra = real['ultima']
+            corregir.append(cliente)
+
+        if options['solo_reporte']:
+            self.stdout.write(self.style.WARNING(f"{len(corregir)} clientes con diferencias (no se guardó nada)."))
+            return
+
+        with transaction.atomic():
+            Cliente.objects.bulk_update(corregir, ['num_compras', 'total_gastado', 'ultima_compra'], batch_size=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"{len(corregir)} clientes corregidos."))
@@ -0,0 +1,83 @@
+import datetime
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum, Count, F
+from django.db.models.functions import TruncDate
+from core.models import Venta, DetalleVenta, DetalleCompra, ResumenDiario
+from core import cache_dashboard
+from core.reportes import costo_detalle
+
+
+class Command(BaseCommand):
+    help = 'Regenera la tabla ResumenDiario a partir de ventas y compras'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Reconstruir solo desde esta fecha (YYYY-MM-DD)')
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por INSERT (default: 5000)')
+
+    def handle(self, *args, **options):
+        self.lote = options['lote']
+        desde = None
+        if options['desde']:
+            desde = datetime.datetime.strptime(options['desde'], '%Y-%m-%d').date()
+
+        ventas = Venta.objects.all()
+        detalles = DetalleVenta.objects.all()
+        compras = DetalleCompra.objects.all()
+        resumen = ResumenDiario.objects.all()
+        if desde:
+            ventas = ventas.filter(fecha_venta__date__gte=desde)
+            detalles = detalles.filter(venta__fecha_venta__date__gte=desde)
+            compras = compras.filter(compra__fecha_compra__date__gte=desde)
+            resumen = resumen.filter(dia__gte=desde)
+
+        costo = costo_detalle() # La misma del reporte financiero
+
+        with transaction.atomic():
+            borradas, _ = resumen.delete()
+            self.stdout.write(f"Filas anteriores borradas: {borradas}")
+
+            # 1. Cabeceras de venta (producto vacío)
+            n = self.insertar(
+                ventas.annotate(dia=TruncDate('fecha_venta'))
+                .values('dia', 'usuario_id', 'cliente_id')
+                .annotate(num_ventas=Count('id_venta'), total_vendido=Sum('total'), suma_descuento=Sum('descuento'))
+                .order_by()
+            )
+            self.stdout.write(f"Cabeceras de venta: {n}")
+
+            # 2. Líneas de venta por producto
+            n = self.insertar(
+                detalles.annotate(dia=TruncDate('venta__fecha_venta'), usuario_id=F('venta__usuario_id'), cliente_id=F('venta__cliente_id'))
+                .values('dia', 'producto_id', 'usuario_id', 'cliente_id')
+                .annotate(suma_costo=Sum(costo), suma_cantidad=Sum('cantidad'), suma_subtotal=Sum('subtotal'))
+                .order_by()
+            )
+            self.stdout.write(f"Líneas de venta: {n}")
+
+            # 3. Compras por producto
+            n = self.insertar(
+                compras.annotate(dia=TruncDate('compra__fecha_compra'), usuario_id=F('compra__usuario_id'))
+                .values('dia', 'producto_id', 'usuario_id')
+                .annotate(cantidad_comprada=Sum('cantidad'), monto_comprado=Sum('subtotal'))
+                .order_by()
+            )
+            self.stdout.write(f"Líneas de compra: {n}")
+
+        cache_dashboard.invalidar()
+        self.stdout.write(self.style.SUCCESS("Resumen diario reconstruido."))
+
+    def insertar(self, filas):
+        """Inserta las filas agrupadas en lotes sin cargarlas todas en memoria"""
+        total, pendientes = 0, []
+        for fila in filas.iterator(chunk_size=self.lote):
+            # Los alias "suma_x" evitan choques con los campos del modelo de origen
+            pendientes.append(ResumenDiario(**{k.removeprefix('suma_'): v for k, v in fila.items()}))
+            if len(pendientes) >= self.lote:
+                ResumenDiario.objects.bulk_create(pendientes)
+                total += len(pendientes)
+                pendientes = []
+        if pendientes:
+            ResumenDiario.objects.bulk_create(pendientes)
+            total += len(pendientes)
+        return total
@@ -0,0 +1,63 @@
+import csv
+import datetime
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core import pronostico
+
+
+class Command(BaseCommand):
+    help = 'Pronostica la demanda de todo el catálogo y sugiere órdenes de compra por proveedor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hoy', help='Calcular como si fuera este día, AAAA-MM-DD (default: hoy)')
+        parser.add_argument('--dias', type=int, default=pronostico.DIAS_HISTORIA, help=f'Días de historia (default: {pronostico.DIAS_HISTORIA})')
+        parser.add_argument('--ventana', type=int, default=pronostico.VENTANA, help=f'Días del promedio móvil (default: {pronostico.VENTANA})')
+        parser.add_argument('--alfa', type=float, default=pronostico.ALFA, help=f'Suavizado exponencial, 0-1 (default: {pronostico.ALFA})')
+        parser.add_argument('--entrega', type=int, default=pronostico.DIAS_ENTREGA, help=f'Días de entrega del proveedor (default: {pronostico.DIAS_ENTREGA})')
+        parser.add_argument('--cobertura', type=int, default=pronostico.DIAS_COBERTURA, help=f'Días que debe cubrir el pedido (default: {pronostico.DIAS_COBERTURA})')
+        parser.add_argument('--servicio', type=float, default=pronostico.NIVEL_SERVICIO, help=f'Nivel de servicio, 0-1 (default: {pronostico.NIVEL_SERVICIO})')
+        parser.add_argument('--csv', help='Guardar las líneas sugeridas en este archivo CSV')
+        parser.add_argument('--detalle', action='store_true', help='Mostrar cada línea, no solo el total por proveedor')
+
+    def handle(self, *args, **options):
+        hoy = None
+        if options['hoy']:
+            try:
+                hoy = datetime.datetime.strptime(options['hoy'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Fecha inválida (use AAAA-MM-DD)')
+        if options['dias'] < 1 or options['ventana'] < 1 or not 0 < options['alfa'] < 1 or not 0 < options['servicio'] < 1:
+            raise CommandError('--dias y --ventana deben ser positivos; --alfa y --servicio, entre 0 y 1')
+
+        inicio = time.monotonic()
+        ordenes = pronostico.sugerir_compras(
+            hoy, dias=options['dias'], ventana=options['ventana'], alfa=options['alfa'],
+            dias_entrega=options['entrega'], dias_cobertura=options['cobertura'], nivel_servicio=options['servicio'],
+        )
+        segundos = time.monotonic() - inicio
+
+        for orden in ordenes:
+            nombre = orden['proveedor'].empresa if orden['proveedor'] else '(sin compras anteriores)'
+            self.stdout.write(f"{nombre}: {len(orden['lineas'])} productos, C$ {orden['total']:,.2f}")
+            if options['detalle']:
+                for linea in orden['lineas']:
+                    self.stdout.write(
+                        f"    #{linea['id']} {linea['nombre']}: pedir {linea['cantidad']:g} "
+                        f"(stock {linea['stock']:g}, punto de pedido {linea['punto_pedido']:g}, {linea['demanda_diaria']:g}/día)"
+                    )
+
+        if options['csv']:
+            with open(options['csv'], 'w', newline='', encoding='utf-8') as archivo:
+                escritor = csv.writer(archivo)
+                escritor.writerow(['proveedor', 'id', 'nombre', 'stock', 'demanda_diaria', 'promedio_movil', 'punto_pedido', 'cantidad', 'costo'])
+                for orden in ordenes:
+                    nombre = orden['proveedor'].empresa if orden['proveedor'] else ''
+                    for l in orden['lineas']:
+                        escritor.writerow([nombre, l['id'], l['nombre'], l['stock'], l['demanda_diaria'],
+                                           l['promedio_movil'], l['punto_pedido'], l['cantidad'], l['costo']])
+
+        lineas = sum(len(o['lineas']) for o in ordenes)
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo en {segundos:.1f}s: {lineas} productos a pedir en {len(ordenes)} órdenes, "
+            f"C$ {sum(o['total'] for o in ordenes):,.2f}"
+        ))
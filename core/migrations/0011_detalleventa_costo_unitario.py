@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_alter_movimiento_options_alter_movimiento_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detalleventa',
+            name='costo_unitario',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Costo al vender'),
+        ),
+    ]
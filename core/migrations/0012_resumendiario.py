@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-17 11:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_detalleventa_costo_unitario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('num_ventas', models.PositiveIntegerField(default=0)),
+                ('total_vendido', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('descuento', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cantidad', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cantidad_comprada', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('monto_comprado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cliente', models.ForeignKey(blank=True, db_column='id_cliente', null=True, on_delete=django.db.models.deletion.PROTECT, to='core.cliente')),
+                ('producto', models.ForeignKey(blank=True, db_column='id_producto', null=True, on_delete=django.db.models.deletion.CASCADE, to='core.producto')),
+                ('usuario', models.ForeignKey(db_column='id_usuario', on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario',
+                'verbose_name_plural': 'Resúmenes Diarios',
+                'db_table': 'resumen_diario',
+                'indexes': [models.Index(fields=['dia', 'usuario', 'cliente'], name='resumen_dia_usuario_idx'), models.Index(fields=['dia', 'producto'], name='resumen_dia_producto_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-17 11:12
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def calcular_estadisticas(apps, schema_editor):
+    Cliente = apps.get_model('core', 'Cliente')
+    Venta = apps.get_model('core', 'Venta')
+    ventas = Venta.objects.filter(cliente=OuterRef('pk')).order_by().values('cliente')
+    Cliente.objects.update(
+        num_compras=Coalesce(Subquery(ventas.annotate(n=Count('pk')).values('n')), 0),
+        total_gastado=Coalesce(Subquery(ventas.annotate(t=Sum('total')).values('t')), 0, output_field=models.DecimalField()),
+        ultima_compra=Subquery(ventas.annotate(u=Max('fecha_venta')).values('u')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_resumendiario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='num_compras',
+            field=models.PositiveIntegerField(default=0, verbose_name='N° de Compras'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='total_gastado',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='ultima_compra',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Última Compra'),
+        ),
+        migrations.RunPython(calcular_estadisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_cliente_estadisticas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='modificado',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
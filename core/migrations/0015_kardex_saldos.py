@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-17 11:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_producto_modificado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorteStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hasta', models.DateTimeField()),
+                ('stock', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+            options={
+                'verbose_name': 'Corte de Stock',
+                'verbose_name_plural': 'Cortes de Stock',
+                'db_table': 'cortes_stock',
+            },
+        ),
+        migrations.AddField(
+            model_name='movimiento',
+            name='saldo',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(fields=['producto', 'fecha'], name='mov_producto_fecha_idx'),
+        ),
+        migrations.AddField(
+            model_name='cortestock',
+            name='producto',
+            field=models.ForeignKey(db_column='id_producto', on_delete=django.db.models.deletion.CASCADE, to='core.producto'),
+        ),
+        migrations.AddConstraint(
+            model_name='cortestock',
+            constraint=models.UniqueConstraint(fields=('producto', 'hasta'), name='corte_producto_hasta_uniq'),
+        ),
+    ]
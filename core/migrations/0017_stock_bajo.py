@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def cargar_alertas(apps, schema_editor):
+    Producto = apps.get_model('core', 'Producto')
+    StockBajo = apps.get_model('core', 'StockBajo')
+    ahora = timezone.now()
+    ids = Producto.objects.filter(activo=True, stock__lte=F('stock_minimo')).values_list('id_producto', flat=True)
+    StockBajo.objects.bulk_create(
+        (StockBajo(producto_id=i, desde=ahora) for i in ids.iterator(chunk_size=1000)),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockBajo',
+            fields=[
+                ('producto', models.OneToOneField(db_column='id_producto', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='alerta_stock', serialize=False, to='core.producto')),
+                ('desde', models.DateTimeField(verbose_name='En alerta desde')),
+            ],
+            options={
+                'verbose_name': 'Producto con Stock Bajo',
+                'verbose_name_plural': 'Productos con Stock Bajo',
+                'db_table': 'stock_bajo',
+            },
+        ),
+        migrations.CreateModel(
+            name='EventoStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('bajo', 'Bajó del mínimo'), ('repuesto', 'Volvió sobre el mínimo')], max_length=10)),
+                ('stock', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('stock_minimo', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('fecha', models.DateTimeField()),
+                ('origen', models.CharField(blank=True, max_length=255)),
+                ('producto', models.ForeignKey(db_column='id_producto', on_delete=django.db.models.deletion.CASCADE, to='core.producto')),
+            ],
+            options={
+                'verbose_name': 'Evento de Stock',
+                'verbose_name_plural': 'Eventos de Stock',
+                'db_table': 'eventos_stock',
+                'indexes': [models.Index(fields=['fecha'], name='evento_fecha_idx'), models.Index(fields=['producto', 'fecha'], name='evento_producto_fecha_idx')],
+            },
+        ),
+        migrations.RunPython(cargar_alertas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_stock_bajo'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='resumendiario',
+            name='resumen_dia_producto_idx',
+        ),
+        migrations.AddIndex(
+            model_name='resumendiario',
+            index=models.Index(fields=['dia', 'producto', 'cantidad'], name='resumen_dia_prod_cant_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-17 13:10
+
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def completar_costos(apps, schema_editor, lote=2000):
+    """Lo mismo que `manage.py completar_costos`: las ventas viejas no quedan con costo 0 en los reportes"""
+    DetalleVenta = apps.get_model('core', 'DetalleVenta')
+    DetalleCompra = apps.get_model('core', 'DetalleCompra')
+    ultimo_costo = DetalleCompra.objects.filter(
+        producto=OuterRef('producto'),
+        compra__fecha_compra__lte=OuterRef('venta__fecha_venta')
+    ).order_by('-compra__fecha_compra', '-id_detalle_compra').values('costo_unitario')[:1]
+
+    ultimo_id = 0
+    while True:
+        filas = list(
+            DetalleVenta.objects.filter(costo_unitario__isnull=True, id_detalle_venta__gt=ultimo_id)
+            .order_by('id_detalle_venta')
+            .annotate(costo=Coalesce(Subquery(ultimo_costo), F('producto__precio_compra')))
+            .only('id_detalle_venta')[:lote]
+        )
+        if not filas:
+            return
+        for fila in filas:
+            fila.costo_unitario = fila.costo
+        DetalleVenta.objects.bulk_update(filas, ['costo_unitario'])
+        ultimo_id = filas[-1].id_detalle_venta
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_indice_pronostico'),
+    ]
+
+    operations = [
+        migrations.RunPython(completar_costos, migrations.RunPython.noop),
+    ]
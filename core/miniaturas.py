@@ -0,0 +1,110 @@
+import hashlib
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps, features
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# ==========================================
+# MINIATURAS DE LAS FOTOS DE PRODUCTOS
+# ==========================================
+# Las fotos de celular pesan varios MB y en el inventario se ven de 40x40.
+# Al subir una foto se generan versiones reducidas (WebP si Pillow lo soporta)
+# en segundo plano, fuera del request. El nombre de la miniatura sale del
+# nombre de la foto (CON su extensión: taladro.jpg y taladro.png son fotos
+# distintas) y de una firma de cómo se generó, así que no hace falta guardar
+# nada en la BD:
+#
+#   productos/taladro.jpg  ->  productos/miniaturas/taladro.jpg_chica_1a2b3c.webp
+#
+# Django nunca reutiliza el nombre de un archivo subido, y si cambia la forma
+# de generar (tamaño, formato, calidad o VERSION) cambia la firma: la misma
+# URL siempre tiene el mismo contenido y se puede cachear "para siempre".
+# Fotos viejas o miniaturas con otra firma: `manage.py generar_miniaturas`.
+
+TAMANOS = {
+    'chica': 80,     # Listado del inventario (40px en pantallas de doble densidad)
+    'media': 320,    # Vista previa / ficha
+}
+FORMATO = 'WEBP' if features.check('webp') else 'JPEG'
+EXTENSION = '.webp' if FORMATO == 'WEBP' else '.jpg'
+CALIDAD = 80
+VERSION = 1      # Subirla si cambia el algoritmo (recorte, filtros...): las URLs cacheadas quedan atrás
+
+log = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _firma(tamano):
+    """Cambia si cambia lo que produce generar() para este tamaño"""
+    parametros = f"{VERSION}:{TAMANOS[tamano]}:{FORMATO}:{CALIDAD}"
+    return hashlib.md5(parametros.encode()).hexdigest()[:6]
+
+
+def nombre_miniatura(nombre, tamano):
+    carpeta, archivo = posixpath.split(nombre)
+    return posixpath.join(carpeta, 'miniaturas', f"{archivo}_{tamano}_{_firma(tamano)}{EXTENSION}")
+
+
+def url_miniatura(imagen, tamano='chica'):
+    """URL de la miniatura si ya existe; si todavía no se generó, la de la foto original"""
+    if not imagen:
+        return ''
+    nombre = nombre_miniatura(imagen.name, tamano)
+    if default_storage.exists(nombre):
+        return default_storage.url(nombre)
+    return imagen.url
+
+
+def generar(nombre, forzar=False):
+    """
+    Genera las miniaturas de la foto `nombre` (ruta dentro de MEDIA). Devuelve cuántas creó.
+    `forzar` reescribe las que ya existen (p. ej. un archivo dañado): con la misma firma
+    el resultado es el mismo, así que lo que tenga cacheado el navegador sigue valiendo.
+    """
+    pendientes = {
+        tamano: nombre_miniatura(nombre, tamano) for tamano in TAMANOS
+        if forzar or not default_storage.exists(nombre_miniatura(nombre, tamano))
+    }
+    if not pendientes:
+        return 0
+
+    with default_storage.open(nombre, 'rb') as archivo:
+        original = Image.open(archivo)
+        original = ImageOps.exif_transpose(original)   # Fotos de celular giradas
+        original = original.convert('RGBA' if FORMATO == 'WEBP' and original.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    for tamano, destino in pendientes.items():
+        lado = TAMANOS[tamano]
+        imagen = original.copy()
+        imagen.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+        contenido = io.BytesIO()
+        if FORMATO == 'WEBP':
+            imagen.save(contenido, FORMATO, quality=CALIDAD, method=4)
+        else:
+            imagen.save(contenido, FORMATO, quality=CALIDAD, optimize=True)
+        if default_storage.exists(destino):
+            default_storage.delete(destino)
+        default_storage.save(destino, ContentFile(contenido.getvalue()))
+    return len(pendientes)
+
+
+def _generar_seguro(nombre):
+    try:
+        generar(nombre)
+    except Exception:
+        log.exception("No se pudo generar la miniatura de %s", nombre)
+
+
+def encolar(nombre):
+    """Genera las miniaturas en un hilo aparte (no demora el guardado del producto)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='miniaturas')
+    return _pool.submit(_generar_seguro, nombre)
@@ -69,12 +69,22 @@ class Producto(models.Model):
         ('caja', 'Caja/Paquete'),
     )
     unidad = models.CharField(max_length=20, choices=UNIDADES, default='unidad', verbose_name="Unidad de Medida")
+    # Última modificación (versión del catálogo para la sincronización del POS).
+    # OJO: los UPDATE masivos deben poner modificado=Now() a mano, auto_now solo corre en save()
+    modificado = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"ID: {self.id_producto} - {self.nombre}"
 
     class Meta:
         db_table = 'productos'
+        indexes = [
+            # Inventario: activos/papelera filtrados por categoría, paginados por ID.
+            # En MySQL Django escribe `activo = 1` y los usa; en SQLite escribe `WHERE activo`
+            # y se queda con el índice de categoría (que igual viene ordenado por ID)
+            models.Index(fields=['activo', 'categoria', 'id_producto'], name='producto_activo_cat_idx'),
+            models.Index(fields=['activo', 'id_producto'], name='producto_activo_idx'),
+        ]
 
 # 5. CLIENTES (NUEVA TABLA SIMPLIFICADA)
 class Cliente(models.Model):
@@ -85,6 +95,11 @@ class Cliente(models.Model):
     email = models.EmailField(blank=True, null=True)
     # Dirección ELIMINADA
 
+    # Estadísticas mantenidas por registrar_venta (ver `manage.py reconciliar_clientes`)
+    num_compras = models.PositiveIntegerField(default=0, verbose_name="N° de Compras")
+    total_gastado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ultima_compra = models.DateTimeField(blank=True, null=True, verbose_name="Última Compra")
+
     def __str__(self):
         return f"{self.nombres} ({self.cedula_ruc or 'S/C'})"
 
@@ -102,6 +117,9 @@ class Compra(models.Model):
 
     class Meta:
         db_table = 'compras'
+        indexes = [
+            models.Index(fields=['fecha_compra', 'id_compra'], name='compra_fecha_idx'),
+        ]
 
 class DetalleCompra(models.Model):
     id_detalle_compra = models.AutoField(primary_key=True)
@@ -132,6 +150,10 @@ class Venta(models.Model):
 
     class Meta:
         db_table = 'ventas'
+        indexes = [
+            # Reportes y exportes por rango de fechas, paginados por (fecha, id)
+            models.Index(fields=['fecha_venta', 'id_venta'], name='venta_fecha_idx'),
+        ]
 
 class DetalleVenta(models.Model):
     id_detalle_venta = models.AutoField(primary_key=True)
@@ -140,6 +162,8 @@ class DetalleVenta(models.Model):
     cantidad = models.DecimalField(max_digits=10, decimal_places=2)
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=12, decimal_places=2)
+    # Costo del producto AL MOMENTO de la venta (para calcular ganancia sin depender del costo actual)
+    costo_unitario = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Costo al vender")
 
     def save(self, *args, **kwargs):
         self.subtotal = self.cantidad * self.precio_unitario
@@ -147,6 +171,10 @@ class DetalleVenta(models.Model):
 
     class Meta:
         db_table = 'detalle_ventas'
+        indexes = [
+            # Ventas de un producto (historial, reportes por producto) sin leer la tabla completa
+            models.Index(fields=['producto', 'venta'], name='detalle_producto_venta_idx'),
+        ]
         
 class Movimiento(models.Model):
     TIPOS = (
@@ -162,6 +190,12 @@ class Movimiento(models.Model):
     cantidad = models.DecimalField(max_digits=10, decimal_places=2)
     fecha = models.DateTimeField(auto_now_add=True)
     descripcion = models.CharField(max_length=255, blank=True) # Ej: "Venta #45"
+    # Stock del producto DESPUÉS del movimiento (kardex con saldo).
+    # Vacío en movimientos viejos hasta correr `manage.py generar_cortes --saldos`
+    saldo = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    # Para el kardex: las entradas suman, las salidas restan
+    POSITIVOS = ('entrada', 'ajuste_pos')
 
     def __str__(self):
         return f"{self.tipo} - {self.producto.nombre} ({self.cantidad})"
@@ -169,4 +203,98 @@ class Movimiento(models.Model):
     class Meta:
         db_table = 'movimientos'  
         verbose_name = 'Movimiento de Inventario'
-        verbose_name_plural = 'Movimientos de Inventario'
\ No newline at end of file
+        verbose_name_plural = 'Movimientos de Inventario'
+        indexes = [
+            models.Index(fields=['producto', 'fecha'], name='mov_producto_fecha_idx'),
+        ]
+
+# 7.1 CORTES DE STOCK (PUNTOS DE CONTROL DEL KARDEX)
+class CorteStock(models.Model):
+    """
+    Foto del stock de cada producto al cierre de un período (fin de mes).
+    El stock a una fecha = último corte anterior + movimientos desde ese corte.
+    """
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, db_column='id_producto')
+    hasta = models.DateTimeField()
+    stock = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        db_table = 'cortes_stock'
+        verbose_name = 'Corte de Stock'
+        verbose_name_plural = 'Cortes de Stock'
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'hasta'], name='corte_producto_hasta_uniq'),
+        ]
+
+# 7.2 ALERTAS DE STOCK BAJO
+class StockBajo(models.Model):
+    """
+    Productos activos con stock <= stock_minimo AHORA. Lo mantienen las ventas,
+    compras y ajustes (ver core/alertas.py): revisar las alertas cuesta lo que
+    haya en esta tabla, no lo que haya en el catálogo.
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True,
+                                    db_column='id_producto', related_name='alerta_stock')
+    desde = models.DateTimeField(verbose_name="En alerta desde")
+
+    class Meta:
+        db_table = 'stock_bajo'
+        verbose_name = 'Producto con Stock Bajo'
+        verbose_name_plural = 'Productos con Stock Bajo'
+
+class EventoStock(models.Model):
+    """Bitácora: cuándo cada producto cruzó el stock mínimo (hacia abajo o de vuelta arriba)"""
+    TIPOS = (
+        ('bajo', 'Bajó del mínimo'),
+        ('repuesto', 'Volvió sobre el mínimo'),
+    )
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, db_column='id_producto')
+    tipo = models.CharField(max_length=10, choices=TIPOS)
+    stock = models.DecimalField(max_digits=10, decimal_places=2)
+    stock_minimo = models.DecimalField(max_digits=10, decimal_places=2)
+    fecha = models.DateTimeField()
+    origen = models.CharField(max_length=255, blank=True) # Ej: "Venta #45"
+
+    class Meta:
+        db_table = 'eventos_stock'
+        verbose_name = 'Evento de Stock'
+        verbose_name_plural = 'Eventos de Stock'
+        indexes = [
+            models.Index(fields=['fecha'], name='evento_fecha_idx'),
+            models.Index(fields=['producto', 'fecha'], name='evento_producto_fecha_idx'),
+        ]
+
+# 8. RESUMEN DIARIO (TABLA ACUMULADA PARA EL DASHBOARD)
+class ResumenDiario(models.Model):
+    """
+    Totales por día + producto + cajero + cliente, actualizados en la misma
+    transacción que la venta/compra. Las filas con producto vacío guardan los
+    datos de la cabecera (número de ventas, total cobrado, descuento).
+    Se lee siempre con Sum(), así que un par de filas repetidas no afecta los totales.
+    """
+    dia = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, null=True, blank=True, db_column='id_producto')
+    usuario = models.ForeignKey(User, on_delete=models.PROTECT, db_column='id_usuario')
+    cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT, null=True, blank=True, db_column='id_cliente')
+
+    # Cabecera (producto vacío)
+    num_ventas = models.PositiveIntegerField(default=0)
+    total_vendido = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    descuento = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    # Por producto
+    cantidad = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cantidad_comprada = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    monto_comprado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'resumen_diario'
+        verbose_name = 'Resumen Diario'
+        verbose_name_plural = 'Resúmenes Diarios'
+        indexes = [
+            models.Index(fields=['dia', 'usuario', 'cliente'], name='resumen_dia_usuario_idx'),
+            # Con la cantidad al final el pronóstico (core/pronostico.py) se lee solo del índice
+            models.Index(fields=['dia', 'producto', 'cantidad'], name='resumen_dia_prod_cant_idx'),
+        ]
@@ -0,0 +1,288 @@
+import decimal
+from django.db import transaction
+from django.db.models import Q, F, Case, When, Value, DecimalField
+from django.db.models.functions import Round, Now
+from django.utils import timezone
+from .models import Producto, Venta, DetalleVenta, Cliente, Movimiento, Proveedor, Compra, DetalleCompra, ResumenDiario
+from . import alertas
+
+# ==========================================
+# MOTOR DE OPERACIONES (VENTAS Y COMPRAS)
+# ==========================================
+# Todo el carrito/factura se procesa con un número FIJO de consultas,
+# sin importar cuántas líneas traiga el ticket.
+
+def a_decimal(valor):
+    """Convierte lo que manda el frontend (float/str) a Decimal sin ruido binario"""
+    return decimal.Decimal(str(valor or 0))
+
+
+def agrupar_items(items):
+    """Suma las cantidades por producto (por si el carrito repite un ID)"""
+    cantidades = {}
+    for item in items:
+        id_producto = int(item['id'])
+        cantidades[id_producto] = cantidades.get(id_producto, 0) + a_decimal(item['cantidad'])
+    return cantidades
+
+
+def expresion_por_producto(valores):
+    """CASE id_producto WHEN x THEN valor ... para actualizar muchas filas en un solo UPDATE"""
+    return Case(
+        *[When(id_producto=id_producto, then=valor) for id_producto, valor in valores.items()],
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def acumular_resumen(dia, usuario, cliente, incrementos):
+    """
+    Suma `incrementos` ({id_producto o None: {campo: valor}}) a la tabla ResumenDiario.
+    Todas las filas de una operación comparten día, cajero y cliente, así que
+    bastan 3 consultas: leer (bloqueando), actualizar las que existen y crear las nuevas.
+    """
+    ids = [k for k in incrementos if k is not None]
+    filtro = Q(producto_id__in=ids)
+    if None in incrementos:
+        filtro |= Q(producto__isnull=True)
+
+    existentes = {}
+    for fila in ResumenDiario.objects.select_for_update().filter(filtro, dia=dia, usuario=usuario, cliente=cliente):
+        existentes.setdefault(fila.producto_id, fila)
+
+    actualizar, crear, campos = [], [], set()
+    for id_producto, valores in incrementos.items():
+        fila = existentes.get(id_producto)
+        if fila is None:
+            crear.append(ResumenDiario(dia=dia, usuario=usuario, cliente=cliente, producto_id=id_producto, **valores))
+            continue
+        for campo, valor in valores.items():
+            setattr(fila, campo, F(campo) + valor)
+            campos.add(campo)
+        actualizar.append(fila)
+
+    if actualizar:
+        ResumenDiario.objects.bulk_update(actualizar, sorted(campos))
+    if crear:
+        ResumenDiario.objects.bulk_create(crear)
+
+
+@transaction.atomic
+def registrar_venta(usuario, items, total=0, id_cliente=None, descuento=0):
+    """Guarda una venta completa y descuenta el stock en bloque"""
+    cliente_obj = None
+    if id_cliente:
+        cliente_obj = Cliente.objects.get(id_cliente=id_cliente)
+
+    cantidades = agrupar_items(items)
+    for id_producto, cantidad in cantidades.items():
+        if cantidad <= 0:
+            raise Exception(f"Cantidad inválida para el producto #{id_producto}")
+
+    # 1. UNA sola consulta: bloqueamos todas las filas del carrito
+    productos = Producto.objects.select_for_update().in_bulk(list(cantidades))
+
+    # 2. Validamos todo en memoria antes de escribir nada
+    for id_producto, cantidad in cantidades.items():
+        producto = productos.get(id_producto)
+        if producto is None:
+            raise Exception(f"El producto #{id_producto} no existe")
+        if producto.stock < cantidad:
+            raise Exception(f"Stock insuficiente para {producto.nombre}")
+
+    nueva_venta = Venta.objects.create(
+        usuario=usuario,
+        cliente=cliente_obj,
+        total=total,
+        descuento=descuento
+    )
+
+    # 3. Detalles en bloque (bulk_create no llama a save(), calculamos el subtotal aquí)
+    detalles = []
+    for item in items:
+        cantidad = a_decimal(item['cantidad'])
+        precio = a_decimal(item['precio'])
+        producto = productos[int(item['id'])]
+        detalles.append(DetalleVenta(
+            venta=nueva_venta,
+            producto=producto,
+            cantidad=cantidad,
+            precio_unitario=precio,
+            subtotal=cantidad * precio,
+            costo_unitario=producto.precio_compra # Foto del costo al vender
+        ))
+    DetalleVenta.objects.bulk_create(detalles)
+
+    # 4. Un solo UPDATE condicional: si alguna fila no cumple, se revierte todo
+    condicion = Q()
+    for id_producto, cantidad in cantidades.items():
+        condicion |= Q(id_producto=id_producto, stock__gte=cantidad)
+    actualizados = Producto.objects.filter(condicion).update(
+        stock=F('stock') - expresion_por_producto(cantidades),
+        modificado=Now() # Versión del catálogo (sincronización del POS)
+    )
+    if actualizados != len(cantidades):
+        raise Exception("El stock cambió durante la venta, intente de nuevo")
+
+    # 5. Kardex en bloque
+    Movimiento.objects.bulk_create([
+        Movimiento(
+            producto=productos[id_producto],
+            usuario=usuario,
+            tipo='salida',
+            cantidad=cantidad,
+            saldo=productos[id_producto].stock - cantidad, # Las filas siguen bloqueadas: el saldo es exacto
+            descripcion=f"Venta #{nueva_venta.id_venta}"
+        )
+        for id_producto, cantidad in cantidades.items()
+    ])
+
+    # 5.1 Alertas de stock bajo (solo escribe si algún producto cruzó el mínimo)
+    alertas.revisar({
+        id_producto: (productos[id_producto].stock - cantidad, productos[id_producto].stock_minimo, productos[id_producto].activo)
+        for id_producto, cantidad in cantidades.items()
+    }, origen=f"Venta #{nueva_venta.id_venta}")
+
+    # 6. Estadísticas del cliente (para el buscador del POS y el directorio)
+    if cliente_obj:
+        Cliente.objects.filter(id_cliente=cliente_obj.id_cliente).update(
+            num_compras=F('num_compras') + 1,
+            total_gastado=F('total_gastado') + a_decimal(total),
+            ultima_compra=nueva_venta.fecha_venta
+        )
+
+    # 7. Resumen diario para el dashboard (misma transacción)
+    incrementos = {None: {'num_ventas': 1, 'total_vendido': a_decimal(total), 'descuento': a_decimal(descuento)}}
+    for detalle in detalles:
+        fila = incrementos.setdefault(detalle.producto.id_producto, {'cantidad': 0, 'subtotal': 0, 'costo': 0})
+        fila['cantidad'] += detalle.cantidad
+        fila['subtotal'] += detalle.subtotal
+        fila['costo'] += detalle.cantidad * detalle.costo_unitario
+    acumular_resumen(timezone.localdate(nueva_venta.fecha_venta), usuario, cliente_obj, incrementos)
+
+    return nueva_venta
+
+
+# ==========================================
+# COMPRAS (ENTRADA DE STOCK)
+# ==========================================
+
+def costo_promedio_ponderado(cantidades, valores):
+    """
+    Nuevo costo = (stock * costo actual + valor recibido) / (stock + cantidad recibida).
+    Si no había existencias, el costo es simplemente el de la factura.
+    """
+    casos = []
+    for id_producto, cantidad in cantidades.items():
+        valor = valores[id_producto]
+        casos.append(When(id_producto=id_producto, stock__lte=0, then=Value(valor / cantidad)))
+        casos.append(When(
+            id_producto=id_producto,
+            then=(F('stock') * F('precio_compra') + Value(valor)) / (F('stock') + Value(cantidad))
+        ))
+    return Round(Case(*casos, output_field=DecimalField(max_digits=10, decimal_places=2)), 2)
+
+
+@transaction.atomic
+def registrar_compra(usuario, id_proveedor, items, total=0):
+    """Guarda una factura de proveedor y AUMENTA el stock con costo promedio ponderado"""
+    proveedor = Proveedor.objects.get(id_proveedor=id_proveedor)
+
+    cantidades = agrupar_items(items)
+    valores = {}
+    for item in items:
+        id_producto = int(item['id'])
+        valores[id_producto] = valores.get(id_producto, 0) + a_decimal(item['cantidad']) * a_decimal(item['precio'])
+
+    for id_producto, cantidad in cantidades.items():
+        if cantidad <= 0:
+            raise Exception(f"Cantidad inválida para el producto #{id_producto}")
+
+    # 1. Bloqueamos todos los productos de la factura en una consulta
+    productos = Producto.objects.select_for_update().in_bulk(list(cantidades))
+    faltantes = [str(i) for i in cantidades if i not in productos]
+    if faltantes:
+        raise Exception(f"Productos no encontrados: {', '.join(faltantes)}")
+
+    # 2. Cabecera
+    nueva_compra = Compra.objects.create(
+        proveedor=proveedor,
+        usuario=usuario,
+        total=total
+    )
+
+    # 3. Detalles en bloque
+    detalles = []
+    for item in items:
+        cantidad = a_decimal(item['cantidad'])
+        costo = a_decimal(item['precio']) # Aquí es Precio de COSTO
+        detalles.append(DetalleCompra(
+            compra=nueva_compra,
+            producto=productos[int(item['id'])],
+            cantidad=cantidad,
+            costo_unitario=costo,
+            subtotal=cantidad * costo
+        ))
+    DetalleCompra.objects.bulk_create(detalles)
+
+    # 4. Un solo UPDATE para costo y stock.
+    # OJO: precio_compra va PRIMERO, MySQL evalúa el SET de izquierda a derecha
+    # y el promedio debe calcularse con el stock ANTERIOR.
+    Producto.objects.filter(id_producto__in=list(cantidades)).update(
+        precio_compra=costo_promedio_ponderado(cantidades, valores),
+        stock=F('stock') + expresion_por_producto(cantidades),
+        modificado=Now() # Versión del catálogo (sincronización del POS)
+    )
+
+    # 5. Kardex en bloque
+    Movimiento.objects.bulk_create([
+        Movimiento(
+            producto=productos[id_producto],
+            usuario=usuario,
+            tipo='entrada',
+            cantidad=cantidad,
+            saldo=productos[id_producto].stock + cantidad,
+            descripcion=f"Compra a {proveedor.empresa}"
+        )
+        for id_producto, cantidad in cantidades.items()
+    ])
+
+    # 5.1 Alertas de stock bajo (lo repuesto sale de la lista)
+    alertas.revisar({
+        id_producto: (productos[id_producto].stock + cantidad, productos[id_producto].stock_minimo, productos[id_producto].activo)
+        for id_producto, cantidad in cantidades.items()
+    }, origen=f"Compra a {proveedor.empresa}")
+
+    # 6. Resumen diario (misma transacción)
+    acumular_resumen(timezone.localdate(nueva_compra.fecha_compra), usuario, None, {
+        id_producto: {'cantidad_comprada': cantidad, 'monto_comprado': valores[id_producto]}
+        for id_producto, cantidad in cantidades.items()
+    })
+
+    return nueva_compra
+
+
+# ==========================================
+# AJUSTES DE INVENTARIO
+# ==========================================
+
+@transaction.atomic
+def ajustar_stock(usuario, id_producto, diferencia, descripcion):
+    """Suma (o resta, si es negativa) `diferencia` al stock y lo deja en el kardex con su saldo"""
+    diferencia = a_decimal(diferencia)
+    producto = Producto.objects.select_for_update().get(id_producto=id_producto)
+
+    Producto.objects.filter(id_producto=id_producto).update(
+        stock=F('stock') + diferencia,
+        modificado=Now() # Versión del catálogo (sincronización del POS)
+    )
+    alertas.revisar(
+        {id_producto: (producto.stock + diferencia, producto.stock_minimo, producto.activo)}, origen=descripcion
+    )
+    return Movimiento.objects.create(
+        producto=producto,
+        usuario=usuario,
+        tipo='ajuste_pos' if diferencia > 0 else 'ajuste_neg',
+        cantidad=abs(diferencia),
+        saldo=producto.stock + diferencia,
+        descripcion=descripcion
+    )
@@ -0,0 +1,90 @@
+import base64
+import json
+from django.db.models import Q
+
+# ==========================================
+# PAGINACIÓN POR CURSOR (KEYSET)
+# ==========================================
+# En vez de OFFSET (que obliga a la BD a recorrer todas las filas anteriores)
+# pedimos "las N filas después de esta": WHERE (fecha, id) < (x, y) ORDER BY ...
+# La página 500 cuesta lo mismo que la página 1 y nunca se cuenta la tabla.
+#
+# Uso:  pagina = paginar(queryset, ['-fecha', '-id'], request, tamano=50)
+#       El orden debe terminar en un campo único (normalmente la PK).
+
+
+class Pagina:
+    def __init__(self, objetos, siguiente, anterior):
+        self.objetos = objetos
+        self.siguiente = siguiente    # Cursor para ?despues=
+        self.anterior = anterior      # Cursor para ?antes=
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+
+def _codificar(objeto, campos):
+    valores = [str(getattr(objeto, c.lstrip('-'))) for c in campos]
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode().rstrip('=')
+
+
+def _decodificar(cursor, modelo, campos):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return [modelo._meta.get_field(c.lstrip('-')).to_python(v) for c, v in zip(campos, valores)]
+    except Exception:
+        return None   # Cursor dañado: volvemos a la primera página
+
+
+def _despues_de(campos, valores):
+    """(a, b) > (x, y) respetando asc/desc de cada campo, como OR de ANDs"""
+    condicion = Q()
+    for i, campo in enumerate(campos):
+        nombre = campo.lstrip('-')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        parte = Q(**{f'{nombre}__{operador}': valores[i]})
+        for anterior, valor in zip(campos[:i], valores[:i]):
+            parte &= Q(**{anterior.lstrip('-'): valor})
+        condicion |= parte
+    return condicion
+
+
+def _invertir(campos):
+    return [c[1:] if c.startswith('-') else '-' + c for c in campos]
+
+
+def paginar(queryset, campos, request, tamano=50):
+    modelo = queryset.model
+    despues = request.GET.get('despues')
+    antes = request.GET.get('antes')
+
+    if antes:
+        # Hacia atrás: invertimos el orden, tomamos N y volvemos a darles la vuelta
+        valores = _decodificar(antes, modelo, campos)
+        if valores is not None:
+            invertidos = _invertir(campos)
+            filas = list(queryset.filter(_despues_de(invertidos, valores)).order_by(*invertidos)[:tamano + 1])
+            hay_mas = len(filas) > tamano
+            filas = filas[:tamano][::-1]
+            return Pagina(
+                filas,
+                siguiente=_codificar(filas[-1], campos) if filas else None,
+                anterior=_codificar(filas[0], campos) if hay_mas and filas else None,
+            )
+
+    valores = _decodificar(despues, modelo, campos) if despues else None
+    if valores is not None:
+        queryset = queryset.filter(_despues_de(campos, valores))
+
+    filas = list(queryset.order_by(*campos)[:tamano + 1])
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+    return Pagina(
+        filas,
+        siguiente=_codificar(filas[-1], campos) if hay_mas else None,
+        anterior=_codificar(filas[0], campos) if valores is not None and filas else None,
+    )
@@ -0,0 +1,216 @@
+import datetime
+import math
+from itertools import chain
+from statistics import NormalDist
+import numpy as np
+from django.db import connection
+from django.db.models import Max, Sum, CharField, FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+from .models import Producto, Proveedor, DetalleCompra, ResumenDiario
+
+# ==========================================
+# PRONÓSTICO DE DEMANDA Y COMPRAS SUGERIDAS
+# ==========================================
+# Todo el catálogo en una pasada con NumPy, nunca un for por producto:
+#   1. UNA consulta a ResumenDiario (cantidad vendida por día y producto, la
+#      llenan las ventas en su misma transacción; la lee el índice
+#      resumen_dia_prod_cant_idx sin tocar la tabla) -> 3 arreglos: fila, día, cantidad.
+#   2. Promedio móvil, suavizado exponencial y varianza son SUMAS PONDERADAS por
+#      día, así que salen de np.bincount sobre esas filas. No se arma la matriz
+#      producto x día (200k productos x 730 días serían más de 1 GB).
+#   3. Demanda en el plazo de entrega + stock de seguridad = punto de pedido.
+#      Si el stock está en el punto de pedido o debajo, se sugiere llegar a
+#      punto de pedido + demanda del período de cobertura.
+#   4. Proveedor de cada producto = el de su última compra (DetalleCompra),
+#      en una consulta agrupada.
+#
+#   python manage.py sugerir_compras --entrega 7 --cobertura 14
+
+DIAS_HISTORIA = 365     # Días de ventas que se leen (terminando ayer)
+VENTANA = 28            # Promedio móvil (días)
+ALFA = 0.1              # Suavizado exponencial: peso del día más reciente
+DIAS_ENTREGA = 7        # Lo que tarda el proveedor en entregar
+DIAS_COBERTURA = 14     # Cada cuánto se vuelve a pedir
+NIVEL_SERVICIO = 0.95   # Probabilidad de no quedarse sin stock durante la entrega
+LOTE = 10000            # Filas por fetchmany al leer las consultas grandes
+
+
+class Pronostico:
+    """Demanda diaria estimada de todo el catálogo activo (arreglos alineados por producto)"""
+
+    def __init__(self, ids, stock, stock_minimo, costo, promedio, suavizado, desviacion, desde, hasta):
+        self.ids = ids                  # id_producto
+        self.stock = stock
+        self.stock_minimo = stock_minimo
+        self.costo = costo              # precio_compra (costo promedio)
+        self.promedio = promedio        # Promedio móvil de la ventana
+        self.suavizado = suavizado      # Suavizado exponencial (la demanda que se usa)
+        self.desviacion = desviacion    # Desviación estándar diaria de la historia
+        self.desde = desde
+        self.hasta = hasta
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def demanda(filas, dias, cantidades, n_productos, n_dias, ventana=VENTANA, alfa=ALFA):
+    """
+    filas/dias/cantidades: una entrada por (producto, día) con venta; los días
+    sin venta cuentan como 0. dias va de 0 (el más viejo) a n_dias - 1 (ayer).
+    Devuelve (promedio móvil, suavizado exponencial, desviación estándar) por fila.
+    """
+    ventana = min(ventana, n_dias)
+    recientes = dias >= n_dias - ventana
+    promedio = np.bincount(filas[recientes], cantidades[recientes], minlength=n_productos) / ventana
+
+    # s_T = alfa * sum((1 - alfa)^(T - t) * x_t), normalizado porque la serie arranca en 0
+    pesos = alfa * (1 - alfa) ** (n_dias - 1 - dias)
+    suavizado = np.bincount(filas, cantidades * pesos, minlength=n_productos) / (1 - (1 - alfa) ** n_dias)
+
+    suma = np.bincount(filas, cantidades, minlength=n_productos)
+    cuadrados = np.bincount(filas, cantidades * cantidades, minlength=n_productos)
+    media = suma / n_dias
+    desviacion = np.sqrt(np.maximum(cuadrados / n_dias - media * media, 0))
+    return promedio, suavizado, desviacion
+
+
+def _arreglo(consulta, campos, fila=tuple):
+    """
+    Ejecuta la consulta del ORM con el cursor y deja las filas en un arreglo
+    estructurado de NumPy, sin pasar cada fila por los conversores de Django
+    (con cientos de miles de filas es la mayor parte del tiempo).
+    """
+    sql, params = consulta.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        lotes = iter(lambda: cursor.fetchmany(LOTE), [])
+        return np.fromiter(map(fila, chain.from_iterable(lotes)), dtype=campos)
+
+
+class _NumeroDeDia(dict):
+    """'AAAA-MM-DD' -> días desde `desde`. Hay un texto por día del período: cada uno se convierte una sola vez."""
+
+    def __init__(self, desde):
+        super().__init__()
+        self.desde = desde
+
+    def __missing__(self, texto):
+        numero = self[texto] = (datetime.date.fromisoformat(texto) - self.desde).days
+        return numero
+
+
+def _catalogo():
+    """Productos activos como arreglos, ordenados por id (para searchsorted)"""
+    return _arreglo(
+        Producto.objects.filter(activo=True).order_by('id_producto').values_list(
+            'id_producto',
+            Cast('stock', FloatField()), Cast('stock_minimo', FloatField()), Cast('precio_compra', FloatField()),
+        ),
+        [('id', 'i8'), ('stock', 'f8'), ('stock_minimo', 'f8'), ('costo', 'f8')],
+    )
+
+
+def pronosticar(hoy=None, dias=DIAS_HISTORIA, ventana=VENTANA, alfa=ALFA):
+    hoy = hoy or timezone.localdate()
+    hasta = hoy - datetime.timedelta(days=1)            # Hoy todavía no terminó
+    desde = hasta - datetime.timedelta(days=dias - 1)
+    catalogo = _catalogo()
+    ids = catalogo['id']
+
+    # Total por (producto, día): ResumenDiario separa cada día por cajero y cliente.
+    # El día viene como texto AAAA-MM-DD y se vuelve número de día al leerlo (sin objetos date por fila)
+    dia = _NumeroDeDia(desde)
+    ventas = _arreglo(
+        ResumenDiario.objects.filter(producto__isnull=False, dia__range=(desde, hasta), cantidad__gt=0)
+        .values_list('producto_id', Cast('dia', CharField()))
+        .annotate(total=Cast(Sum('cantidad'), FloatField())).order_by(),
+        [('producto', 'i8'), ('dia', 'i8'), ('cantidad', 'f8')],
+        fila=lambda f: (f[0], dia[f[1]], f[2]),
+    )
+    if len(ventas) and len(ids):
+        # Producto -> fila del catálogo (las ventas de productos inactivos se descartan)
+        filas = np.minimum(np.searchsorted(ids, ventas['producto']), len(ids) - 1)
+        activos = ids[filas] == ventas['producto']
+        promedio, suavizado, desviacion = demanda(
+            filas[activos], ventas['dia'][activos], ventas['cantidad'][activos], len(ids), dias, ventana, alfa
+        )
+    else:
+        promedio = suavizado = desviacion = np.zeros(len(ids))
+
+    return Pronostico(
+        ids, catalogo['stock'], catalogo['stock_minimo'], catalogo['costo'], promedio, suavizado, desviacion, desde, hasta
+    )
+
+
+def _proveedores(ids):
+    """Proveedor de la última compra de cada producto (-1 si nunca se le compró)"""
+    ultimas = _arreglo(
+        DetalleCompra.objects.values_list('producto_id', 'compra__proveedor_id')
+        .annotate(ultima=Max('compra_id')).order_by(),
+        [('producto', 'i8'), ('proveedor', 'i8'), ('compra', 'i8')],
+    )
+    proveedor = np.full(len(ids), -1, dtype=np.int64)
+    if not len(ultimas) or not len(ids):
+        return proveedor
+    # Por producto gana la compra más reciente: ordenamos por (producto, compra) y queda el último de cada producto
+    ultimas = ultimas[np.lexsort((ultimas['compra'], ultimas['producto']))]
+    productos, proveedores = ultimas['producto'], ultimas['proveedor']
+    ultimo = np.r_[productos[1:] != productos[:-1], True]
+    productos, proveedores = productos[ultimo], proveedores[ultimo]
+
+    filas = np.minimum(np.searchsorted(ids, productos), len(ids) - 1)
+    encontrados = ids[filas] == productos
+    proveedor[filas[encontrados]] = proveedores[encontrados]
+    return proveedor
+
+
+def puntos_de_pedido(pronostico, dias_entrega=DIAS_ENTREGA, dias_cobertura=DIAS_COBERTURA, nivel_servicio=NIVEL_SERVICIO):
+    """(punto de pedido, cantidad a pedir) por producto"""
+    z = NormalDist().inv_cdf(nivel_servicio)
+    seguridad = z * pronostico.desviacion * math.sqrt(dias_entrega)
+    punto = np.maximum(pronostico.suavizado * dias_entrega + seguridad, pronostico.stock_minimo)
+    objetivo = punto + pronostico.suavizado * dias_cobertura
+    pedir = np.where(pronostico.stock <= punto, np.ceil(np.round(objetivo - pronostico.stock, 6)), 0)
+    return punto, np.maximum(pedir, 0)
+
+
+def sugerir_compras(hoy=None, dias=DIAS_HISTORIA, ventana=VENTANA, alfa=ALFA,
+                    dias_entrega=DIAS_ENTREGA, dias_cobertura=DIAS_COBERTURA, nivel_servicio=NIVEL_SERVICIO):
+    """
+    Órdenes de compra sugeridas, una por proveedor (None = productos que nunca se compraron).
+    Cada orden: {'proveedor', 'lineas': [...], 'total'} ordenadas de mayor a menor monto.
+    """
+    pronostico = pronosticar(hoy, dias, ventana, alfa)
+    punto, pedir = puntos_de_pedido(pronostico, dias_entrega, dias_cobertura, nivel_servicio)
+    proveedor = _proveedores(pronostico.ids)
+
+    sugeridos = np.flatnonzero(pedir > 0)
+    # in_bulk parte la lista de IDs en lotes (SQLite acepta un máximo de parámetros por consulta)
+    nombres = Producto.objects.only('nombre').in_bulk(pronostico.ids[sugeridos].tolist())
+    proveedores = Proveedor.objects.in_bulk(set(proveedor[sugeridos].tolist()) - {-1})
+
+    ordenes = {}
+    # Dentro de cada orden primero lo que se agota antes (días de stock que quedan)
+    dias_stock = pronostico.stock[sugeridos] / np.maximum(pronostico.suavizado[sugeridos], 1e-9)
+    for i in sugeridos[np.argsort(dias_stock, kind='stable')].tolist():
+        id_proveedor = int(proveedor[i])
+        orden = ordenes.setdefault(id_proveedor, {
+            'proveedor': proveedores.get(id_proveedor), 'lineas': [], 'total': 0.0,
+        })
+        costo = float(pedir[i] * pronostico.costo[i])
+        orden['lineas'].append({
+            'id': int(pronostico.ids[i]),
+            'nombre': nombres[int(pronostico.ids[i])].nombre,
+            'stock': float(pronostico.stock[i]),
+            'demanda_diaria': round(float(pronostico.suavizado[i]), 2),
+            'promedio_movil': round(float(pronostico.promedio[i]), 2),
+            'punto_pedido': round(float(punto[i]), 2),
+            'cantidad': float(pedir[i]),
+            'costo': round(costo, 2),
+        })
+        orden['total'] += costo
+
+    for orden in ordenes.values():
+        orden['total'] = round(orden['total'], 2)
+    return sorted(ordenes.values(), key=lambda o: -o['total'])
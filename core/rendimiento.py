@@ -0,0 +1,252 @@
+import contextvars
+import random
+import threading
+import time
+from collections import Counter
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# ==========================================
+# MEDICIÓN DE RENDIMIENTO POR VISTA
+# ==========================================
+# Para cada request: tiempo total, cantidad de consultas, tiempo en la BD y
+# las consultas repetidas (el clásico N+1: la misma SQL muchas veces).
+# Se acumula por vista en memoria (histograma de latencias de tamaño fijo)
+# y se ve en /rendimiento/ (solo admin).
+#
+# - Cada proceso tiene sus propios números (con varios workers, cada uno lo suyo).
+# - Las respuestas en streaming (exportar_csv) se registran al terminar de
+#   mandar el cuerpo, con las consultas que se hacen mientras se genera.
+# - Costo: un perf_counter() por consulta y un dict por request. Con
+#   RENDIMIENTO_MUESTREO < 1 se mide solo esa fracción de los requests.
+
+# Límites superiores (ms) de cada barra del histograma; la última es "más de 5s"
+CUBETAS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+MAX_REPETIDAS = 50      # Consultas repetidas que se recuerdan (se descartan las menos frecuentes)
+MIN_REPETICIONES = 3    # Desde cuántas veces la misma SQL en un request se considera N+1
+
+_actual = contextvars.ContextVar('medicion', default=None)
+
+
+class Medicion:
+    __slots__ = ('consultas', 'tiempo_bd', 'sql')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.sql = Counter()
+
+
+def _medir_sql(execute, sql, params, many, context):
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.tiempo_bd += time.perf_counter() - inicio
+        medicion.consultas += 1
+        medicion.sql[sql] += 1
+
+
+def _instalar(connection, **kwargs):
+    # Queda instalado para siempre en la conexión; sin medición activa no hace nada
+    if _medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_sql)
+
+
+connection_created.connect(_instalar)
+
+
+class EstadisticaVista:
+    __slots__ = ('requests', 'tiempo', 'maximo', 'consultas', 'tiempo_bd', 'histograma', 'con_repetidas')
+
+    def __init__(self):
+        self.requests = 0
+        self.tiempo = 0.0
+        self.maximo = 0.0
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.histograma = [0] * len(CUBETAS)
+        self.con_repetidas = 0
+
+    def percentil(self, p):
+        """Límite superior (ms) de la barra donde cae el percentil `p` (aproximado)"""
+        objetivo = p * self.requests
+        acumulado = 0
+        for limite, cantidad in zip(CUBETAS, self.histograma):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return limite
+        return CUBETAS[-1]
+
+
+class Registro:
+    """Acumulado por vista, en memoria y con tamaño acotado"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self.lock:
+            self.vistas = {}
+            self.repetidas = {}      # sql -> {'veces', 'maximo', 'vistas'}
+            self.desde = time.time()
+
+    def agregar(self, vista, segundos, medicion):
+        repetidas = [(sql, n) for sql, n in medicion.sql.items() if n >= MIN_REPETICIONES]
+        milis = segundos * 1000
+        with self.lock:
+            est = self.vistas.get(vista)
+            if est is None:
+                est = self.vistas[vista] = EstadisticaVista()
+            est.requests += 1
+            est.tiempo += segundos
+            est.maximo = max(est.maximo, segundos)
+            est.consultas += medicion.consultas
+            est.tiempo_bd += medicion.tiempo_bd
+            for i, limite in enumerate(CUBETAS):
+                if milis <= limite:
+                    est.histograma[i] += 1
+                    break
+            if repetidas:
+                est.con_repetidas += 1
+            for sql, n in repetidas:
+                datos = self.repetidas.get(sql)
+                if datos is None:
+                    if len(self.repetidas) >= MAX_REPETIDAS:
+                        # Lugar lleno: sale la que menos veces apareció
+                        menor = min(self.repetidas, key=lambda k: self.repetidas[k]['veces'])
+                        del self.repetidas[menor]
+                    datos = self.repetidas[sql] = {'veces': 0, 'maximo': 0, 'vistas': set()}
+                datos['veces'] += 1
+                datos['maximo'] = max(datos['maximo'], n)
+                if len(datos['vistas']) < 5:
+                    datos['vistas'].add(vista)
+
+    def resumen(self):
+        with self.lock:
+            vistas = []
+            for nombre, est in self.vistas.items():
+                vistas.append({
+                    'vista': nombre,
+                    'requests': est.requests,
+                    'promedio_ms': est.tiempo / est.requests * 1000,
+                    'maximo_ms': est.maximo * 1000,
+                    'p50_ms': est.percentil(0.50),
+                    'p95_ms': est.percentil(0.95),
+                    'consultas': est.consultas / est.requests,
+                    'bd_ms': est.tiempo_bd / est.requests * 1000,
+                    'total_s': est.tiempo,
+                    'con_repetidas': est.con_repetidas,
+                    'histograma': list(est.histograma),
+                })
+            repetidas = [
+                {'sql': sql, 'veces': d['veces'], 'maximo': d['maximo'], 'vistas': sorted(d['vistas'])}
+                for sql, d in self.repetidas.items()
+            ]
+            desde = self.desde
+        vistas.sort(key=lambda v: v['total_s'], reverse=True)
+        repetidas.sort(key=lambda r: (r['veces'], r['maximo']), reverse=True)
+        return {'vistas': vistas, 'repetidas': repetidas, 'desde': desde, 'cubetas': CUBETAS}
+
+
+registro = Registro()
+
+
+def _seguir_midiendo(contenido, vista, inicio, medicion):
+    """Entrega el cuerpo de un StreamingHttpResponse con la medición activa mientras se genera cada parte"""
+    iterador = iter(contenido)
+    try:
+        while True:
+            token = _actual.set(medicion)
+            try:
+                parte = next(iterador)
+            except StopIteration:
+                return
+            finally:
+                _actual.reset(token)
+            yield parte
+    finally:
+        # También si el cliente corta la descarga a la mitad
+        registro.agregar(vista, time.perf_counter() - inicio, medicion)
+
+
+async def _seguir_midiendo_async(contenido, vista, inicio, medicion):
+    iterador = aiter(contenido)
+    try:
+        while True:
+            token = _actual.set(medicion)
+            try:
+                parte = await anext(iterador)
+            except StopAsyncIteration:
+                return
+            finally:
+                _actual.reset(token)
+            yield parte
+    finally:
+        registro.agregar(vista, time.perf_counter() - inicio, medicion)
+
+
+class MedirRendimiento:
+    """Middleware: ponerlo PRIMERO en MIDDLEWARE para que cuente también sesión y auth"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.activo = getattr(settings, 'RENDIMIENTO_ACTIVO', True)
+        self.muestreo = getattr(settings, 'RENDIMIENTO_MUESTREO', 1.0)
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+        for connection in connections.all(initialized_only=True):
+            _instalar(connection)
+
+    def _medir(self):
+        return self.activo and (self.muestreo >= 1 or random.random() < self.muestreo)
+
+    def _terminar(self, request, response, inicio, medicion, token):
+        _actual.reset(token)
+        segundos = time.perf_counter() - inicio
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else '(sin ruta)'
+        # En streaming la cabecera sale antes que el cuerpo: solo cubre hasta ahí
+        response['Server-Timing'] = (
+            f'total;dur={segundos * 1000:.1f}, '
+            f'db;dur={medicion.tiempo_bd * 1000:.1f};desc="{medicion.consultas} consultas"'
+        )
+        if response.streaming:
+            # El cuerpo (p. ej. exportar_csv) se genera DESPUÉS de salir del middleware:
+            # seguimos midiendo mientras se consume y se registra cuando termina
+            if response.is_async:
+                response.streaming_content = _seguir_midiendo_async(response.streaming_content, vista, inicio, medicion)
+            else:
+                response.streaming_content = _seguir_midiendo(response.streaming_content, vista, inicio, medicion)
+        else:
+            registro.agregar(vista, segundos, medicion)
+        return response
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        if not self._medir():
+            return self.get_response(request)
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        inicio = time.perf_counter()
+        response = self.get_response(request)
+        return self._terminar(request, response, inicio, medicion, token)
+
+    async def __acall__(self, request):
+        if not self._medir():
+            return await self.get_response(request)
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        inicio = time.perf_counter()
+        response = await self.get_response(request)
+        return self._terminar(request, response, inicio, medicion, token)
@@ -0,0 +1,127 @@
+from datetime import timedelta
+from django.db.models import Sum, Count, F, DecimalField, ExpressionWrapper
+from django.db.models.functions import TruncDate, Coalesce
+from .models import Venta, DetalleVenta, ResumenDiario
+
+# ==========================================
+# REPORTES (AGREGADOS EN LA BASE DE DATOS)
+# ==========================================
+# Nada de recorrer venta por venta en Python: cada bloque del reporte
+# es UNA consulta agrupada, sin importar cuántas ventas haya en el rango.
+
+DINERO = DecimalField(max_digits=14, decimal_places=2)
+
+
+def costo_detalle():
+    """
+    Costo de una línea de venta: cantidad * costo guardado al vender. Si la línea
+    no lo tiene (cargada por el admin, o vieja sin `manage.py completar_costos`)
+    se usa el costo actual del producto. reconstruir_resumen usa esta misma
+    expresión: el dashboard y el reporte financiero dan el mismo margen.
+    """
+    return ExpressionWrapper(
+        F('cantidad') * Coalesce('costo_unitario', 'producto__precio_compra'), output_field=DINERO
+    )
+
+
+def resumen_financiero(f_ini, f_fin):
+    """Ingresos, descuentos y ganancia del rango, con desglose por día y por categoría"""
+    ventas = Venta.objects.filter(fecha_venta__range=(f_ini, f_fin))
+    detalles = DetalleVenta.objects.filter(venta__fecha_venta__range=(f_ini, f_fin))
+
+    # 1. Ingresos y descuentos por día (cabeceras de venta)
+    por_dia = {
+        fila['dia']: fila
+        for fila in ventas.annotate(dia=TruncDate('fecha_venta')).values('dia').annotate(
+            num_ventas=Count('id_venta'),
+            ingresos=Sum('total'),
+            descuentos=Sum('descuento'),
+        )
+    }
+
+    # 2. Venta bruta y costo por día (líneas de venta)
+    for fila in detalles.annotate(dia=TruncDate('venta__fecha_venta')).values('dia').annotate(
+        venta_bruta=Sum('subtotal'),
+        costo=Coalesce(Sum(costo_detalle()), 0, output_field=DINERO),
+    ):
+        dia = por_dia.setdefault(fila['dia'], {'dia': fila['dia'], 'num_ventas': 0, 'ingresos': 0, 'descuentos': 0})
+        dia.update(venta_bruta=fila['venta_bruta'], costo=fila['costo'])
+
+    dias = []
+    for dia in sorted(por_dia):
+        fila = por_dia[dia]
+        fila.setdefault('venta_bruta', 0)
+        fila.setdefault('costo', 0)
+        # La ganancia real se ve afectada por el descuento que diste
+        fila['ganancia'] = fila['venta_bruta'] - fila['costo'] - fila['descuentos']
+        dias.append(fila)
+
+    # 3. Desglose por categoría
+    categorias = list(
+        detalles.values('producto__categoria__nombre').annotate(
+            cantidad_vendida=Sum('cantidad'),
+            venta_bruta=Sum('subtotal'),
+            costo=Coalesce(Sum(costo_detalle()), 0, output_field=DINERO),
+        ).annotate(
+            ganancia=ExpressionWrapper(F('venta_bruta') - F('costo'), output_field=DINERO)
+        ).order_by('-venta_bruta')
+    )
+
+    return {
+        'num_ventas': sum(d['num_ventas'] for d in dias),
+        'total_ingresos': sum(d['ingresos'] for d in dias),
+        'total_descuentos': sum(d['descuentos'] for d in dias),
+        'ganancia_bruta': sum(d['venta_bruta'] - d['costo'] for d in dias),
+        'ganancia_neta': sum(d['ganancia'] for d in dias),
+        'por_dia': dias,
+        'por_categoria': categorias,
+    }
+
+
+# ==========================================
+# DASHBOARD (LEE SOLO DE ResumenDiario)
+# ==========================================
+
+# Los rankings del panel miran los últimos N días para que el costo
+# no crezca con los años de historial.
+DIAS_RANKING = 30
+
+
+def resumen_dashboard(hoy):
+    """Indicadores y rankings del panel principal a partir de la tabla acumulada"""
+    cabeceras = ResumenDiario.objects.filter(producto__isnull=True)
+    lineas = ResumenDiario.objects.filter(producto__isnull=False)
+    desde = hoy - timedelta(days=DIAS_RANKING - 1)
+
+    # 1. Datos de hoy
+    totales_hoy = cabeceras.filter(dia=hoy).aggregate(
+        total=Sum('total_vendido'),
+        cantidad=Sum('num_ventas'),
+    )
+
+    # 2. Top 5 Productos
+    top_productos = lineas.filter(dia__gte=desde, cantidad__gt=0) \
+        .values('producto', 'producto__nombre') \
+        .annotate(total_vendido=Sum('cantidad')) \
+        .order_by('-total_vendido')[:5]
+
+    # 3. Top 5 Clientes
+    top_clientes = cabeceras.filter(dia__gte=desde, cliente__isnull=False) \
+        .values('cliente', 'cliente__nombres') \
+        .annotate(num_compras=Sum('num_ventas')) \
+        .order_by('-num_compras')[:5]
+
+    # 4. Top Empleados (Por dinero vendido)
+    top_empleados = cabeceras.filter(dia__gte=desde, num_ventas__gt=0) \
+        .values('usuario', 'usuario__username', 'usuario__first_name', 'usuario__last_name') \
+        .annotate(dinero_vendido=Sum('total_vendido'), cantidad_ventas=Sum('num_ventas')) \
+        .order_by('-dinero_vendido')[:5]
+
+    return {
+        'total_ventas_hoy': totales_hoy['total'] or 0,
+        'cantidad_ventas_hoy': totales_hoy['cantidad'] or 0,
+        'top_productos': list(top_productos),
+        'top_clientes': list(top_clientes),
+        'top_empleados': list(top_empleados),
+        'dias_ranking': DIAS_RANKING,
+    }
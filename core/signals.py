@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Venta, Compra, Movimiento, Producto
+from . import alertas, cache_dashboard, miniaturas, tickets
+from .buscador import indice
+
+
+@receiver([post_save, post_delete], sender=Venta)
+@receiver([post_save, post_delete], sender=Compra)
+@receiver([post_save, post_delete], sender=Movimiento)
+def invalidar_dashboard(sender, **kwargs):
+    # Esperamos al COMMIT: si invalidamos antes, otro request podría
+    # recalcular con datos viejos y volver a guardarlos en el cache.
+    transaction.on_commit(cache_dashboard.invalidar)
+
+
+@receiver([post_save, post_delete], sender=Venta)
+def olvidar_ticket(sender, instance, created=False, **kwargs):
+    # Una venta recién creada no tiene ticket guardado; solo importa si la editan (admin)
+    if not created:
+        tickets.olvidar_ticket(instance.id_venta)
+
+
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance, **kwargs):
+    transaction.on_commit(lambda: indice.actualizar(instance))
+
+
+@receiver(post_save, sender=Producto)
+def alerta_producto(sender, instance, update_fields=None, **kwargs):
+    # Editar el mínimo, activar o desactivar también puede meter/sacar el producto de las alertas
+    if update_fields is not None and not {'stock', 'stock_minimo', 'activo'} & set(update_fields):
+        return
+    alertas.revisar_ids([instance.id_producto], origen="Edición del producto")
+
+
+@receiver(post_save, sender=Producto)
+def miniaturas_producto(sender, instance, update_fields=None, **kwargs):
+    if not instance.imagen or (update_fields is not None and 'imagen' not in update_fields):
+        return
+    nombre = instance.imagen.name
+    transaction.on_commit(lambda: miniaturas.encolar(nombre))
+
+
+@receiver(post_delete, sender=Producto)
+def desindexar_producto(sender, instance, **kwargs):
+    id_producto = instance.id_producto
+    transaction.on_commit(lambda: indice.quitar(id_producto))
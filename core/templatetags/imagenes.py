@@ -0,0 +1,10 @@
+from django import template
+from core.miniaturas import url_miniatura
+
+register = template.Library()
+
+
+@register.filter
+def miniatura(imagen, tamano='chica'):
+    """{{ p.imagen|miniatura }} o {{ p.imagen|miniatura:'media' }}"""
+    return url_miniatura(imagen, tamano)
@@ -1,3 +1,1270 @@
-from django.test import TestCase
+import csv
+import datetime
+import importlib
+import io
+import json
+import re
+import shutil
+import tempfile
+import numpy as np
+from PIL import Image
+from decimal import Decimal
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F, Sum
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import HttpResponse
+from django.urls import path, reverse, get_resolver
+from django.utils import timezone
+from unittest import mock, skipUnless
+from . import buscador
+from .buscador import indice
+from . import alertas, cache_dashboard, catalogo, miniaturas, pronostico, rendimiento, tickets
+from .importar import importar_productos
+from .kardex import generar_corte, fin_del_dia, stock_en_fecha
+from .paginacion import paginar
+from .models import (
+    User, Categoria, Proveedor, Producto, Cliente, Venta, DetalleVenta, Compra, Movimiento, ResumenDiario, CorteStock,
+    StockBajo, EventoStock,
+)
+from .operaciones import registrar_venta, registrar_compra, ajustar_stock
+from .reportes import resumen_financiero
 
-# Create your tests here.
+# ==========================================
+# PRUEBAS DE RENDIMIENTO (CONSULTAS POR VISTA)
+# ==========================================
+# Cada vista de core/urls.py se mide con la BD chica y con la BD más grande
+# (más productos, ventas con más líneas, kardex más largo...). La cantidad de
+# consultas tiene que ser LA MISMA en los dos tamaños: si crece con los datos
+# hay un N+1 (por ejemplo un .producto perezoso dentro de un for).
+#
+#   python manage.py test core
+#
+# Al agregar una vista nueva hay que sumarla a VISTAS (o a SIN_MEDIR con el
+# motivo); test_todas_las_vistas_estan_medidas falla si se olvida.
+
+CHICO = 3
+GRANDE = 12
+MAX_CONSULTAS = 15      # Techo para cualquier vista, con BD chica o grande
+
+# Nombre de la URL -> función que arma el request a partir de los datos sembrados:
+# devuelve (args de la URL, querystring o cuerpo JSON, método)
+VISTAS = {
+    'home': lambda d: ([], {}, 'get'),
+    'crear_empleado': lambda d: ([], {}, 'get'),
+    'crear_venta': lambda d: ([], {}, 'get'),
+    'ticket_venta': lambda d: ([d['venta'].id_venta], {}, 'get'),
+    'ticket_escpos': lambda d: ([d['venta'].id_venta], {}, 'get'),
+    'lista_productos': lambda d: ([], {}, 'get'),
+    'agregar_producto': lambda d: ([], {}, 'get'),
+    'editar_producto': lambda d: ([d['producto'].id_producto], {}, 'get'),
+    'importar_productos': lambda d: ([], {}, 'get'),
+    'lista_clientes': lambda d: ([], {}, 'get'),
+    'api_producto': lambda d: ([d['producto'].id_producto], {}, 'get'),
+    'api_buscar_productos': lambda d: ([], {'q': 'tornillo'}, 'get'),
+    'api_productos_lote': lambda d: ([], {'ids': [p.id_producto for p in d['productos']]}, 'post'),
+    'api_catalogo': lambda d: ([], {}, 'get'),
+    'api_catalogo_cambios': lambda d: ([], {'desde': 1}, 'get'),
+    'api_guardar_venta': lambda d: ([], {
+        'items': [{'id': p.id_producto, 'cantidad': 1, 'precio': 10} for p in d['productos']],
+        'total': 10 * len(d['productos']), 'id_cliente': d['cliente'].id_cliente,
+    }, 'post'),
+    'api_buscar_clientes': lambda d: ([], {'q': 'cliente'}, 'get'),
+    'api_crear_cliente': lambda d: ([], {'nombres': 'Nuevo', 'cedula_ruc': f"N-{d['k']}"}, 'post'),
+    'lista_categorias': lambda d: ([], {}, 'get'),
+    'agregar_categoria': lambda d: ([], {}, 'get'),
+    'editar_categoria': lambda d: ([d['categoria'].id_categoria], {}, 'get'),
+    'lista_proveedores': lambda d: ([], {}, 'get'),
+    'agregar_proveedor': lambda d: ([], {}, 'get'),
+    'crear_compra': lambda d: ([], {}, 'get'),
+    'api_guardar_compra': lambda d: ([], {
+        'items': [{'id': p.id_producto, 'cantidad': 5, 'precio': 6} for p in d['productos']],
+        'total': 30 * len(d['productos']), 'id_proveedor': d['proveedor'].id_proveedor,
+    }, 'post'),
+    'reporte_financiero': lambda d: ([], {}, 'get'),
+    'panel_rendimiento': lambda d: ([], {}, 'get'),
+    'exportar_csv': lambda d: (['ventas'], {}, 'get'),
+    'reportar_perdida': lambda d: ([d['producto'].id_producto], {}, 'get'),
+    'eliminar_producto': lambda d: ([d['producto'].id_producto], {}, 'get'),
+    'activar_producto': lambda d: ([d['producto'].id_producto], {}, 'get'),
+    'editar_cliente': lambda d: ([d['cliente'].id_cliente], {}, 'get'),
+    'editar_proveedor': lambda d: ([d['proveedor'].id_proveedor], {}, 'get'),
+    'historial_producto': lambda d: ([d['producto'].id_producto], {'fecha': timezone.localdate().isoformat()}, 'get'),
+    'stock_bajo': lambda d: ([], {}, 'get'),
+    'api_stock_bajo': lambda d: ([], {}, 'get'),
+    'compras_sugeridas': lambda d: ([], {'entrega': 7, 'cobertura': 14}, 'get'),
+    'lista_empleados': lambda d: ([], {}, 'get'),
+    'editar_empleado': lambda d: ([d['empleado'].pk], {}, 'get'),
+    'estado_empleado': lambda d: ([d['empleado'].pk], {}, 'get'),
+}
+
+SIN_MEDIR = {
+    'login': 'vista de Django',
+    'logout': 'vista de Django',
+}
+
+
+class Sembrador:
+    """Agrega datos de a "tamaños": con tamaño k, las ventas traen k líneas, el producto k movimientos, etc."""
+
+    def __init__(self, admin):
+        self.admin = admin
+        self.n = 0
+
+    def _nombre(self, prefijo):
+        self.n += 1
+        return f"{prefijo} {self.n}"
+
+    def sembrar(self, k):
+        categorias = [Categoria.objects.create(nombre=self._nombre('Categoría')) for _ in range(k)]
+        proveedores = [
+            Proveedor.objects.create(empresa=self._nombre('Proveedor'), ruc=f"J{self.n:06d}", telefono='0', direccion='-')
+            for _ in range(k)
+        ]
+        productos = [
+            Producto.objects.create(
+                nombre=self._nombre('Tornillo galvanizado'), categoria=categorias[i % k],
+                precio_compra=Decimal('6.00'), precio_venta=Decimal('10.00'),
+                stock=1000 if i < 2 * k else 2,     # El último tercio queda bajo el mínimo (alertas)
+            )
+            for i in range(3 * k)
+        ]
+        clientes = [
+            Cliente.objects.create(nombres=self._nombre('Cliente'), cedula_ruc=f"C-{self.n}")
+            for _ in range(k)
+        ]
+        empleados = [
+            User.objects.create_user(self._nombre('empleado').replace(' ', ''), password='x', role='empleado')
+            for _ in range(k)
+        ]
+        carrito = productos[:k]
+        for i in range(k):
+            venta = registrar_venta(
+                empleados[i], [{'id': p.id_producto, 'cantidad': 1, 'precio': 10} for p in carrito],
+                total=10 * k, id_cliente=clientes[i].id_cliente,
+            )
+            registrar_compra(
+                self.admin, proveedores[i].id_proveedor,
+                [{'id': p.id_producto, 'cantidad': 5, 'precio': 6} for p in carrito], total=30 * k,
+            )
+            ajustar_stock(self.admin, carrito[0].id_producto, -1, "Prueba")
+        generar_corte(fin_del_dia(timezone.localdate() - datetime.timedelta(days=1)))
+        return {
+            'k': k,
+            'venta': venta,                  # k líneas
+            'producto': carrito[0],          # 3k movimientos
+            'productos': carrito,
+            'cliente': clientes[0],
+            'categoria': categorias[0],
+            'proveedor': proveedores[0],
+            'empleado': empleados[0],
+        }
+
+
+class ConsultasPorVistaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin_pruebas', password='x', role='admin')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.sembrador = Sembrador(self.admin)
+
+    def contar(self, nombre, datos):
+        """Consultas de un request en frío (sin cache del dashboard, tickets, catálogo ni índice)"""
+        args, parametros, metodo = VISTAS[nombre](datos)
+        url = reverse(nombre, args=args)
+        cache.clear()
+        indice.invalidar()
+        with CaptureQueriesContext(connection) as consultas:
+            if metodo == 'post':
+                respuesta = self.client.post(url, json.dumps(parametros), content_type='application/json')
+            else:
+                respuesta = self.client.get(url, parametros)
+            if respuesta.streaming:
+                b''.join(respuesta.streaming_content)
+        self.assertLess(respuesta.status_code, 400, f"{nombre} respondió {respuesta.status_code}")
+        if respuesta.get('Content-Type', '').startswith('application/json'):
+            cuerpo = respuesta.json()
+            if isinstance(cuerpo, dict):
+                self.assertNotEqual(cuerpo.get('status'), 'error', f"{nombre}: {cuerpo.get('mensaje')}")
+        return len(consultas), [q['sql'] for q in consultas.captured_queries]
+
+    def test_consultas_no_crecen_con_los_datos(self):
+        datos = self.sembrador.sembrar(CHICO)
+        chico = {nombre: self.contar(nombre, datos) for nombre in VISTAS}
+
+        datos = self.sembrador.sembrar(GRANDE)
+        grande = {nombre: self.contar(nombre, datos) for nombre in VISTAS}
+
+        for nombre in VISTAS:
+            with self.subTest(vista=nombre):
+                (n_chico, _), (n_grande, sql) = chico[nombre], grande[nombre]
+                self.assertEqual(
+                    n_grande, n_chico,
+                    f"{nombre}: {n_chico} consultas con la BD chica y {n_grande} con la grande:\n" + '\n'.join(sql)
+                )
+                self.assertLessEqual(n_grande, MAX_CONSULTAS, '\n'.join(sql))
+
+    def test_todas_las_vistas_estan_medidas(self):
+        nombres = {p.name for p in get_resolver('core.urls').url_patterns if p.name}
+        faltan = nombres - set(VISTAS) - set(SIN_MEDIR)
+        self.assertFalse(faltan, f"Vistas sin prueba de consultas: {sorted(faltan)}")
+
+
+# ==========================================
+# PLANES DE CONSULTA (SQLITE)
+# ==========================================
+# Las consultas calientes deben usar un índice. Con EXPLAIN QUERY PLAN de
+# SQLite un "SCAN tabla" sin "USING INDEX" es recorrer la tabla completa.
+
+ESCANEO_COMPLETO = re.compile(r'\bSCAN (\w+)$')
+
+# Nombre -> función que arma el QuerySet (recibe los datos sembrados)
+CONSULTAS_CALIENTES = {
+    'producto por código (POS)': lambda d: Producto.objects.filter(id_producto=d['producto'].id_producto, activo=True),
+    'kardex del producto': lambda d: Movimiento.objects.filter(producto=d['producto']).order_by('-fecha', '-id')[:100],
+    'kardex desde un corte': lambda d: Movimiento.objects.filter(
+        producto=d['producto'], fecha__gt=timezone.now() - datetime.timedelta(days=30)
+    ),
+    'último corte del producto': lambda d: CorteStock.objects.filter(
+        producto=d['producto'], hasta__lte=timezone.now()
+    ).order_by('-hasta')[:1],
+    'líneas del ticket': lambda d: d['venta'].detalles.select_related('producto'),
+    'catálogo cambiado (POS)': lambda d: Producto.objects.filter(modificado__gt=timezone.now() - datetime.timedelta(hours=1)),
+    'dashboard del día': lambda d: ResumenDiario.objects.filter(dia=timezone.localdate(), producto__isnull=True),
+    'ranking de productos': lambda d: ResumenDiario.objects.filter(
+        dia__gte=timezone.localdate() - datetime.timedelta(days=30), producto__isnull=False
+    ),
+    'ventas del cliente': lambda d: Venta.objects.filter(cliente=d['cliente']),
+    'ventas del rango (reporte financiero)': lambda d: Venta.objects.filter(
+        fecha_venta__range=(timezone.now() - datetime.timedelta(days=30), timezone.now())
+    ).order_by('-fecha_venta', '-id_venta')[:50],
+    'líneas del rango (reporte financiero)': lambda d: DetalleVenta.objects.filter(
+        venta__fecha_venta__range=(timezone.now() - datetime.timedelta(days=30), timezone.now())
+    ),
+    'ventas de un producto': lambda d: DetalleVenta.objects.filter(producto=d['producto']).values('venta'),
+    'inventario por categoría': lambda d: Producto.objects.filter(
+        activo=True, categoria=d['categoria'], id_producto__gt=0
+    ).order_by('id_producto')[:50],
+    'compras del rango (exportar)': lambda d: Compra.objects.filter(
+        fecha_compra__range=(timezone.now() - datetime.timedelta(days=30), timezone.now())
+    ),
+    'últimos eventos de stock': lambda d: EventoStock.objects.order_by('-fecha', '-id')[:20],
+    'eventos de stock del producto': lambda d: EventoStock.objects.filter(producto=d['producto']).order_by('-fecha'),
+}
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN es de SQLite')
+class PlanesDeConsultaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user('admin_pruebas', password='x', role='admin')
+        cls.datos = Sembrador(admin).sembrar(CHICO)
+
+    def test_consultas_calientes_usan_indices(self):
+        for nombre, consulta in CONSULTAS_CALIENTES.items():
+            with self.subTest(consulta=nombre):
+                plan = consulta(self.datos).explain()
+                escaneos = [
+                    m.group(1) for linea in plan.splitlines()
+                    if (m := ESCANEO_COMPLETO.search(linea.strip()))
+                ]
+                self.assertFalse(escaneos, f"{nombre} recorre completa(s) {escaneos}:\n{plan}")
+
+
+# ==========================================
+# ALERTAS DE STOCK BAJO
+# ==========================================
+# El conjunto StockBajo tiene que quedar igual a recorrer el catálogo, y cada
+# cruce del mínimo deja su evento.
+
+class AlertasDeStockTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin_pruebas', password='x', role='admin')
+        cls.proveedor = Proveedor.objects.create(empresa='Proveedor', ruc='J000001', telefono='0', direccion='-')
+
+    def setUp(self):
+        self.producto = Producto.objects.create(
+            nombre='Clavo 2"', precio_compra=Decimal('1.00'), precio_venta=Decimal('2.00'), stock=8, stock_minimo=5,
+        )
+
+    def en_alerta(self):
+        return StockBajo.objects.filter(producto=self.producto).exists()
+
+    def eventos(self):
+        return list(EventoStock.objects.filter(producto=self.producto).order_by('id').values_list('tipo', 'stock'))
+
+    def test_venta_y_compra_cruzan_el_minimo(self):
+        registrar_venta(self.admin, [{'id': self.producto.id_producto, 'cantidad': 2, 'precio': 2}], total=4)
+        self.assertFalse(self.en_alerta())
+
+        venta = registrar_venta(self.admin, [{'id': self.producto.id_producto, 'cantidad': 3, 'precio': 2}], total=6)
+        self.assertTrue(self.en_alerta())
+        self.assertEqual(self.eventos(), [('bajo', Decimal('3'))])
+        self.assertIn(f"Venta #{venta.id_venta}", EventoStock.objects.get(producto=self.producto).origen)
+
+        registrar_compra(self.admin, self.proveedor.id_proveedor, [{'id': self.producto.id_producto, 'cantidad': 10, 'precio': 1}], total=10)
+        self.assertFalse(self.en_alerta())
+        self.assertEqual(self.eventos(), [('bajo', Decimal('3')), ('repuesto', Decimal('13'))])
+
+    def test_ajuste_edicion_y_papelera(self):
+        ajustar_stock(self.admin, self.producto.id_producto, -4, "PÉRDIDA: prueba")
+        self.assertTrue(self.en_alerta())
+
+        self.producto.refresh_from_db()
+        self.producto.stock_minimo = 2
+        self.producto.save()
+        self.assertFalse(self.en_alerta())
+
+        self.producto.stock_minimo = 10
+        self.producto.save()
+        self.assertTrue(self.en_alerta())
+
+        self.producto.activo = False       # En la papelera no avisa
+        self.producto.save(update_fields=['activo'])
+        self.assertFalse(self.en_alerta())
+
+    def test_reconstruir_coincide_con_el_catalogo(self):
+        Producto.objects.filter(pk=self.producto.pk).update(stock=1)     # Sin señales, como una carga masiva
+        self.assertFalse(self.en_alerta())
+        alertas.reconstruir()
+        esperados = set(Producto.objects.filter(activo=True, stock__lte=F('stock_minimo')).values_list('pk', flat=True))
+        self.assertEqual(set(StockBajo.objects.values_list('producto_id', flat=True)), esperados)
+        self.assertIn(self.producto.pk, esperados)
+
+
+# ==========================================
+# PRONÓSTICO DE DEMANDA Y COMPRAS SUGERIDAS
+# ==========================================
+
+class PronosticoTest(TestCase):
+
+    def test_demanda_vectorizada(self):
+        # Producto 0: 2 por día todos los días. Producto 1: solo 14 ayer. Producto 2: nada.
+        n_dias = 60
+        filas = np.array([0] * n_dias + [1])
+        dias = np.array(list(range(n_dias)) + [n_dias - 1])
+        cantidades = np.array([2.0] * n_dias + [14.0])
+        promedio, suavizado, desviacion = pronostico.demanda(filas, dias, cantidades, 3, n_dias, ventana=7, alfa=0.5)
+
+        np.testing.assert_allclose(promedio, [2, 2, 0])
+        np.testing.assert_allclose(suavizado, [2, 0.5 * 14 / (1 - 0.5 ** n_dias), 0])
+        np.testing.assert_allclose(desviacion[[0, 2]], [0, 0], atol=1e-9)
+        self.assertAlmostEqual(desviacion[1], np.std([0] * (n_dias - 1) + [14]))
+
+    def test_ordenes_por_proveedor_de_la_ultima_compra(self):
+        admin = User.objects.create_user('admin_pruebas', password='x', role='admin')
+        viejo = Proveedor.objects.create(empresa='Proveedor viejo', ruc='J1', telefono='0', direccion='-')
+        nuevo = Proveedor.objects.create(empresa='Proveedor nuevo', ruc='J2', telefono='0', direccion='-')
+        producto = lambda nombre, stock: Producto.objects.create(
+            nombre=nombre, precio_compra=Decimal('2.00'), precio_venta=Decimal('3.00'), stock=stock, stock_minimo=1,
+        )
+        rapido, lento, nuevo_sin_compras = producto('Cemento', 0), producto('Bisagra', 0), producto('Taladro', 0)
+        for proveedor in (viejo, nuevo):
+            registrar_compra(admin, proveedor.id_proveedor, [{'id': rapido.id_producto, 'cantidad': 10, 'precio': 2}], total=20)
+        registrar_compra(admin, viejo.id_proveedor, [{'id': lento.id_producto, 'cantidad': 1000, 'precio': 2}], total=2000)
+
+        # 10 diarios de cemento los últimos 30 días; la bisagra no se vende
+        hoy = timezone.localdate()
+        ResumenDiario.objects.bulk_create([
+            ResumenDiario(dia=hoy - datetime.timedelta(days=d), producto=rapido, usuario=admin, cantidad=10)
+            for d in range(1, 31)
+        ])
+
+        ordenes = pronostico.sugerir_compras(hoy, dias=30, dias_entrega=7, dias_cobertura=14)
+        por_proveedor = {o['proveedor'].empresa if o['proveedor'] else None: o for o in ordenes}
+        self.assertEqual(set(por_proveedor), {'Proveedor nuevo', None})
+
+        linea, = por_proveedor['Proveedor nuevo']['lineas']
+        self.assertEqual(linea['id'], rapido.id_producto)
+        self.assertAlmostEqual(linea['demanda_diaria'], 10, places=1)
+        # Sin variación no hay stock de seguridad: 7 días de entrega + 14 de cobertura = 210, menos el stock (20)
+        self.assertEqual(linea['cantidad'], 190)
+        self.assertEqual(linea['costo'], 380)
+        self.assertEqual([l['id'] for l in por_proveedor[None]['lineas']], [nuevo_sin_compras.id_producto])
+
+        # Mismo formato de dinero que el resto del sistema (córdobas)
+        salida = io.StringIO()
+        call_command('sugerir_compras', '--dias', '30', stdout=salida)
+        self.assertIn('Proveedor nuevo: 1 productos, C$ 380.00', salida.getvalue())
+        self.client.force_login(admin)
+        pagina = self.client.get(reverse('compras_sugeridas')).content.decode()
+        self.assertIn('C$ ', pagina)
+        self.assertNotRegex(pagina, r'>\s*\$')
+
+
+# ==========================================
+# MOTOR DE OPERACIONES (VENTAS Y COMPRAS)
+# ==========================================
+
+def crear_producto(nombre='Martillo', **campos):
+    valores = {'precio_compra': Decimal('10.00'), 'precio_venta': Decimal('15.00'), 'stock': 0}
+    valores.update(campos)
+    return Producto.objects.create(nombre=nombre, **valores)
+
+
+class OperacionesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin_pruebas', password='x', role='admin')
+        cls.proveedor = Proveedor.objects.create(empresa='Proveedor', ruc='J000001', telefono='0', direccion='-')
+
+    def test_venta_rechaza_cantidades_no_positivas(self):
+        producto = crear_producto(stock=10)
+        for cantidad in (0, -3):
+            with self.subTest(cantidad=cantidad):
+                with self.assertRaisesMessage(Exception, 'Cantidad inválida'):
+                    registrar_venta(self.admin, [{'id': producto.id_producto, 'cantidad': cantidad, 'precio': 15}], total=0)
+                producto.refresh_from_db()
+                self.assertEqual(producto.stock, 10)
+        self.assertFalse(Venta.objects.exists())
+        self.assertFalse(Movimiento.objects.filter(producto=producto).exists())
+
+    def comprar(self, producto, *lineas):
+        return registrar_compra(self.admin, self.proveedor.id_proveedor, [
+            {'id': producto.id_producto, 'cantidad': cantidad, 'precio': precio} for cantidad, precio in lineas
+        ], total=sum(c * Decimal(p) for c, p in lineas))
+
+    def test_costo_promedio_sin_existencias_es_el_de_la_factura(self):
+        producto = crear_producto(stock=0, precio_compra=Decimal('10.00'))
+        self.comprar(producto, (4, '7.00'))
+        producto.refresh_from_db()
+        self.assertEqual((producto.stock, producto.precio_compra), (Decimal('4'), Decimal('7.00')))
+
+    def test_costo_promedio_ponderado_con_existencias(self):
+        producto = crear_producto(stock=10, precio_compra=Decimal('10.00'))
+        # Líneas repetidas del mismo producto: 5 a 16 + 5 a 16 -> (10*10 + 160) / 20 = 13
+        self.comprar(producto, (5, '16.00'), (5, '16.00'))
+        producto.refresh_from_db()
+        self.assertEqual((producto.stock, producto.precio_compra), (Decimal('20'), Decimal('13.00')))
+        movimiento = Movimiento.objects.get(producto=producto, tipo='entrada')
+        self.assertEqual((movimiento.cantidad, movimiento.saldo), (Decimal('10'), Decimal('20')))
+
+
+class CostoDeVentaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin_pruebas', password='x', role='admin')
+        cls.proveedor = Proveedor.objects.create(empresa='Proveedor', ruc='J000001', telefono='0', direccion='-')
+
+    def vender(self, producto, cantidad=1):
+        venta = registrar_venta(self.admin, [{'id': producto.id_producto, 'cantidad': cantidad, 'precio': 15}], total=15 * cantidad)
+        return venta.detalles.get()
+
+    def test_la_venta_guarda_el_costo_del_momento(self):
+        producto = crear_producto(stock=0)
+        registrar_compra(self.admin, self.proveedor.id_proveedor, [{'id': producto.id_producto, 'cantidad': 10, 'precio': 8}], total=80)
+        detalle = self.vender(producto)
+        # Una compra posterior cambia el costo promedio, pero no la venta ya hecha
+        registrar_compra(self.admin, self.proveedor.id_proveedor, [{'id': producto.id_producto, 'cantidad': 9, 'precio': 17}], total=153)
+        detalle.refresh_from_db()
+        self.assertEqual(detalle.costo_unitario, Decimal('8.00'))
+
+    def test_completar_costos_usa_la_ultima_compra_anterior(self):
+        comprado = crear_producto('Comprado', stock=0)
+        registrar_compra(self.admin, self.proveedor.id_proveedor, [{'id': comprado.id_producto, 'cantidad': 5, 'precio': 6}], total=30)
+        nunca_comprado = crear_producto('Sin compras', stock=5, precio_compra=Decimal('4.50'))
+        detalles = [self.vender(comprado), self.vender(nunca_comprado)]
+        DetalleVenta.objects.update(costo_unitario=None)     # Ventas de antes de la columna
+        Producto.objects.filter(pk=comprado.pk).update(precio_compra=Decimal('99.00'))
+
+        call_command('completar_costos', stdout=io.StringIO())
+
+        for detalle in detalles:
+            detalle.refresh_from_db()
+        self.assertEqual([d.costo_unitario for d in detalles], [Decimal('6.00'), Decimal('4.50')])
+
+    def test_migracion_completa_los_costos(self):
+        migracion = importlib.import_module('core.migrations.0019_completar_costos')
+        producto = crear_producto(stock=5, precio_compra=Decimal('4.50'))
+        detalle = self.vender(producto)
+        DetalleVenta.objects.update(costo_unitario=None)
+        migracion.completar_costos(django_apps, None)
+        detalle.refresh_from_db()
+        self.assertEqual(detalle.costo_unitario, Decimal('4.50'))
+
+    def test_reporte_y_resumen_usan_el_mismo_costo_sin_foto(self):
+        producto = crear_producto(stock=5, precio_compra=Decimal('4.50'))
+        self.vender(producto, 2)
+        DetalleVenta.objects.update(costo_unitario=None)   # Línea sin costo guardado
+        hoy = timezone.localdate()
+        reporte = resumen_financiero(timezone.make_aware(datetime.datetime.combine(hoy, datetime.time.min)), fin_del_dia(hoy))
+        call_command('reconstruir_resumen', stdout=io.StringIO())
+        resumen = ResumenDiario.objects.filter(producto=producto).aggregate(costo=Sum('costo'))['costo']
+        self.assertEqual(reporte['por_dia'][0]['costo'], Decimal('9.00'))
+        self.assertEqual(resumen, Decimal('9.00'))
+
+
+class ResumenDiarioTest(TestCase):
+
+    CAMPOS = ['num_ventas', 'total_vendido', 'descuento', 'cantidad', 'subtotal', 'costo', 'cantidad_comprada', 'monto_comprado']
+
+    def totales(self):
+        """Totales por (día, producto, cajero, cliente): así se lee la tabla, con Sum()"""
+        return {
+            (f['dia'], f['producto'], f['usuario'], f['cliente']): tuple(f[c] for c in self.CAMPOS)
+            for f in ResumenDiario.objects.values('dia', 'producto', 'usuario', 'cliente')
+            .annotate(**{c: Sum(c) for c in self.CAMPOS}).order_by()
+        }
+
+    def test_incremental_igual_a_reconstruir(self):
+        admin = User.objects.create_user('admin_pruebas', password='x', role='admin')
+        cajero = User.objects.create_user('cajero', password='x', role='empleado')
+        cliente = Cliente.objects.create(nombres='Cliente', cedula_ruc='C-1')
+        proveedor = Proveedor.objects.create(empresa='Proveedor', ruc='J000001', telefono='0', direccion='-')
+        a, b = crear_producto('A', stock=50), crear_producto('B', stock=50)
+
+        registrar_venta(cajero, [{'id': a.id_producto, 'cantidad': 2, 'precio': 15}, {'id': b.id_producto, 'cantidad': 1, 'precio': 15}], total=45)
+        registrar_venta(cajero, [{'id': a.id_producto, 'cantidad': 3, 'precio': 15}], total=40, id_cliente=cliente.id_cliente, descuento=5)
+        registrar_venta(admin, [{'id': a.id_producto, 'cantidad': 1, 'precio': 15}, {'id': a.id_producto, 'cantidad': 1, 'precio': 15}], total=30)
+        registrar_compra(admin, proveedor.id_proveedor, [{'id': b.id_producto, 'cantidad': 10, 'precio': 9}], total=90)
+
+        incremental = self.totales()
+        call_command('reconstruir_resumen', stdout=io.StringIO())
+        self.assertEqual(self.totales(), incremental)
+        self.assertEqual(sum(v[0] for v in incremental.values()), 3)
+
+
+class ResumenFinancieroTest(TestCase):
+
+    def test_totales_por_dia_y_por_categoria(self):
+        cajero = User.objects.create_user('cajero', password='x', role='empleado')
+        herramientas = Categoria.objects.create(nombre='Herramientas')
+        pinturas = Categoria.objects.create(nombre='Pinturas')
+        martillo = crear_producto('Martillo', stock=10, categoria=herramientas)                              # Costo 10
+        pintura = crear_producto('Pintura', stock=10, categoria=pinturas, precio_compra=Decimal('20.00'))    # Costo 20
+
+        hoy = timezone.localdate()
+        ayer, anteayer = hoy - datetime.timedelta(days=1), hoy - datetime.timedelta(days=2)
+        con_descuento = registrar_venta(cajero, [
+            {'id': martillo.id_producto, 'cantidad': 2, 'precio': 15},
+            {'id': pintura.id_producto, 'cantidad': 1, 'precio': 30},
+        ], total=55, descuento=5)
+        normal = registrar_venta(cajero, [{'id': pintura.id_producto, 'cantidad': 1, 'precio': 30}], total=30)
+        fuera = registrar_venta(cajero, [{'id': martillo.id_producto, 'cantidad': 1, 'precio': 15}], total=15)
+        for venta, dia in ((con_descuento, anteayer), (normal, ayer), (fuera, hoy)):
+            Venta.objects.filter(pk=venta.pk).update(fecha_venta=timezone.make_aware(datetime.datetime.combine(dia, datetime.time(12))))
+
+        resumen = resumen_financiero(timezone.make_aware(datetime.datetime.combine(anteayer, datetime.time.min)), fin_del_dia(ayer))
+
+        # Anteayer: bruto 30 + 30 = 60, costo 20 + 20 = 40, descuento 5. Ayer: bruto 30, costo 20.
+        self.assertEqual(
+            [(d['dia'], d['num_ventas'], d['ingresos'], d['descuentos'], d['venta_bruta'], d['costo'], d['ganancia']) for d in resumen['por_dia']],
+            [(anteayer, 1, 55, 5, 60, 40, 15), (ayer, 1, 30, 0, 30, 20, 10)],
+        )
+        self.assertEqual(
+            (resumen['num_ventas'], resumen['total_ingresos'], resumen['total_descuentos'], resumen['ganancia_bruta'], resumen['ganancia_neta']),
+            (2, 85, 5, 30, 25),
+        )
+        self.assertEqual(
+            [(c['producto__categoria__nombre'], c['cantidad_vendida'], c['venta_bruta'], c['costo'], c['ganancia']) for c in resumen['por_categoria']],
+            [('Pinturas', 2, 60, 40, 20), ('Herramientas', 2, 30, 20, 10)],
+        )
+
+
+class VentaAdminTest(TestCase):
+
+    def test_ventas_de_solo_lectura_en_el_admin(self):
+        superusuario = User.objects.create_superuser('root', password='x', role='admin')
+        producto = crear_producto(stock=10)
+        venta = registrar_venta(superusuario, [{'id': producto.id_producto, 'cantidad': 1, 'precio': 15}], total=15)
+        self.client.force_login(superusuario)
+
+        self.assertEqual(self.client.get(reverse('admin:core_venta_change', args=[venta.pk])).status_code, 200)
+        self.assertEqual(self.client.post(reverse('admin:core_venta_change', args=[venta.pk]), {'total': '1'}).status_code, 403)
+        self.assertEqual(self.client.post(reverse('admin:core_venta_delete', args=[venta.pk]), {'post': 'yes'}).status_code, 403)
+        self.assertEqual(self.client.get(reverse('admin:core_venta_add')).status_code, 403)
+        venta.refresh_from_db()
+        self.assertEqual(venta.total, 15)
+        self.assertEqual(ResumenDiario.objects.filter(producto__isnull=True).aggregate(n=Sum('num_ventas'))['n'], 1)
+
+
+class CacheDashboardTest(TestCase):
+
+    def test_una_venta_invalida_el_dashboard(self):
+        cajero = User.objects.create_user('cajero', password='x', role='empleado')
+        producto = crear_producto(stock=10)
+        cache.clear()
+
+        antes = cache_dashboard.contexto_dashboard()
+        self.assertEqual(cache_dashboard.contexto_dashboard(), antes)      # Segunda lectura: del cache
+        self.assertEqual((cache_dashboard.estadisticas()['hits'], cache_dashboard.estadisticas()['misses']), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            venta = registrar_venta(cajero, [{'id': producto.id_producto, 'cantidad': 1, 'precio': 15}], total=15)
+
+        despues = cache_dashboard.contexto_dashboard()
+        self.assertEqual(cache_dashboard.estadisticas()['misses'], 2)
+        self.assertEqual([v.id_venta for v in despues['ultimas_ventas']], [venta.id_venta])
+        self.assertEqual(antes['ultimas_ventas'], [])
+
+
+class EstadisticasClienteTest(TestCase):
+
+    def reconciliar(self, *opciones):
+        salida = io.StringIO()
+        call_command('reconciliar_clientes', *opciones, stdout=salida)
+        return salida.getvalue()
+
+    def test_estadisticas_iguales_a_reconciliar(self):
+        cajero = User.objects.create_user('cajero', password='x', role='empleado')
+        frecuente = Cliente.objects.create(nombres='Frecuente', cedula_ruc='C-1')
+        Cliente.objects.create(nombres='Nunca compró', cedula_ruc='C-2')
+        producto = crear_producto(stock=10)
+        for total in (15, 30):
+            registrar_venta(cajero, [{'id': producto.id_producto, 'cantidad': 1, 'precio': total}], total=total, id_cliente=frecuente.id_cliente)
+
+        frecuente.refresh_from_db()
+        self.assertEqual((frecuente.num_compras, frecuente.total_gastado), (2, Decimal('45')))
+        self.assertIn('0 clientes con diferencias', self.reconciliar('--solo-reporte'))
+
+        Cliente.objects.filter(pk=frecuente.pk).update(num_compras=7)
+        self.assertIn('1 clientes con diferencias', self.reconciliar('--solo-reporte'))
+        self.reconciliar()
+        frecuente.refresh_from_db()
+        self.assertEqual(frecuente.num_compras, 2)
+
+
+# ==========================================
+# BUSCADOR Y CATÁLOGO DEL POS
+# ==========================================
+
+class BuscadorTest(TestCase):
+
+    def setUp(self):
+        indice.invalidar()
+        self.tubo = crear_producto('Tubo PVC presión', descripcion='Para agua fría')
+        self.codo = crear_producto('Codo galvanizado', descripcion='Unión para tubería')
+        self.viejo = crear_producto('Tubo de cobre', activo=False)
+
+    def test_prefijos_sin_acentos(self):
+        self.assertEqual(indice.buscar('PRESION'), [self.tubo.id_producto])
+        self.assertEqual(indice.buscar('tub pres'), [self.tubo.id_producto])
+        # Primero lo que coincide en el nombre, después en la descripción
+        self.assertEqual(indice.buscar('tub'), [self.tubo.id_producto, self.codo.id_producto])
+        self.assertEqual(indice.buscar('tubo', activo=False), [self.viejo.id_producto])
+
+    def test_cambio_de_otro_proceso_no_se_pierde(self):
+        self.assertEqual(indice.buscar('codo'), [self.codo.id_producto])
+        # Otro worker guarda un producto: su señal sube la versión en el cache compartido
+        llave = Producto.objects.bulk_create([Producto(nombre='Llave de paso', precio_compra=1, precio_venta=2)])[0]
+        cache.set(buscador.CLAVE_VERSION, 'version-de-otro-proceso', None)
+        # Este proceso guarda otro antes de volver a buscar: no debe quedarse con su copia vieja
+        self.codo.nombre = 'Codo de cobre'
+        self.codo.save()
+        indice.actualizar(self.codo)
+        self.assertEqual(indice.buscar('llave'), [llave.id_producto])
+        self.assertEqual(indice.buscar('cobre', activo=None), [self.codo.id_producto, self.viejo.id_producto])
+
+    def test_busqueda_por_codigo(self):
+        self.assertEqual(indice.buscar(f" {self.codo.id_producto} "), [self.codo.id_producto])
+        for texto in ('²', '①'):       # isdigit() es True, pero int() no los acepta
+            with self.subTest(texto=texto):
+                self.assertEqual(indice.buscar(texto), [])
+
+    def test_api_no_falla_con_digitos_unicode(self):
+        admin = User.objects.create_user('admin_pruebas', password='x', role='admin')
+        self.client.force_login(admin)
+        respuesta = self.client.get(reverse('api_buscar_productos'), {'q': '①'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json(), [])
+
+
+class CatalogoTest(TestCase):
+
+    def setUp(self):
+        admin = User.objects.create_user('admin_pruebas', password='x', role='admin')
+        self.client.force_login(admin)
+        self.admin = admin
+        self.quieto, self.vendido, self.retirado = (crear_producto(n, stock=10) for n in ('Quieto', 'Vendido', 'Retirado'))
+        # La versión queda una hora atrás y 'Quieto' fuera del margen de reenvío (catalogo.MARGEN)
+        Producto.objects.update(modificado=timezone.now() - datetime.timedelta(hours=1))
+        Producto.objects.filter(pk=self.quieto.pk).update(modificado=timezone.now() - datetime.timedelta(hours=2))
+
+    def test_etag_y_304(self):
+        url = reverse('api_catalogo')
+        primera = self.client.get(url)
+        self.assertEqual(primera.status_code, 200)
+        self.assertEqual(len(primera.json()['productos']), 3)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag']).status_code, 304)
+
+        ajustar_stock(self.admin, self.vendido.id_producto, -1, "Prueba")
+        segunda = self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(segunda.status_code, 200)
+        self.assertNotEqual(segunda['ETag'], primera['ETag'])
+
+    def test_cambios_desde_una_version(self):
+        version = self.client.get(reverse('api_catalogo')).json()['version']
+        ajustar_stock(self.admin, self.vendido.id_producto, -1, "Prueba")
+        self.retirado.activo = False
+        self.retirado.save()
+
+        delta = self.client.get(reverse('api_catalogo_cambios'), {'desde': version}).json()
+        self.assertEqual([p[0] for p in delta['productos']], [self.vendido.id_producto])
+        self.assertEqual(delta['productos'][0][3], 9)
+        self.assertEqual(delta['inactivos'], [self.retirado.id_producto])
+        self.assertGreater(delta['version'], version)
+
+    def test_version_invalida(self):
+        for desde in ('abc', str(10 ** 30), str(10 ** 20)):
+            with self.subTest(desde=desde):
+                respuesta = self.client.get(reverse('api_catalogo_cambios'), {'desde': desde})
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertEqual(respuesta.json()['mensaje'], 'Versión inválida')
+        # Cero o negativa: el POS no tiene nada, va el catálogo completo
+        self.assertEqual(len(self.client.get(reverse('api_catalogo_cambios'), {'desde': -5}).json()['productos']), 3)
+
+
+class ProductosLoteTest(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('cajero', password='x', role='empleado'))
+        self.martillo = crear_producto('Martillo', stock=4)
+        self.retirado = crear_producto('Retirado', activo=False)
+
+    def test_orden_pedido_y_no_encontrados(self):
+        ids = [self.retirado.id_producto, self.martillo.id_producto, 999999, self.martillo.id_producto]
+        for respuesta in (
+            self.client.get(reverse('api_productos_lote'), {'ids': ','.join(map(str, ids))}),
+            self.client.post(reverse('api_productos_lote'), json.dumps({'ids': ids}), content_type='application/json'),
+        ):
+            productos = respuesta.json()['productos']
+            self.assertEqual([p['id'] for p in productos], ids)
+            self.assertEqual([p['encontrado'] for p in productos], [False, True, False, True])
+            self.assertEqual(productos[1]['stock'], 4)
+
+    def test_ids_invalidos(self):
+        respuesta = self.client.get(reverse('api_productos_lote'), {'ids': '1,dos'})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ObtenerProductoTest(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('cajero', password='x', role='empleado'))
+        self.martillo = crear_producto('Martillo', stock=4)
+
+    def test_error_inesperado_queda_en_el_log(self):
+        url = reverse('api_producto', args=[self.martillo.id_producto])
+        self.assertTrue(self.client.get(url).json()['encontrado'])
+        with mock.patch('core.views.datos_producto', side_effect=RuntimeError('se rompió')), \
+                self.assertLogs('core.views', 'ERROR') as registro:
+            self.assertEqual(self.client.get(url).json(), {'encontrado': False})
+        self.assertIn(f'obtener_producto #{self.martillo.id_producto}', registro.output[0])
+        self.assertIn('RuntimeError: se rompió', registro.output[0])
+
+
+# ==========================================
+# PAGINACIÓN POR CURSOR
+# ==========================================
+
+class PaginacionTest(TestCase):
+
+    def setUp(self):
+        # Empates en num_compras a propósito: el id es el que desempata
+        for i in range(23):
+            Cliente.objects.create(nombres=f'Cliente {i}', num_compras=i % 4)
+        self.clientes = Cliente.objects.all()
+        self.campos = ['-num_compras', '-id_cliente']
+        self.factory = RequestFactory()
+
+    def pagina(self, **params):
+        return paginar(self.clientes, self.campos, self.factory.get('/', params), tamano=5)
+
+    def test_ida_y_vuelta_sin_duplicados_ni_huecos(self):
+        esperado = list(self.clientes.order_by(*self.campos).values_list('id_cliente', flat=True))
+
+        paginas, pagina = [], self.pagina()
+        self.assertIsNone(pagina.anterior)
+        while True:
+            paginas.append([c.id_cliente for c in pagina])
+            if not pagina.siguiente:
+                break
+            pagina = self.pagina(despues=pagina.siguiente)
+        self.assertEqual(sum(paginas, []), esperado)
+        self.assertEqual([len(p) for p in paginas], [5, 5, 5, 5, 3])
+
+        # De vuelta desde la última página con ?antes= se recorren las mismas páginas
+        vuelta = []
+        while pagina.anterior:
+            pagina = self.pagina(antes=pagina.anterior)
+            vuelta.append([c.id_cliente for c in pagina])
+        self.assertEqual(vuelta, paginas[-2::-1])
+
+    def test_cursor_danado_vuelve_al_inicio(self):
+        self.assertEqual(
+            [c.id_cliente for c in self.pagina(despues='no-es-un-cursor')],
+            [c.id_cliente for c in self.pagina()],
+        )
+
+
+# ==========================================
+# EXPORTACIÓN CSV
+# ==========================================
+
+class ExportarCsvTest(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', role='admin')
+        self.client.force_login(self.admin)
+        self.cliente = Cliente.objects.create(nombres='José Peña')
+        self.taladro = crear_producto('Taladro ñ', stock=10, precio_compra=Decimal('40.00'))
+        self.venta = registrar_venta(self.admin, [
+            {'id': self.taladro.id_producto, 'cantidad': 2, 'precio': '55.50'},
+        ], total='111.00', id_cliente=self.cliente.id_cliente)
+        self.hoy = timezone.localdate().isoformat()
+
+    def descargar(self, tipo, **params):
+        respuesta = self.client.get(reverse('exportar_csv', args=[tipo]), {'fecha_inicio': self.hoy, 'fecha_fin': self.hoy, **params})
+        self.assertEqual(respuesta.status_code, 200)
+        return b''.join(respuesta.streaming_content).decode('utf-8')
+
+    def test_ventas_con_bom_y_acentos(self):
+        contenido = self.descargar('ventas')
+        self.assertTrue(contenido.startswith('\ufeff'))  # Excel necesita el BOM para leer UTF-8
+        filas = list(csv.reader(io.StringIO(contenido[1:])))
+        self.assertEqual(filas[0][:4], ['Venta', 'Fecha', 'Cajero', 'Cliente'])
+        self.assertEqual(len(filas), 2)
+        venta, _, cajero, cliente, _, total, id_producto, producto, cantidad, precio, subtotal, costo = filas[1]
+        self.assertEqual((venta, cajero, cliente), (str(self.venta.id_venta), 'admin', 'José Peña'))
+        self.assertEqual((id_producto, producto), (str(self.taladro.id_producto), 'Taladro ñ'))
+        self.assertEqual((Decimal(total), Decimal(cantidad), Decimal(precio), Decimal(subtotal), Decimal(costo)),
+                         (Decimal('111'), Decimal('2'), Decimal('55.5'), Decimal('111'), Decimal('40')))
+
+    def test_movimientos_y_rango_vacio(self):
+        filas = list(csv.reader(io.StringIO(self.descargar('movimientos')[1:])))
+        self.assertEqual(len(filas), 2)
+        self.assertEqual(filas[1][4], 'Salida (Venta)')  # El tipo sale con su etiqueta, no con la clave
+        self.assertEqual(filas[0][5:7], ['Cantidad', 'Saldo'])
+        self.assertEqual((Decimal(filas[1][5]), Decimal(filas[1][6])), (Decimal('2'), Decimal('8')))  # Igual que el kardex en pantalla
+
+        ayer = (timezone.localdate() - datetime.timedelta(days=1)).isoformat()
+        vacio = self.descargar('ventas', fecha_inicio=ayer, fecha_fin=ayer)
+        self.assertEqual(len(list(csv.reader(io.StringIO(vacio[1:])))), 1)  # Solo la cabecera
+
+    def test_errores(self):
+        self.assertEqual(self.client.get(reverse('exportar_csv', args=['clientes'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('exportar_csv', args=['ventas']), {'fecha_inicio': '2024-13-01'}).status_code, 400)
+        self.client.force_login(User.objects.create_user('cajero', password='x', role='empleado'))
+        self.assertEqual(self.client.get(reverse('exportar_csv', args=['ventas'])).status_code, 302)
+
+
+# ==========================================
+# IMPORTACIÓN CSV
+# ==========================================
+
+class ImportarProductosTest(TestCase):
+
+    ARCHIVO = (
+        'nombre,precio_compra,precio_venta,stock\n'
+        'Martillo,12.00,18.00,50\n'      # Existe (por nombre): cambian los precios, el stock se ignora
+        'Clavos 2",1.00,1.50,300\n'      # Nuevo
+        'Sierra,abc,20.00,1\n'           # Error de validación
+    )
+
+    def setUp(self):
+        self.martillo = crear_producto('Martillo', stock=7)
+
+    def test_simulacion_no_guarda_nada(self):
+        resultado = importar_productos(io.StringIO(self.ARCHIVO), simulacion=True)
+        self.assertEqual((resultado.nuevos, resultado.actualizados, len(resultado.errores)), (1, 1, 1))
+        self.assertEqual(resultado.errores[0][0], 4)
+        self.assertEqual(resultado.cambios[0][3], {
+            'precio_compra': (Decimal('10.00'), Decimal('12.00')),
+            'precio_venta': (Decimal('15.00'), Decimal('18.00')),
+        })
+
+        self.assertEqual(Producto.objects.count(), 1)
+        self.martillo.refresh_from_db()
+        self.assertEqual(self.martillo.precio_compra, Decimal('10.00'))
+
+    def test_importar_crea_y_actualiza(self):
+        admin = User.objects.create_user('admin', password='x', role='admin')
+        simulado = importar_productos(io.StringIO(self.ARCHIVO), simulacion=True)
+        resultado = importar_productos(io.StringIO(self.ARCHIVO), usuario=admin)
+        # La simulación anticipa exactamente lo que hace la importación real
+        self.assertEqual((resultado.nuevos, resultado.actualizados, resultado.errores),
+                         (simulado.nuevos, simulado.actualizados, simulado.errores))
+
+        self.martillo.refresh_from_db()
+        self.assertEqual((self.martillo.precio_compra, self.martillo.stock), (Decimal('12.00'), 7))
+        self.assertEqual(Producto.objects.get(nombre='Clavos 2"').stock, 300)
+        self.assertFalse(Producto.objects.filter(nombre='Sierra').exists())
+
+        # Segunda pasada: ya no hay nada que cambiar
+        otra = importar_productos(io.StringIO(self.ARCHIVO), usuario=admin)
+        self.assertEqual((otra.nuevos, otra.actualizados, otra.sin_cambios), (0, 0, 2))
+
+    def test_csv_danado_es_error_del_archivo(self):
+        for archivo in (
+            'nombre,precio_compra,precio_venta\n"Tubo,1.00,2.00\n',      # Comilla sin cerrar
+            'nombre,precio_compra,precio_venta\n"Tubo"x,1.00,2.00\n',
+        ):
+            with self.subTest(archivo=archivo):
+                with self.assertRaisesRegex(ValueError, 'no es un CSV válido'):
+                    importar_productos(io.StringIO(archivo))
+        self.assertEqual(Producto.objects.count(), 1)
+
+
+# ==========================================
+# KARDEX: SALDOS, CORTES Y STOCK INICIAL
+# ==========================================
+
+class KardexTest(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', role='admin')
+        self.proveedor = Proveedor.objects.create(empresa='Aceros SA', telefono='1', direccion='-')
+
+    def conciliar(self):
+        salida = io.StringIO()
+        call_command('conciliar_stock', procesos=1, stdout=salida)
+        return salida.getvalue()
+
+    def test_importacion_deja_el_kardex_cuadrado(self):
+        importar_productos(io.StringIO(
+            'nombre,precio_compra,precio_venta,stock\n'
+            'Cemento,8.00,10.00,40\n'
+            'Arena,2.00,3.00,0\n'
+        ), usuario=self.admin)
+        cemento = Producto.objects.get(nombre='Cemento')
+        inicial = Movimiento.objects.get(producto=cemento)
+        self.assertEqual((inicial.tipo, inicial.cantidad, inicial.saldo), ('ajuste_pos', 40, 40))
+        self.assertFalse(Movimiento.objects.filter(producto__nombre='Arena').exists())
+        self.assertIn('0 no cuadran', self.conciliar())
+
+    def test_saldos_y_stock_en_fecha_coinciden_con_los_cortes(self):
+        hoy = timezone.localdate()
+        dias = [hoy - datetime.timedelta(days=n) for n in (70, 40, 10)]
+        cable = crear_producto('Cable')
+        ajustar_stock(self.admin, cable.id_producto, 10, 'Stock inicial')
+        registrar_venta(self.admin, [{'id': cable.id_producto, 'cantidad': 3, 'precio': '15'}], total='45')
+        registrar_compra(self.admin, self.proveedor.id_proveedor, [{'id': cable.id_producto, 'cantidad': 5, 'precio': '10'}], total='50')
+        movimientos = list(Movimiento.objects.filter(producto=cable).order_by('id'))
+        for movimiento, dia in zip(movimientos, dias):
+            Movimiento.objects.filter(pk=movimiento.pk).update(fecha=timezone.make_aware(datetime.datetime.combine(dia, datetime.time(12))))
+        cable.refresh_from_db()
+
+        # Cada saldo es el stock justo después de su movimiento
+        self.assertEqual([m.saldo for m in movimientos], [10, 7, 12])
+        esperado = {dias[0] - datetime.timedelta(days=1): 0, dias[0]: 10, dias[1]: 7, dias[2]: 12}
+        sin_cortes = {dia: stock_en_fecha(cable, fin_del_dia(dia)) for dia in esperado}
+        self.assertEqual(sin_cortes, esperado)
+
+        # Con cortes intermedios el resultado es el mismo y los cortes guardan ese stock
+        for dia in (dias[0] + datetime.timedelta(days=5), dias[1] + datetime.timedelta(days=5)):
+            generar_corte(fin_del_dia(dia))
+        self.assertEqual(list(CorteStock.objects.filter(producto=cable).order_by('hasta').values_list('stock', flat=True)), [10, 7])
+        self.assertEqual({dia: stock_en_fecha(cable, fin_del_dia(dia)) for dia in esperado}, esperado)
+        for movimiento in Movimiento.objects.filter(producto=cable):
+            self.assertEqual(stock_en_fecha(cable, movimiento.fecha), movimiento.saldo)
+        self.assertIn('0 no cuadran', self.conciliar())
+
+
+class EditarProductoTest(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', role='admin')
+        self.client.force_login(self.admin)
+        self.categoria = Categoria.objects.create(nombre='Herramientas')
+        self.sierra = crear_producto('Sierra', categoria=self.categoria)
+        ajustar_stock(self.admin, self.sierra.id_producto, 7, 'Stock inicial')
+        self.url = reverse('editar_producto', args=[self.sierra.id_producto])
+
+    def editar(self, stock_mostrado, stock, nombre='Sierra'):
+        return self.client.post(self.url, {
+            'nombre': nombre, 'descripcion': '', 'categoria': self.categoria.pk, 'unidad': 'unidad',
+            'precio_compra': '10.00', 'precio_venta': '15.00', 'stock': stock, 'stock_minimo': '5',
+            'stock_mostrado': stock_mostrado,
+        })
+
+    def test_formulario_lleva_el_stock_mostrado(self):
+        self.assertContains(self.client.get(self.url), 'name="stock_mostrado" value="7.00"')
+
+    def test_rechaza_stock_editado_sobre_dato_viejo(self):
+        registrar_venta(self.admin, [{'id': self.sierra.id_producto, 'cantidad': 2, 'precio': '15'}], total='30')
+        respuesta = self.editar('7.00', '10')       # El formulario se abrió antes de la venta
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, 'El stock cambió a 5.00')
+        self.assertContains(respuesta, 'name="stock_mostrado" value="5.00"')
+        self.sierra.refresh_from_db()
+        self.assertEqual(self.sierra.stock, 5)
+        self.assertEqual(Movimiento.objects.filter(producto=self.sierra).count(), 2)
+
+        # Sin tocar el stock, el resto de la edición se guarda y la venta se respeta
+        self.assertEqual(self.editar('7.00', '7.00', nombre='Sierra de arco').status_code, 302)
+        self.sierra.refresh_from_db()
+        self.assertEqual((self.sierra.nombre, self.sierra.stock), ('Sierra de arco', 5))
+
+    def test_ajusta_sobre_el_stock_actual(self):
+        self.assertEqual(self.editar('7.00', '10').status_code, 302)
+        self.sierra.refresh_from_db()
+        self.assertEqual(self.sierra.stock, 10)
+        ajuste = Movimiento.objects.filter(producto=self.sierra).latest('id')
+        self.assertEqual((ajuste.tipo, ajuste.cantidad, ajuste.saldo), ('ajuste_pos', 3, 10))
+
+
+class ConciliarStockTest(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', role='admin')
+        self.productos = [crear_producto(f'Tornillo {i}') for i in range(3)]
+        for producto in self.productos:
+            ajustar_stock(self.admin, producto.id_producto, 10, 'Stock inicial')
+
+    def conciliar(self, **opciones):
+        salida = io.StringIO()
+        call_command('conciliar_stock', procesos=1, stdout=salida, **opciones)
+        return salida.getvalue()
+
+    def test_detecta_y_corrige_diferencias(self):
+        self.assertIn('3 productos revisados en 1 rangos, 0 no cuadran', self.conciliar())
+
+        # Stock tocado por fuera del kardex (UPDATE directo, restauración parcial...)
+        primero, _, ultimo = self.productos
+        Producto.objects.filter(pk=primero.pk).update(stock=F('stock') + 2)
+        Producto.objects.filter(pk=ultimo.pk).update(stock=F('stock') - Decimal('0.5'))
+
+        # Rangos de un ID: las diferencias se encuentran en los bordes de cada rango
+        salida = self.conciliar(rango=1)
+        # La suma del kardex sale con o sin decimales según el motor (10 en SQLite, 10.00 en MySQL)
+        self.assertRegex(salida, rf'#{primero.pk}: stock 12.00, kardex 10(\.00)? \(diferencia \+2.00\)')
+        self.assertRegex(salida, rf'#{ultimo.pk}: stock 9.50, kardex 10(\.00)? \(diferencia -0.50\)')
+        self.assertIn('3 productos revisados en 3 rangos, 2 no cuadran', salida)
+        self.assertEqual(Movimiento.objects.count(), 3)   # Sin --corregir no se escribe nada
+
+        self.assertIn('2 ajustes registrados a nombre de admin', self.conciliar(corregir=True))
+        ajuste = Movimiento.objects.filter(producto=ultimo).latest('id')
+        self.assertEqual((ajuste.tipo, ajuste.cantidad, ajuste.saldo), ('ajuste_neg', Decimal('0.5'), Decimal('9.5')))
+        self.assertIn('0 no cuadran', self.conciliar())
+
+
+# ==========================================
+# TICKETS DE VENTA
+# ==========================================
+
+class TicketTest(TestCase):
+
+    def setUp(self):
+        cache.clear()   # Los IDs de venta se repiten entre tests
+        self.cajero = User.objects.create_user('cajero', password='x', role='empleado')
+        self.client.force_login(self.cajero)
+        pino = crear_producto('Tabla de piño', stock=10)
+        self.venta = registrar_venta(self.cajero, [{'id': pino.id_producto, 'cantidad': '1.5', 'precio': '20'}], total='30')
+
+    def test_etag_y_304(self):
+        url = reverse('ticket_venta', args=[self.venta.id_venta])
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, 'Tabla de piño')
+        etag = respuesta['ETag']
+
+        # Reimpresión: el ticket ya está en el cache, no se vuelve a armar
+        with self.assertNumQueries(0):
+            self.assertEqual(tickets.obtener_ticket(self.venta.id_venta)['etag'], etag.strip('"'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(reverse('ticket_venta', args=[999999])).status_code, 404)
+
+    def test_variante_escpos(self):
+        url = reverse('ticket_escpos', args=[self.venta.id_venta])
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta['Content-Type'], 'application/octet-stream')
+        contenido = respuesta.content
+        self.assertTrue(contenido.startswith(tickets.INICIAR))
+        self.assertTrue(contenido.endswith(tickets.CORTAR))
+        self.assertIn('1.5 Tabla de piño'.encode(tickets.CODIFICACION), contenido)
+        self.assertIn(b'30.00', contenido)
+        texto = contenido
+        for comando in (tickets.INICIAR, tickets.CORTAR, tickets.CENTRO, tickets.IZQUIERDA,
+                        tickets.NEGRITA, tickets.NORMAL, tickets.DOBLE, tickets.SIMPLE):
+            texto = texto.replace(comando, b'')
+        self.assertLessEqual(max(len(linea) for linea in texto.split(b'\n')), tickets.ANCHO)
+
+        # ETag propio: el navegador no confunde el HTML con los bytes de la impresora
+        html = self.client.get(reverse('ticket_venta', args=[self.venta.id_venta]))
+        self.assertNotEqual(respuesta['ETag'], html['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
+
+
+# ==========================================
+# MINIATURAS DE LAS FOTOS
+# ==========================================
+
+def foto(formato='JPEG', tamano=(640, 480), color='red'):
+    contenido = io.BytesIO()
+    Image.new('RGB', tamano, color).save(contenido, formato)
+    return contenido.getvalue()
+
+
+class MiniaturasTest(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+
+    def subir(self, nombre, contenido):
+        return default_storage.save(nombre, ContentFile(contenido))
+
+    def test_generar_crea_cada_tamano_una_vez(self):
+        nombre = self.subir('productos/taladro.jpg', foto())
+        self.assertEqual(miniaturas.generar(nombre), len(miniaturas.TAMANOS))
+        self.assertEqual(miniaturas.generar(nombre), 0)        # Ya existen
+        for tamano, lado in miniaturas.TAMANOS.items():
+            with default_storage.open(miniaturas.nombre_miniatura(nombre, tamano), 'rb') as archivo:
+                self.assertEqual(Image.open(archivo).size, (lado, lado * 3 // 4))
+
+    def test_misma_base_con_otra_extension_no_comparte_miniatura(self):
+        jpg = self.subir('productos/taladro.jpg', foto(color='red'))
+        png = self.subir('productos/taladro.png', foto('PNG', color='blue'))
+        self.assertNotEqual(miniaturas.nombre_miniatura(jpg, 'chica'), miniaturas.nombre_miniatura(png, 'chica'))
+        self.assertEqual(miniaturas.generar(jpg), 2)
+        self.assertEqual(miniaturas.generar(png), 2)
+        with default_storage.open(miniaturas.nombre_miniatura(png, 'chica'), 'rb') as archivo:
+            rojo, verde, azul = Image.open(archivo).convert('RGB').getpixel((10, 10))
+        self.assertGreater(azul, rojo)
+
+    def test_otra_calidad_es_otra_url(self):
+        nombre = self.subir('productos/taladro.jpg', foto())
+        antes = miniaturas.nombre_miniatura(nombre, 'chica')
+        with mock.patch.object(miniaturas, 'CALIDAD', 50):
+            self.assertNotEqual(miniaturas.nombre_miniatura(nombre, 'chica'), antes)
+        with mock.patch.object(miniaturas, 'VERSION', miniaturas.VERSION + 1):
+            self.assertNotEqual(miniaturas.nombre_miniatura(nombre, 'chica'), antes)
+
+    def test_url_usa_la_original_hasta_que_exista_la_miniatura(self):
+        producto = crear_producto(imagen=self.subir('productos/taladro.jpg', foto()))
+        self.assertEqual(miniaturas.url_miniatura(None), '')
+        self.assertEqual(miniaturas.url_miniatura(producto.imagen), producto.imagen.url)
+        miniaturas.generar(producto.imagen.name)
+        self.assertEqual(
+            miniaturas.url_miniatura(producto.imagen, 'media'),
+            default_storage.url(miniaturas.nombre_miniatura(producto.imagen.name, 'media')),
+        )
+
+    def test_subir_foto_encola_las_miniaturas(self):
+        with mock.patch('core.miniaturas.encolar') as encolar:
+            with self.captureOnCommitCallbacks(execute=True):
+                producto = crear_producto(imagen=SimpleUploadedFile('taladro.jpg', foto(), content_type='image/jpeg'))
+            encolar.assert_called_once_with(producto.imagen.name)
+
+            # Guardar sin tocar la foto no vuelve a generar nada
+            with self.captureOnCommitCallbacks(execute=True):
+                producto.save(update_fields=['stock'])
+            encolar.assert_called_once()
+
+    def test_comando_genera_las_que_faltan(self):
+        for nombre in ('productos/a.jpg', 'productos/b.png'):
+            crear_producto(nombre, imagen=self.subir(nombre, foto('PNG' if nombre.endswith('png') else 'JPEG')))
+        crear_producto('Sin foto')
+        salida = io.StringIO()
+        call_command('generar_miniaturas', procesos=1, stdout=salida)
+        self.assertIn('2 fotos revisadas, 4 miniaturas creadas', salida.getvalue())
+
+        salida = io.StringIO()
+        call_command('generar_miniaturas', procesos=1, stdout=salida)
+        self.assertIn('0 miniaturas creadas', salida.getvalue())
+
+
+# ==========================================
+# PANEL DE RENDIMIENTO
+# ==========================================
+
+def vista_n_mas_1(request):
+    """Vista de prueba con el clásico N+1: la categoría de cada producto por separado"""
+    nombres = [p.categoria.nombre for p in Producto.objects.order_by('id_producto')]
+    return HttpResponse(', '.join(nombres))
+
+
+urlpatterns = [path('n-mas-1/', vista_n_mas_1, name='n_mas_1')]    # ROOT_URLCONF de RendimientoTest
+
+
+class RendimientoTest(TestCase):
+
+    def setUp(self):
+        rendimiento.registro.reiniciar()
+        self.addCleanup(rendimiento.registro.reiniciar)
+        categoria = Categoria.objects.create(nombre='Herramientas')
+        for i in range(4):
+            crear_producto(f'Martillo {i}', categoria=categoria)
+
+    def vista(self, nombre):
+        return next(v for v in rendimiento.registro.resumen()['vistas'] if v['vista'] == nombre)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_cuenta_consultas_y_detecta_n_mas_1(self):
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.client.get('/n-mas-1/')
+        self.assertIn('db;dur=', respuesta['Server-Timing'])
+
+        vista = self.vista('n_mas_1')
+        self.assertEqual(vista['requests'], 2)
+        self.assertEqual(vista['consultas'], len(consultas))     # 1 + 4 (una por producto)
+        self.assertEqual(vista['con_repetidas'], 2)
+        self.assertEqual(sum(vista['histograma']), 2)
+        repetida, = rendimiento.registro.resumen()['repetidas']
+        self.assertIn('categoria', repetida['sql'])
+        self.assertEqual((repetida['veces'], repetida['maximo'], repetida['vistas']), (2, 4, ['n_mas_1']))
+
+    def test_streaming_se_mide_hasta_el_final(self):
+        admin = User.objects.create_user('admin', password='x', role='admin')
+        self.client.force_login(admin)
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('exportar_csv', args=['movimientos']))
+            self.assertEqual(rendimiento.registro.resumen()['vistas'], [])   # Todavía no se mandó el cuerpo
+            b''.join(respuesta.streaming_content)
+        self.assertEqual(self.vista('exportar_csv')['consultas'], len(consultas))
+        self.assertTrue(any('movimientos' in c['sql'] for c in consultas.captured_queries))
+
+    @override_settings(RENDIMIENTO_MUESTREO=0.5)
+    def test_muestreo(self):
+        admin = User.objects.create_user('admin', password='x', role='admin')
+        self.client.force_login(admin)
+        for azar in (0.3, 0.7, 0.1):
+            with mock.patch('core.rendimiento.random.random', return_value=azar):
+                self.client.get(reverse('lista_productos'))
+        self.assertEqual(self.vista('lista_productos')['requests'], 2)
+
+    def test_histograma_y_limite_de_repetidas(self):
+        registro = rendimiento.Registro()
+        for milis in (4, 5, 7, 300, 6000):
+            registro.agregar('vista', milis / 1000, rendimiento.Medicion())
+        vista = registro.resumen()['vistas'][0]
+        self.assertEqual(vista['histograma'], [2, 1, 0, 0, 0, 0, 1, 0, 0, 0, 1])
+        self.assertEqual((vista['p50_ms'], vista['p95_ms']), (10, float('inf')))
+
+        # SELECT 0 aparece en dos requests, el resto en uno; por debajo del mínimo no cuenta como N+1
+        for i in [0] + list(range(rendimiento.MAX_REPETIDAS + 10)):
+            medicion = rendimiento.Medicion()
+            medicion.sql[f'SELECT {i}'] = rendimiento.MIN_REPETICIONES
+            medicion.sql['SELECT normal'] = rendimiento.MIN_REPETICIONES - 1
+            registro.agregar('vista', 0.001, medicion)
+        repetidas = registro.resumen()['repetidas']
+        self.assertEqual(len(repetidas), rendimiento.MAX_REPETIDAS)
+        self.assertEqual((repetidas[0]['sql'], repetidas[0]['veces']), ('SELECT 0', 2))    # Lugar lleno: salen las menos frecuentes
+        self.assertNotIn('SELECT normal', [r['sql'] for r in repetidas])
+
+    def test_panel_solo_admin(self):
+        self.client.force_login(User.objects.create_user('cajero', password='x', role='empleado'))
+        self.assertRedirects(self.client.get(reverse('panel_rendimiento')), reverse('home'), fetch_redirect_response=False)
+        self.assertRedirects(self.client.post(reverse('panel_rendimiento')), reverse('home'), fetch_redirect_response=False)
+        self.assertTrue(rendimiento.registro.resumen()['vistas'])    # El POST del cajero no reinició nada
+
+        self.client.force_login(User.objects.create_user('admin', password='x', role='admin'))
+        self.assertContains(self.client.get(reverse('panel_rendimiento')), 'panel_rendimiento')
+        self.client.post(reverse('panel_rendimiento'))
+        self.assertEqual([v['vista'] for v in rendimiento.registro.resumen()['vistas']], ['panel_rendimiento'])
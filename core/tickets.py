@@ -0,0 +1,134 @@
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+from django.utils import timezone
+from .models import Venta, DetalleVenta
+
+# ==========================================
+# TICKETS DE VENTA (RENDERIZADOS UNA VEZ)
+# ==========================================
+# Una venta guardada no cambia: el ticket se arma una sola vez (2 consultas,
+# los detalles con su producto en un solo SELECT) y se guarda en el cache
+# ya renderizado. Las reimpresiones no tocan la BD y, si el navegador ya lo
+# tiene, reciben un 304 por ETag.
+#
+# El mismo contenido sirve para el HTML y para la versión de texto ESC/POS
+# que se manda directo a la impresora térmica.
+
+PREFIJO = 'ticket'
+ANCHO = 42          # Columnas de una impresora de 80mm (fuente B: 56, fuente A: 42-48)
+CODIFICACION = 'cp850'
+
+# Comandos ESC/POS
+ESC = b'\x1b'
+GS = b'\x1d'
+INICIAR = ESC + b'@' + ESC + b't\x02'         # Reset + tabla de caracteres PC850 (acentos, ñ)
+CENTRO = ESC + b'a\x01'
+IZQUIERDA = ESC + b'a\x00'
+NEGRITA = ESC + b'E\x01'
+NORMAL = ESC + b'E\x00'
+DOBLE = GS + b'!\x11'
+SIMPLE = GS + b'!\x00'
+CORTAR = GS + b'V\x42\x00'                    # Avanza el papel y corta
+
+
+def _version():
+    """Cambia si cambian los datos del negocio: los tickets viejos se vuelven a armar"""
+    empresa = json.dumps(settings.EMPRESA, sort_keys=True).encode()
+    return hashlib.md5(empresa).hexdigest()[:8]
+
+
+def _clave(id_venta):
+    return f"{PREFIJO}:{id_venta}:{_version()}"
+
+
+def _armar(id_venta):
+    venta = Venta.objects.select_related('usuario', 'cliente').prefetch_related(
+        Prefetch('detalles', queryset=DetalleVenta.objects.select_related('producto').order_by('id_detalle_venta'))
+    ).get(id_venta=id_venta)
+
+    datos = {
+        'id_venta': venta.id_venta,
+        'fecha_venta': venta.fecha_venta,
+        'vendedor': venta.usuario.username,
+        'cliente': venta.cliente.nombres if venta.cliente else '',
+        'cedula_ruc': venta.cliente.cedula_ruc if venta.cliente else '',
+        'descuento': venta.descuento,
+        'total': venta.total,
+        'subtotal': venta.total + venta.descuento,
+        'lineas': [
+            {'cantidad': d.cantidad, 'nombre': d.producto.nombre, 'subtotal': d.subtotal}
+            for d in venta.detalles.all()
+        ],
+    }
+    html = render_to_string('core/ticket.html', {'venta': datos, 'detalles': datos['lineas'], 'empresa': settings.EMPRESA})
+    return {
+        'datos': datos,
+        'html': html,
+        'etag': hashlib.md5(html.encode()).hexdigest(),
+        'modificado': venta.fecha_venta,
+    }
+
+
+def obtener_ticket(id_venta):
+    """{'datos', 'html', 'etag', 'modificado'} desde el cache (o armado y guardado). Venta.DoesNotExist si no existe."""
+    clave = _clave(id_venta)
+    ticket = cache.get(clave)
+    if ticket is None:
+        ticket = _armar(id_venta)
+        cache.set(clave, ticket, settings.TICKET_CACHE_TTL)
+    return ticket
+
+
+def olvidar_ticket(id_venta):
+    cache.delete(_clave(id_venta))
+
+
+# --- Texto para impresora térmica ---
+
+def _columnas(izquierda, derecha, ancho=ANCHO):
+    espacio = max(ancho - len(izquierda) - len(derecha), 1)
+    return f"{izquierda}{' ' * espacio}{derecha}"
+
+
+def ticket_escpos(ticket, ancho=ANCHO):
+    """Bytes listos para mandar a la impresora (ESC/POS, página de códigos PC850)"""
+    datos = ticket['datos']
+    empresa = settings.EMPRESA
+    separador = '-' * ancho
+
+    def texto(linea):
+        return (linea + '\n').encode(CODIFICACION, errors='replace')
+
+    # Letra doble solo si el nombre cabe (a doble ancho entran la mitad de columnas)
+    tamano = DOBLE if len(empresa['nombre']) <= ancho // 2 else SIMPLE
+    salida = [INICIAR, CENTRO, NEGRITA, tamano, texto(empresa['nombre'][:ancho]), SIMPLE, NORMAL]
+    salida += [texto(empresa['direccion']), texto(f"Tel: {empresa['telefono']}"), texto(f"RUC: {empresa['ruc']}")]
+    salida += [IZQUIERDA, texto(separador)]
+
+    salida.append(texto(f"Ticket: #{datos['id_venta']}"))
+    salida.append(texto(f"Fecha: {timezone.localtime(datos['fecha_venta']).strftime('%d/%m/%Y %H:%M')}"))
+    salida.append(texto(f"Vendedor: {datos['vendedor']}"))
+    salida.append(texto(f"Cliente: {datos['cliente'] or 'Consumidor Final'}"))
+    if datos['cedula_ruc']:
+        salida.append(texto(f"RUC/Céd: {datos['cedula_ruc']}"))
+    salida.append(texto(separador))
+
+    for linea in datos['lineas']:
+        cantidad = f"{linea['cantidad'].normalize():f}"   # 2.00 -> 2, 1.50 -> 1.5
+        total = f"{linea['subtotal']:.2f}"
+        nombre = linea['nombre'][:ancho - len(cantidad) - len(total) - 3]
+        salida.append(texto(_columnas(f"{cantidad} {nombre}", total, ancho)))
+    salida.append(texto(separador))
+
+    if datos['descuento'] > 0:
+        salida.append(texto(_columnas('Subtotal:', f"C$ {datos['subtotal']:.2f}", ancho)))
+        salida.append(texto(_columnas('Descuento:', f"- C$ {datos['descuento']:.2f}", ancho)))
+    salida += [NEGRITA, DOBLE, texto(_columnas('TOTAL:', f"C$ {datos['total']:.2f}", ancho // 2)), SIMPLE, NORMAL]
+
+    salida += [CENTRO, texto(''), texto('¡Gracias por su compra!'), texto('*** NO SE ACEPTAN DEVOLUCIONES ***')]
+    salida += [texto('\n\n'), CORTAR]
+    return b''.join(salida)
@@ -19,17 +19,23 @@ urlpatterns = [
     # --- VENTAS ---
     path('venta/', views.crear_venta, name='crear_venta'),
     path('venta/ticket/<int:id_venta>/', views.ticket_venta, name='ticket_venta'),
+    path('venta/ticket/<int:id_venta>/escpos/', views.ticket_escpos, name='ticket_escpos'),
     
     # --- INVENTARIO ---
     path('inventario/', views.lista_productos, name='lista_productos'),
     path('inventario/agregar/', views.agregar_producto, name='agregar_producto'),
     path('inventario/editar/<int:id_producto>/', views.editar_producto, name='editar_producto'),
+    path('inventario/importar/', views.importar_productos, name='importar_productos'),
     
     # --- CLIENTES ---
     path('clientes/', views.lista_clientes, name='lista_clientes'),
     
     # --- API ENDPOINTS (JSON) ---
     path('api/producto/<int:id_producto>/', views.obtener_producto, name='api_producto'),
+    path('api/productos/buscar/', views.api_buscar_productos, name='api_buscar_productos'),
+    path('api/productos/lote/', views.api_productos_lote, name='api_productos_lote'),
+    path('api/catalogo/', views.api_catalogo, name='api_catalogo'),
+    path('api/catalogo/cambios/', views.api_catalogo_cambios, name='api_catalogo_cambios'),
     path('api/guardar-venta/', views.guardar_venta, name='api_guardar_venta'),
     path('api/clientes/buscar/', views.api_buscar_clientes, name='api_buscar_clientes'),
     path('api/clientes/crear/', views.api_crear_cliente, name='api_crear_cliente'),
@@ -46,8 +52,11 @@ urlpatterns = [
     # COMPRAS
     path('compras/nueva/', views.crear_compra, name='crear_compra'),
     path('api/guardar-compra/', views.guardar_compra, name='api_guardar_compra'),
+    path('compras/sugeridas/', views.compras_sugeridas, name='compras_sugeridas'),
     
     path('finanzas/', views.reporte_financiero, name='reporte_financiero'),
+    path('rendimiento/', views.panel_rendimiento, name='panel_rendimiento'),
+    path('finanzas/exportar/<str:tipo>/', views.exportar_csv, name='exportar_csv'),
     
     path('inventario/reportar-perdida/<int:id_producto>/', views.reportar_perdida, name='reportar_perdida'),
     
@@ -60,6 +69,9 @@ urlpatterns = [
     path('proveedores/editar/<int:id_proveedor>/', views.editar_proveedor, name='editar_proveedor'),
     
     path('inventario/historial/<int:id_producto>/', views.historial_producto, name='historial_producto'),
+
+    path('inventario/stock-bajo/', views.stock_bajo, name='stock_bajo'),
+    path('api/stock-bajo/', views.api_stock_bajo, name='api_stock_bajo'),
     
     # GESTIÓN DE EMPLEADOS
     path('usuarios/', views.lista_empleados, name='lista_empleados'), # Lista
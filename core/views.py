@@ -1,17 +1,43 @@
+import io
 import json
+import logging
 import datetime
 import decimal
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, HttpResponseBadRequest, Http404
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
+from django.views.decorators.cache import cache_control
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.db import transaction
 from django.db.models import Q, Count, Sum, F
+from django.conf import settings
 from django.utils import timezone
+from asgiref.sync import sync_to_async
 from datetime import timedelta
-from .models import Producto, Venta, DetalleVenta, Cliente, Categoria, Proveedor, Compra, DetalleCompra, User, Movimiento
+from .models import Producto, Venta, DetalleVenta, Cliente, Categoria, Proveedor, Compra, DetalleCompra, User, Movimiento, StockBajo, EventoStock
 from .forms import ProductoForm, RegistroEmpleadoForm, CategoriaForm, ProveedorForm, ClienteForm, EditarEmpleadoForm
+from .operaciones import registrar_venta, registrar_compra, ajustar_stock
+from .reportes import resumen_financiero
+from .cache_dashboard import contexto_dashboard, estadisticas as estadisticas_cache
+from .buscador import indice
+from . import catalogo
+from .catalogo import etag_catalogo
+from .paginacion import paginar
+from .exportar import EXPORTES, lineas_csv
+from . import importar as importador
+from .kardex import stock_en_fecha, fin_del_dia
+from . import tickets, rendimiento, pronostico
+from .tickets import obtener_ticket
+
+log = logging.getLogger(__name__)
+
+# Máximo de resultados del buscador en la pantalla de inventario
+LIMITE_BUSQUEDA_INVENTARIO = 500
+
+# Filas por página en los listados (paginación por cursor)
+TAMANO_PAGINA = 50
 
 # ==========================================
 # 1. GESTIÓN DE ACCESO Y DASHBOARD
@@ -23,46 +49,10 @@ def home(request):
     if request.user.role == 'empleado':
         return redirect('crear_venta')
 
-    # 1. Rango de fecha
-    ahora = timezone.localtime(timezone.now())
-    inicio_dia = ahora.replace(hour=0, minute=0, second=0, microsecond=0)
-    fin_dia = ahora.replace(hour=23, minute=59, second=59, microsecond=999999)
-    
-    # 2. Datos Generales
-    ventas_hoy = Venta.objects.filter(fecha_venta__range=(inicio_dia, fin_dia))
-    total_ventas_hoy = ventas_hoy.aggregate(Sum('total'))['total__sum'] or 0
-    cantidad_ventas_hoy = ventas_hoy.count()
-    productos_bajo_stock = Producto.objects.filter(stock__lte=F('stock_minimo')).count()
-    
-    # 3. Top 5 Productos
-    top_productos = DetalleVenta.objects.values('producto__nombre') \
-        .annotate(total_vendido=Sum('cantidad')) \
-        .order_by('-total_vendido')[:5]
-
-    # 4. Top 5 Clientes
-    top_clientes = Cliente.objects.annotate(
-        num_compras=Count('venta')
-    ).order_by('-num_compras')[:5]
-
-    # 5. NUEVO: Top Empleados (Por dinero vendido)
-    # Filtramos usuarios que tengan al menos una venta para no llenar la lista de ceros
-    top_empleados = User.objects.filter(venta__isnull=False).annotate(
-        dinero_vendido=Sum('venta__total'),
-        cantidad_ventas=Count('venta')
-    ).order_by('-dinero_vendido')[:5]
-
-    # 6. Últimas ventas
-    ultimas_ventas = Venta.objects.select_related('cliente').order_by('-fecha_venta')[:5]
+    # Se sirve desde el cache; se invalida con cada venta/compra/movimiento (ver core/cache_dashboard.py)
+    context = dict(contexto_dashboard())
+    context['cache_stats'] = estadisticas_cache()
 
-    context = {
-        'total_ventas_hoy': total_ventas_hoy,
-        'cantidad_ventas_hoy': cantidad_ventas_hoy,
-        'productos_bajo_stock': productos_bajo_stock,
-        'ultimas_ventas': ultimas_ventas,
-        'top_productos': top_productos,
-        'top_clientes': top_clientes,
-        'top_empleados': top_empleados # Variable nueva
-    }
     return render(request, 'core/home.html', context)
 
 @login_required
@@ -95,23 +85,45 @@ def crear_venta(request):
     """Renderiza la pantalla de venta"""
     return render(request, 'core/venta.html')
 
+def _ticket(request, id_venta, **kwargs):
+    try:
+        return obtener_ticket(id_venta)
+    except Venta.DoesNotExist:
+        return None
+
+def etag_ticket(request, id_venta, **kwargs):
+    ticket = _ticket(request, id_venta)
+    return ticket and ticket['etag']
+
+def etag_ticket_escpos(request, id_venta, **kwargs):
+    ticket = _ticket(request, id_venta)
+    return ticket and ticket['etag'] + '-escpos'
+
+def fecha_ticket(request, id_venta, **kwargs):
+    ticket = _ticket(request, id_venta)
+    return ticket and ticket['modificado']
+
 @login_required
+@cache_control(private=True)
+@condition(etag_func=etag_ticket, last_modified_func=fecha_ticket)
 def ticket_venta(request, id_venta):
-    """Genera la vista para imprimir el ticket"""
-    venta = get_object_or_404(Venta, id_venta=id_venta)
-    detalles = venta.detalles.all()
-    
-    context = {
-        'venta': venta,
-        'detalles': detalles,
-        'empresa': {
-            'nombre': 'FERRETERÍA MI REDENTOR',
-            'direccion': 'Ciudad Sandino, Managua',
-            'telefono': '2222-5555',
-            'ruc': 'J031000000000'
-        }
-    }
-    return render(request, 'core/ticket.html', context)
+    """Ticket para imprimir: renderizado una vez y servido desde el cache (ver core/tickets.py)"""
+    ticket = _ticket(request, id_venta)
+    if ticket is None:
+        raise Http404
+    return HttpResponse(ticket['html'])
+
+@login_required
+@cache_control(private=True)
+@condition(etag_func=etag_ticket_escpos, last_modified_func=fecha_ticket)
+def ticket_escpos(request, id_venta):
+    """El mismo ticket en bytes ESC/POS para mandar directo a la impresora térmica"""
+    ticket = _ticket(request, id_venta)
+    if ticket is None:
+        raise Http404
+    respuesta = HttpResponse(tickets.ticket_escpos(ticket), content_type='application/octet-stream')
+    respuesta['Content-Disposition'] = f'attachment; filename="ticket_{id_venta}.prn"'
+    return respuesta
 
 # ==========================================
 # 3. INVENTARIO Y PRODUCTOS
@@ -134,21 +146,25 @@ def lista_productos(request):
     if categoria_id:
         productos = productos.filter(categoria_id=categoria_id)
 
-    # 3. Buscador
+    # 3. Buscador (índice en memoria, ver core/buscador.py)
     if busqueda:
-        productos = productos.filter(
-            Q(nombre__icontains=busqueda) | 
-            Q(id_producto__icontains=busqueda)
+        ids = indice.buscar(
+            busqueda,
+            limite=LIMITE_BUSQUEDA_INVENTARIO,
+            activo=(estado != 'inactivos'),
+            categoria_id=int(categoria_id) if categoria_id else None
         )
+        productos = productos.filter(id_producto__in=ids)
     
-    # 4. ORDENAMIENTO POR ID (NUEVO)
-    productos = productos.order_by('id_producto')
+    # 4. ORDENAMIENTO POR ID + PAGINACIÓN POR CURSOR (ver core/paginacion.py)
+    pagina = paginar(productos.select_related('categoria'), ['id_producto'], request, tamano=TAMANO_PAGINA)
 
     # Obtenemos todas las categorías para el dropdown
     categorias = Categoria.objects.all().order_by('nombre')
 
     context = {
-        'productos': productos,
+        'productos': pagina,
+        'pagina': pagina,
         'busqueda': busqueda,
         'estado': estado,
         'categorias': categorias,       # Enviamos la lista
@@ -178,7 +194,18 @@ def agregar_producto(request):
     if request.method == 'POST':
         form = ProductoForm(request.POST, request.FILES)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                producto = form.save()
+                if producto.stock:
+                    # El stock inicial también queda en el kardex (punto de partida del saldo)
+                    Movimiento.objects.create(
+                        producto=producto,
+                        usuario=request.user,
+                        tipo='ajuste_pos' if producto.stock > 0 else 'ajuste_neg',
+                        cantidad=abs(producto.stock),
+                        saldo=producto.stock,
+                        descripcion="Stock inicial"
+                    )
             return redirect('lista_productos')
     else:
         form = ProductoForm()
@@ -193,16 +220,66 @@ def editar_producto(request, id_producto):
         return redirect('lista_productos')
 
     producto = get_object_or_404(Producto, id_producto=id_producto)
+    stock_mostrado = producto.stock # Viaja oculto en el formulario para saber sobre qué stock se editó
     
     if request.method == 'POST':
         form = ProductoForm(request.POST, request.FILES, instance=producto)
         if form.is_valid():
-            form.save()
-            return redirect('lista_productos')
+            with transaction.atomic():
+                # Stock real con la fila bloqueada: una venta pudo moverlo desde que se abrió el formulario
+                stock_actual = Producto.objects.select_for_update().values_list('stock', flat=True).get(id_producto=id_producto)
+                try:
+                    stock_mostrado = decimal.Decimal(request.POST.get('stock_mostrado', ''))
+                except decimal.InvalidOperation:
+                    stock_mostrado = None
+                producto = form.save(commit=False)
+                nuevo_stock = producto.stock
+
+                if nuevo_stock not in (stock_mostrado, stock_actual) and stock_mostrado != stock_actual:
+                    # Se escribió un stock nuevo sobre un dato viejo: ajustar con él pisaría esas ventas
+                    form.add_error('stock', f"El stock cambió a {stock_actual} mientras editaba. Revise el valor y guarde de nuevo.")
+                else:
+                    # El stock NO se pisa con save(): se ajusta con un movimiento para que cuadre el kardex
+                    producto.stock = stock_actual
+                    producto.save(update_fields=[c for c in form.Meta.fields if c != 'stock'] + ['modificado'])
+                    if nuevo_stock not in (stock_mostrado, stock_actual):
+                        ajustar_stock(request.user, producto.id_producto, nuevo_stock - stock_actual,
+                                      "Ajuste manual (edición del producto)")
+            if not form.errors:
+                return redirect('lista_productos')
+            stock_mostrado = stock_actual
     else:
         form = ProductoForm(instance=producto)
     
-    return render(request, 'core/form_producto.html', {'form': form, 'titulo': 'Editar Producto'})
+    return render(request, 'core/form_producto.html', {'form': form, 'titulo': 'Editar Producto', 'stock_mostrado': stock_mostrado})
+
+@login_required
+def importar_productos(request):
+    """Carga masiva de productos desde CSV (ver core/importar.py)"""
+    # SEGURIDAD: Solo admin
+    if request.user.role != 'admin':
+        return redirect('lista_productos')
+
+    resultado = None
+    error = None
+    if request.method == 'POST' and request.FILES.get('archivo'):
+        # Envolvemos el upload para leerlo línea por línea (sin cargarlo entero)
+        archivo = io.TextIOWrapper(request.FILES['archivo'].file, encoding='utf-8-sig', newline='')
+        try:
+            resultado = importador.importar_productos(
+                archivo,
+                usuario=request.user,
+                simulacion=bool(request.POST.get('simular')),
+                crear_categorias=bool(request.POST.get('crear_categorias')),
+            )
+        except (ValueError, UnicodeDecodeError) as e:
+            error = str(e)
+
+    return render(request, 'core/importar_productos.html', {
+        'resultado': resultado,
+        'error': error,
+        'columnas': importador.COLUMNAS,
+    })
 
 # ==========================================
 # 4. CLIENTES
@@ -213,10 +290,8 @@ def lista_clientes(request):
     """Directorio de clientes con estadísticas"""
     busqueda = request.GET.get('q')
     
-    clientes = Cliente.objects.annotate(
-        num_compras=Count('venta'),
-        total_gastado=Sum('venta__total')
-    ).order_by('-num_compras')
+    # num_compras y total_gastado ya vienen guardados en la tabla (no tocamos ventas)
+    clientes = Cliente.objects.all()
 
     if busqueda:
         clientes = clientes.filter(
@@ -224,8 +299,11 @@ def lista_clientes(request):
             Q(cedula_ruc__icontains=busqueda)
         )
 
+    pagina = paginar(clientes, ['-num_compras', '-id_cliente'], request, tamano=TAMANO_PAGINA)
+
     context = {
-        'clientes': clientes,
+        'clientes': pagina,
+        'pagina': pagina,
         'busqueda': busqueda
     }
     return render(request, 'core/clientes.html', context)
@@ -233,29 +311,111 @@ def lista_clientes(request):
 # ==========================================
 # 5. APIs JSON (Backend para Alpine.js)
 # ==========================================
+# Las consultas que hacen las cajas a cada rato son async (ORM async de Django):
+# servidas con ASGI (ver ferreteria_system/asgi.py) muchas cajas esperando
+# a la BD no ocupan un hilo cada una.
+
+def datos_producto(producto):
+    """Formato JSON de un producto para el POS (mismo en la consulta simple y en lote)"""
+    return {
+        'encontrado': True,
+        'id': producto.id_producto,
+        'nombre': producto.nombre,
+        # Forzamos conversión a float para evitar problemas con Decimal
+        'precio': float(producto.precio_venta),
+        'stock': float(producto.stock),
+        'unidad': producto.get_unidad_display() # Opcional: Para mostrar la unidad si quieres
+    }
 
 @login_required
-def obtener_producto(request, id_producto):
+async def obtener_producto(request, id_producto):
     try:
-        producto = Producto.objects.get(id_producto=id_producto, activo=True)
-        data = {
-            'encontrado': True,
-            'id': producto.id_producto,
-            'nombre': producto.nombre,
-            # Forzamos conversión a float para evitar problemas con Decimal
-            'precio': float(producto.precio_venta),
-            'stock': float(producto.stock),
-            'unidad': producto.get_unidad_display() # Opcional: Para mostrar la unidad si quieres
-        }
+        producto = await Producto.objects.aget(id_producto=id_producto, activo=True)
+        data = datos_producto(producto)
     except Producto.DoesNotExist:
         data = {'encontrado': False}
-    except Exception as e:
-        # Esto nos ayudará a ver si hay otro error en la consola del servidor
-        print(f"Error en obtener_producto: {e}") 
+    except Exception:
+        # El POS lo trata como no encontrado; el error completo (con traceback) queda en el log
+        log.exception("Error en obtener_producto #%s", id_producto)
         data = {'encontrado': False}
         
     return JsonResponse(data)
 
+@login_required
+async def api_buscar_productos(request):
+    """Autocompletado de productos para el POS y el inventario"""
+    q = request.GET.get('q', '')
+    try:
+        limite = min(int(request.GET.get('limite', 10)), 50)
+    except ValueError:
+        limite = 10
+
+    # El índice es memoria pura, pero la primera vez (o si cambió) lee la BD
+    ids = await sync_to_async(indice.buscar)(q, limite=limite)
+    if not ids:
+        return JsonResponse([], safe=False)
+
+    # Precio y stock cambian a cada rato: los leemos de la BD (una consulta por PK)
+    productos = await Producto.objects.ain_bulk(ids)
+    data = [
+        {
+            'id': p.id_producto,
+            'nombre': p.nombre,
+            'precio': float(p.precio_venta),
+            'stock': float(p.stock),
+            'unidad': p.get_unidad_display()
+        }
+        for p in (productos.get(i) for i in ids) if p is not None
+    ]
+    return JsonResponse(data, safe=False)
+
+# Máximo de IDs por consulta en lote
+LIMITE_LOTE = 500
+
+@csrf_exempt
+@login_required
+async def api_productos_lote(request):
+    """
+    Varios productos en UNA consulta (recuperar carrito / cotización).
+    GET ?ids=1,2,3  o  POST {"ids": [1, 2, 3]}
+    """
+    try:
+        if request.method == 'POST':
+            ids = json.loads(request.body).get('ids', [])
+        else:
+            ids = [i for i in request.GET.get('ids', '').split(',') if i.strip()]
+        ids = [int(i) for i in ids]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'status': 'error', 'mensaje': 'Lista de IDs inválida'}, status=400)
+
+    if len(ids) > LIMITE_LOTE:
+        return JsonResponse({'status': 'error', 'mensaje': f'Máximo {LIMITE_LOTE} productos por consulta'}, status=400)
+
+    productos = await Producto.objects.filter(activo=True).ain_bulk(set(ids))
+
+    # Respetamos el orden pedido e indicamos cuáles no existen
+    resultados = [
+        datos_producto(productos[i]) if i in productos else {'id': i, 'encontrado': False}
+        for i in ids
+    ]
+    return JsonResponse({'status': 'ok', 'productos': resultados})
+
+@login_required
+@condition(etag_func=etag_catalogo)
+def api_catalogo(request):
+    """Catálogo completo para que el POS resuelva los productos sin ir al servidor"""
+    return JsonResponse(catalogo.snapshot())
+
+@login_required
+def api_catalogo_cambios(request):
+    """Solo los productos que cambiaron desde la versión que tiene el POS"""
+    try:
+        version = int(request.GET.get('desde', 0))
+        datos = catalogo.cambios(version) if version > 0 else catalogo.snapshot()
+    except ValueError:  # No es un número, o es un número que no corresponde a ninguna fecha
+        return JsonResponse({'status': 'error', 'mensaje': 'Versión inválida'}, status=400)
+    return JsonResponse(datos)
+
 @login_required
 def eliminar_producto(request, id_producto):
     # SEGURIDAD: Solo admin
@@ -273,7 +433,7 @@ def eliminar_producto(request, id_producto):
     return render(request, 'core/confirmar_eliminar.html', {'producto': producto})
 
 @login_required
-def api_buscar_clientes(request):
+async def api_buscar_clientes(request):
     q = request.GET.get('q', '')
     if len(q) < 2:
         return JsonResponse([], safe=False)
@@ -286,25 +446,24 @@ def api_buscar_clientes(request):
     
     # AQUI AGREGAMOS LA LOGICA VIP
     data = []
-    for c in clientes:
-        num_compras = c.venta_set.count() # Contamos sus ventas
-        es_vip = num_compras > 5          # Si tiene más de 5, es VIP
+    async for c in clientes:
+        es_vip = c.num_compras > 5        # Si tiene más de 5, es VIP (contador guardado, sin consultar ventas)
         data.append({
             'id': c.id_cliente, 
             'text': str(c),
             'es_vip': es_vip,             # Enviamos este dato al frontend
-            'num_compras': num_compras
+            'num_compras': c.num_compras
         })
         
     return JsonResponse(data, safe=False)
 
 @csrf_exempt
 @login_required
-def api_crear_cliente(request):
+async def api_crear_cliente(request):
     if request.method == 'POST':
         data = json.loads(request.body)
         try:
-            nuevo_cliente = Cliente.objects.create(
+            nuevo_cliente = await Cliente.objects.acreate(
                 nombres=data.get('nombres'),
                 cedula_ruc=data.get('cedula_ruc'),
                 telefono=data.get('telefono'),
@@ -332,39 +491,14 @@ def guardar_venta(request):
             return JsonResponse({'status': 'error', 'mensaje': 'El carrito está vacío'})
 
         try:
-            with transaction.atomic():
-                cliente_obj = None
-                if id_cliente:
-                    cliente_obj = Cliente.objects.get(id_cliente=id_cliente)
-
-                nueva_venta = Venta.objects.create(
-                    usuario=request.user,
-                    cliente=cliente_obj,
-                    total=total_venta,
-                    descuento=descuento # <--- GUARDAMOS EL DESCUENTO
-                )
-
-                for item in items:
-                    producto = Producto.objects.get(id_producto=item['id'])
-                    if producto.stock < item['cantidad']:
-                        raise Exception(f"Stock insuficiente para {producto.nombre}")
-
-                    DetalleVenta.objects.create(
-                        venta=nueva_venta,
-                        producto=producto,
-                        cantidad=item['cantidad'],
-                        precio_unitario=item['precio'],
-                        subtotal=item['precio'] * item['cantidad']
-                    )
-                    producto.stock -= item['cantidad']
-                    producto.save()
-                    
-                    Movimiento.objects.create(
-                        producto=producto,
-                        usuario=request.user,
-                        tipo='salida',
-                        cantidad=item['cantidad'],
-                        descripcion=f"Venta #{nueva_venta.id_venta}")
+            # Todo el carrito en un número fijo de consultas (ver core/operaciones.py)
+            nueva_venta = registrar_venta(
+                usuario=request.user,
+                items=items,
+                total=total_venta,
+                id_cliente=id_cliente,
+                descuento=descuento # <--- GUARDAMOS EL DESCUENTO
+            )
 
             return JsonResponse({'status': 'ok', 'id_venta': nueva_venta.id_venta})
 
@@ -461,40 +595,13 @@ def guardar_compra(request):
             return JsonResponse({'status': 'error', 'mensaje': 'Datos incompletos'})
 
         try:
-            with transaction.atomic():
-                proveedor = Proveedor.objects.get(id_proveedor=id_proveedor)
-                
-                # 1. Crear Cabecera Compra
-                nueva_compra = Compra.objects.create(
-                    proveedor=proveedor,
-                    usuario=request.user,
-                    total=total
-                )
-
-                # 2. Detalles y AUMENTAR Stock
-                for item in items:
-                    producto = Producto.objects.get(id_producto=item['id'])
-                    
-                    DetalleCompra.objects.create(
-                        compra=nueva_compra,
-                        producto=producto,
-                        cantidad=item['cantidad'],
-                        costo_unitario=item['precio'], # Aquí es Precio de COSTO
-                        subtotal=item['precio'] * item['cantidad']
-                    )
-                    
-                    # AUMENTAMOS STOCK
-                    producto.stock += item['cantidad']
-                    # Actualizamos el costo del producto al nuevo precio de compra
-                    producto.precio_compra = item['precio'] 
-                    producto.save()
-                    
-                    Movimiento.objects.create(
-                        producto=producto,
-                        usuario=request.user,
-                        tipo='entrada',
-                        cantidad=item['cantidad'],
-                        descripcion=f"Compra a {proveedor.empresa}")
+            # Factura completa en pocas sentencias (ver core/operaciones.py)
+            registrar_compra(
+                usuario=request.user,
+                id_proveedor=id_proveedor,
+                items=items,
+                total=total
+            )
 
             return JsonResponse({'status': 'ok'})
 
@@ -503,13 +610,28 @@ def guardar_compra(request):
             
     return JsonResponse({'status': 'error'})
 
+def _entero(valor, defecto):
+    try:
+        return max(int(valor), 0)
+    except (TypeError, ValueError):
+        return defecto
+
 @login_required
-def reporte_financiero(request):
-    # SEGURIDAD: Solo admin
-    if request.user.role != 'admin':
-        return redirect('home')
+def compras_sugeridas(request):
+    """Órdenes de compra sugeridas por proveedor según el pronóstico de demanda (ver core/pronostico.py)"""
+    if request.user.role != 'admin': return redirect('home')
+    entrega = _entero(request.GET.get('entrega'), pronostico.DIAS_ENTREGA)
+    cobertura = _entero(request.GET.get('cobertura'), pronostico.DIAS_COBERTURA)
+    ordenes = pronostico.sugerir_compras(dias_entrega=entrega, dias_cobertura=cobertura)
+    return render(request, 'core/compras_sugeridas.html', {
+        'ordenes': ordenes,
+        'entrega': entrega,
+        'cobertura': cobertura,
+        'total': sum(o['total'] for o in ordenes),
+    })
 
-    # 1. Obtener fechas del filtro (o usar mes actual por defecto)
+def rango_fechas(request):
+    """Fechas del filtro ?fecha_inicio=&fecha_fin= (por defecto: el mes actual)"""
     fecha_inicio = request.GET.get('fecha_inicio')
     fecha_fin = request.GET.get('fecha_fin')
     
@@ -523,47 +645,132 @@ def reporte_financiero(request):
         # Por defecto: Hoy
         fecha_fin = hoy.strftime('%Y-%m-%d')
 
-    # 2. Filtrar Ventas (Convertimos string a objeto fecha para hacer range)
+    # Convertimos string a objeto fecha para hacer range
     # Agregamos horas para cubrir el día completo final (23:59:59)
     f_ini = datetime.datetime.strptime(fecha_inicio, '%Y-%m-%d')
     f_fin = datetime.datetime.strptime(fecha_fin, '%Y-%m-%d') + datetime.timedelta(days=1) - datetime.timedelta(seconds=1)
+    return fecha_inicio, fecha_fin, f_ini, f_fin
+
+@login_required
+def reporte_financiero(request):
+    # SEGURIDAD: Solo admin
+    if request.user.role != 'admin':
+        return redirect('home')
+
+    # 1. Obtener fechas del filtro (o usar mes actual por defecto)
+    fecha_inicio, fecha_fin, f_ini, f_fin = rango_fechas(request)
 
-    ventas = Venta.objects.filter(fecha_venta__range=(f_ini, f_fin)).order_by('-fecha_venta')
+    # 2. Filtrar Ventas
+    ventas = Venta.objects.filter(fecha_venta__range=(f_ini, f_fin)).select_related('cliente')
+    pagina = paginar(ventas, ['-fecha_venta', '-id_venta'], request, tamano=TAMANO_PAGINA)
 
-    # 3. Cálculos Financieros
-    total_ingresos = ventas.aggregate(Sum('total'))['total__sum'] or 0
-    
-    # Calcular Ganancia Estimada:
-    # (Esto es complejo porque el costo cambia, haremos una aproximación con el costo ACTUAL del producto)
-    ganancia_bruta = 0
-    for v in ventas:
-        for detalle in v.detalles.all():
-            # Ingreso por este producto en esta venta
-            ingreso_item = detalle.subtotal 
-            # Costo estimado (Cantidad * Costo actual del producto)
-            costo_item = detalle.cantidad * detalle.producto.precio_compra
-            ganancia_bruta += (ingreso_item - costo_item)
-
-    # Restar descuentos globales si aplicaste descuento al total de la venta
-    total_descuentos = ventas.aggregate(Sum('descuento'))['descuento__sum'] or 0
-    # La ganancia real se ve afectada por el descuento que diste
-    ganancia_neta = ganancia_bruta - total_descuentos
+    # 3. Cálculos Financieros (agregados en la BD, ver core/reportes.py)
+    resumen = resumen_financiero(f_ini, f_fin)
 
     context = {
-        'ventas': ventas,
-        'total_ingresos': total_ingresos,
-        'ganancia_estimada': ganancia_neta,
-        'total_descuentos': total_descuentos,
+        'ventas': pagina,
+        'pagina': pagina,
+        'num_ventas': resumen['num_ventas'],
+        'total_ingresos': resumen['total_ingresos'],
+        'ganancia_estimada': resumen['ganancia_neta'],
+        'total_descuentos': resumen['total_descuentos'],
+        'por_dia': resumen['por_dia'],
+        'por_categoria': resumen['por_categoria'],
         'fecha_inicio': fecha_inicio,
         'fecha_fin': fecha_fin
     }
     return render(request, 'core/financiero.html', context)
 
+@login_required
+def exportar_csv(request, tipo):
+    # SEGURIDAD: Solo admin
+    if request.user.role != 'admin':
+        return redirect('home')
+    if tipo not in EXPORTES:
+        raise Http404
+
+    try:
+        fecha_inicio, fecha_fin, f_ini, f_fin = rango_fechas(request)
+    except ValueError:
+        return HttpResponseBadRequest('Fecha inválida (use AAAA-MM-DD)')
+
+    respuesta = StreamingHttpResponse(lineas_csv(tipo, f_ini, f_fin), content_type='text/csv; charset=utf-8')
+    respuesta['Content-Disposition'] = f'attachment; filename="{tipo}_{fecha_inicio}_{fecha_fin}.csv"'
+    return respuesta
+
+@login_required
+def panel_rendimiento(request):
+    """Tiempos por vista y consultas repetidas (N+1), medidos por core.rendimiento"""
+    if request.user.role != 'admin':
+        return redirect('home')
+
+    if request.method == 'POST':
+        rendimiento.registro.reiniciar()
+        return redirect('panel_rendimiento')
+
+    datos = rendimiento.registro.resumen()
+    for vista in datos['vistas']:
+        mayor = max(vista['histograma']) or 1
+        vista['barras'] = [
+            {'limite': limite, 'cantidad': cantidad, 'alto': round(cantidad * 100 / mayor)}
+            for limite, cantidad in zip(datos['cubetas'], vista['histograma'])
+        ]
+    datos['desde'] = datetime.datetime.fromtimestamp(datos['desde'], tz=datetime.timezone.utc)
+    datos['muestreo'] = getattr(settings, 'RENDIMIENTO_MUESTREO', 1.0)
+    return render(request, 'core/rendimiento.html', datos)
+
 @login_required
 def historial_producto(request, id_producto):
     producto = get_object_or_404(Producto, id_producto=id_producto)
-    movimientos = Movimiento.objects.filter(producto=producto).order_by('-fecha')
-    return render(request, 'core/historial.html', {'producto': producto, 'movimientos': movimientos})
+    movimientos = Movimiento.objects.filter(producto=producto).select_related('usuario')
+    pagina = paginar(movimientos, ['-fecha', '-id'], request, tamano=100)
+
+    # Stock a una fecha: último corte + movimientos desde ese corte (ver core/kardex.py)
+    fecha = request.GET.get('fecha')
+    stock_fecha = None
+    if fecha:
+        try:
+            dia = datetime.datetime.strptime(fecha, '%Y-%m-%d').date()
+            stock_fecha = stock_en_fecha(producto, fin_del_dia(dia))
+        except ValueError:
+            fecha = None
+
+    return render(request, 'core/historial.html', {
+        'producto': producto,
+        'movimientos': pagina,
+        'pagina': pagina,
+        'fecha': fecha,
+        'stock_fecha': stock_fecha,
+    })
+
+@login_required
+def stock_bajo(request):
+    # Conjunto mantenido en cada venta/compra/ajuste (ver core/alertas.py): no recorre el catálogo
+    alertas = StockBajo.objects.select_related('producto__categoria')
+    pagina = paginar(alertas, ['-desde', '-producto_id'], request, tamano=TAMANO_PAGINA)
+    eventos = EventoStock.objects.select_related('producto').order_by('-fecha', '-id')[:20]
+
+    return render(request, 'core/stock_bajo.html', {
+        'alertas': pagina,
+        'pagina': pagina,
+        'total': StockBajo.objects.count(),
+        'eventos': eventos,
+    })
+
+@login_required
+def api_stock_bajo(request):
+    """Lista de alertas para widgets y avisos del POS"""
+    alertas = StockBajo.objects.select_related('producto').order_by('-desde', '-producto_id')
+    return JsonResponse({
+        'total': len(alertas),
+        'productos': [{
+            'id': a.producto_id,
+            'nombre': a.producto.nombre,
+            'stock': float(a.producto.stock),
+            'stock_minimo': float(a.producto.stock_minimo),
+            'desde': a.desde.isoformat(),
+        } for a in alertas],
+    })
 
 @login_required
 def reportar_perdida(request, id_producto):
@@ -574,23 +781,12 @@ def reportar_perdida(request, id_producto):
     producto = get_object_or_404(Producto, id_producto=id_producto)
 
     if request.method == 'POST':
-        cantidad = float(request.POST.get('cantidad'))
+        cantidad = decimal.Decimal(request.POST.get('cantidad'))
         motivo = request.POST.get('motivo')
 
         if cantidad > 0:
-            with transaction.atomic():
-                # 1. Registrar en Kardex (Ajuste Negativo)
-                Movimiento.objects.create(
-                    producto=producto,
-                    usuario=request.user,
-                    tipo='ajuste_neg', # Tipo que definimos antes en models
-                    cantidad=cantidad,
-                    descripcion=f"PÉRDIDA: {motivo}"
-                )
-
-                # 2. Restar del Stock
-                producto.stock -=  decimal.Decimal(cantidad) # Asegúrate de importar decimal si hace falta
-                producto.save()
+            # Resta del stock + ajuste negativo en el kardex (con saldo), en una transacción
+            ajustar_stock(request.user, producto.id_producto, -cantidad, f"PÉRDIDA: {motivo}")
             
             return redirect('historial_producto', id_producto=producto.id_producto)
 
@@ -5,12 +5,34 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Servidor recomendado cuando hay varias cajas (POS) consultando la API:
+
+    WEB_CONCURRENCY=4 uvicorn ferreteria_system.asgi:application --host 0.0.0.0 --port 8000
+
+- El número de procesos se da SOLO con WEB_CONCURRENCY (uvicorn lo toma como
+  --workers): settings.py lo lee y, con más de uno, usa FileBasedCache para que
+  el buscador y el dashboard de todos los procesos se invaliden juntos. No usar
+  --workers N a mano: quedaría LocMemCache, uno por proceso.
+- Las vistas async (api/producto, api/productos/*, api/clientes/*) corren en el
+  event loop; el resto de vistas (normales) corren en un pool de hilos.
+- Dejar CONN_MAX_AGE en 0 (valor por defecto): con ASGI las conexiones
+  persistentes no se reutilizan entre requests.
+- El panel de rendimiento (core/rendimiento.py) mide por proceso: con varios
+  workers muestra solo lo del proceso que atiende la página.
+- Con DEBUG=True los archivos estáticos se sirven desde aquí mismo; en
+  producción los sirve el servidor web.
 """
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ferreteria_system.settings')
 
 application = get_asgi_application()
+
+if settings.DEBUG:
+    application = ASGIStaticFilesHandler(application)
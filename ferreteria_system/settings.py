@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.rendimiento.MedirRendimiento', # Primero: mide el request completo (ver /rendimiento/)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,6 +89,47 @@ DATABASES = {
 import django.db.backends.mysql.base
 django.db.backends.mysql.base.DatabaseWrapper.check_database_version_supported = lambda self: None
 
+# Cache (sin servicios externos)
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# WEB_CONCURRENCY = número de procesos del servidor (uvicorn y gunicorn lo usan
+# como --workers, ver asgi.py). Con más de uno el cache tiene que ser compartido:
+# la versión del buscador y la invalidación del dashboard viven ahí, y con
+# LocMemCache cada proceso tendría las suyas.
+WORKERS = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+if WORKERS > 1:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('FERRETERIA_CACHE_DIR', BASE_DIR / 'cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ferreteria',
+        }
+    }
+
+# Segundos que vive el contexto del dashboard en cache (respaldo; se invalida con cada venta/compra)
+DASHBOARD_CACHE_TTL = 60
+
+# Medición de tiempos por vista (core/rendimiento.py). MUESTREO: fracción de requests medidos
+RENDIMIENTO_ACTIVO = True
+RENDIMIENTO_MUESTREO = 1.0
+
+# Tickets ya impresos: una venta no cambia, se guardan renderizados (ver core/tickets.py)
+TICKET_CACHE_TTL = 60 * 60 * 24
+
+# Datos del negocio que salen en el ticket
+EMPRESA = {
+    'nombre': 'FERRETERÍA MI REDENTOR',
+    'direccion': 'Ciudad Sandino, Managua',
+    'telefono': '2222-5555',
+    'ruc': 'J031000000000',
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -139,6 +182,9 @@ LOGOUT_REDIRECT_URL = 'login'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache del navegador para fotos y miniaturas (1 año, ver core/miniaturas.py)
+MEDIA_CACHE_SEGUNDOS = 60 * 60 * 24 * 365
+
 # --- PARCHE PARA MARIADB 10.4 (XAMPP) ---
 # Esto evita el error: syntax to use near 'RETURNING'
 from django.db.backends.mysql.features import DatabaseFeatures
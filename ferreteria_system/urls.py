@@ -18,6 +18,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from django.views.decorators.cache import cache_control
+from django.views.static import serve
 
 urlpatterns = [
     
@@ -32,4 +34,11 @@ LOGIN_REDIRECT_URL = 'home' # A dónde va después de entrar
 LOGOUT_REDIRECT_URL = 'login' # A dónde va después de salir
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    # Las fotos y miniaturas nunca cambian de contenido bajo el mismo nombre:
+    # el navegador las guarda por MEDIA_CACHE_SEGUNDOS sin volver a preguntar.
+    # (En producción el servidor web debe mandar el mismo Cache-Control para /media/)
+    urlpatterns += static(
+        settings.MEDIA_URL,
+        view=cache_control(public=True, max_age=settings.MEDIA_CACHE_SEGUNDOS, immutable=True)(serve),
+        document_root=settings.MEDIA_ROOT,
+    )
\ No newline at end of file